@@ -0,0 +1,189 @@
+"""
+Microbenchmarks of the BBox / DetectionResults hot paths.
+
+Each case runs on synthetic pages (utilities.synth_utils) of every size
+in --sizes, and records the best time per call (timeit), the peak
+memory of one call (tracemalloc) and the memory blocks its result holds.
+
+Usage:
+    python benchmarks/bench_boxes.py                       # print results
+    python benchmarks/bench_boxes.py --save baseline.json  # store a baseline
+    python benchmarks/bench_boxes.py --compare benchmarks/baseline.json
+        --threshold 0.25  # exit 1 if any case got >25% slower or heavier
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from ocrtoolkit.utilities.box_utils import box_iou, nms, resolve_lines
+from ocrtoolkit.utilities.synth_utils import make_detection_results, make_page_boxes
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+
+DEFAULT_SIZES = [10, 1000, 100000]
+
+# quadratic cases are capped to keep the suite fast
+MAX_SIZES = {"box_iou": 2000, "nms": 2000}
+
+
+def _setup_dets(n):
+    return make_detection_results(n)
+
+
+def _setup_boxes(n):
+    return make_page_boxes(n)
+
+
+def _setup_np_dets(n):
+    return make_detection_results(n).to_numpy(encode=True)
+
+
+def _setup_normalized_boxes(n):
+    dets = make_detection_results(n)
+    return dets.to_numpy(normalize=True)[:, :4].astype(np.float32)
+
+
+def _make_bboxes(boxes):
+    return [BBox(*box) for box in boxes.tolist()]
+
+
+def _from_arrays(boxes):
+    return DetectionResults.from_arrays(boxes, 2480, 3508).to_numpy(encode=True)
+
+
+def _nms(boxes):
+    return nms(boxes, np.linspace(1, 0, len(boxes)), iou_thresh=0.5)
+
+
+CASES: Dict[str, Tuple[Callable, Callable]] = {
+    "bbox_init": (_setup_boxes, _make_bboxes),
+    "from_arrays_to_numpy": (_setup_boxes, _from_arrays),
+    "to_numpy": (_setup_dets, lambda dets: dets.to_numpy(encode=True)),
+    "to_numpy_normalized": (_setup_dets, lambda dets: dets.to_numpy(normalize=True)),
+    "from_numpy": (
+        _setup_np_dets,
+        lambda arr: [BBox.from_numpy(row) for row in arr],
+    ),
+    "filter_by_conf": (_setup_dets, lambda dets: dets.filter_by_conf(0.5)),
+    "filter_by_labels": (
+        _setup_dets,
+        lambda dets: dets.filter_by_labels(["0", "1"], only_max_conf=True),
+    ),
+    "filter_by_region": (
+        _setup_dets,
+        lambda dets: dets.filter_by_region(0.1, 0.1, 0.6, 0.6),
+    ),
+    "expand_bboxes": (_setup_dets, lambda dets: dets.expand_bboxes(0.1, 0.1)),
+    "group_bboxes_lines": (
+        _setup_dets,
+        lambda dets: dets.group_bboxes(detect_lines=True, paragraph_break=0.035),
+    ),
+    "resolve_lines": (
+        _setup_normalized_boxes,
+        lambda boxes: resolve_lines(boxes, paragraph_break=0.035),
+    ),
+    "box_iou": (_setup_boxes, lambda boxes: box_iou(boxes, boxes)),
+    "nms": (_setup_boxes, _nms),
+}
+
+
+def measure(fn: Callable, arg, min_time: float = 0.2, repeat: int = 3) -> dict:
+    """Best seconds per call over repeat rounds of at least min_time,
+    the peak traced memory (KiB) of a single call and the number of
+    memory blocks still allocated after it (i.e. held by its result)
+    """
+    timer = timeit.Timer(lambda: fn(arg))
+    number, elapsed = timer.autorange()
+    rounds = [elapsed / number]
+    if elapsed / number < min_time:
+        number = max(1, int(min_time * number / elapsed))
+        rounds += [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks_before
+    del result
+    return {"time_s": min(rounds), "peak_kib": peak / 1024, "blocks": blocks}
+
+
+def run(sizes, pattern: str = "", min_time: float = 0.2) -> dict:
+    results = {}
+    for name, (setup, fn) in CASES.items():
+        if pattern not in name:
+            continue
+        for size in sizes:
+            if size > MAX_SIZES.get(name, size):
+                continue
+            key = f"{name}[{size}]"
+            results[key] = measure(fn, setup(size), min_time=min_time)
+            print(
+                f"{key:<32} {1e3 * results[key]['time_s']:>12.4f} ms "
+                f"{results[key]['peak_kib']:>12.1f} KiB "
+                f"{results[key]['blocks']:>9d} blocks",
+                flush=True,
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns the cases whose time or peak memory grew by more than
+    threshold (a fraction) over the baseline
+    """
+    regressions = []
+    for key, current in results.items():
+        if key not in baseline:
+            continue
+        for metric in ["time_s", "peak_kib"]:
+            ratio = current[metric] / max(baseline[key][metric], 1e-12)
+            if ratio > 1 + threshold:
+                regressions.append((key, metric, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("-k", "--pattern", default="", help="Only run matching cases")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--save", default=None, help="Write results to this JSON")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="Allowed slowdown (fraction)"
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.pattern, args.min_time)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, ratio in regressions:
+            print(f"REGRESSION {key} {metric}: {ratio:.2f}x baseline")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression over {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
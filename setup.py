@@ -79,6 +79,7 @@ if __name__ == "__main__":
         keywords=["ocrtoolkit"],
         package_dir={"": "src"},
         packages=find_packages("src"),
+        entry_points={"console_scripts": ["ocrtoolkit=ocrtoolkit.cli:main"]},
         zip_safe=False,
         classifiers=[
             "Development Status :: 3 - Alpha",
@@ -9,3 +9,19 @@
 """
 
 __version__ = "0.0.2"
+
+from ocrtoolkit.lazy import attach
+
+# subpackages are imported on first access, e.g. ocrtoolkit.core.detect
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "cli": [],
+        "core": [],
+        "datasets": [],
+        "integrations": [],
+        "models": [],
+        "utilities": [],
+        "wrappers": [],
+    },
+)
@@ -0,0 +1,195 @@
+import argparse
+import json
+from typing import List, Optional
+
+from ocrtoolkit import __version__
+
+
+def load_model(args, arch_name=None, path=None):
+    """Loads the arch given on the command line"""
+    from ocrtoolkit.models import get_arch
+
+    arch = get_arch(arch_name or args.arch)
+    return arch(
+        path=path or args.path,
+        device=args.device,
+        model_kwargs=json.loads(args.model_kwargs),
+        **json.loads(args.load_kwargs),
+    )
+
+
+def add_model_args(parser: argparse.ArgumentParser):
+    parser.add_argument("arch", help="Architecture name, e.g. DOCTR_DB_RESNET50")
+    parser.add_argument("--path", default=None, help="Path to the model weights")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument(
+        "--model-kwargs", default="{}", help="JSON dict passed as model_kwargs"
+    )
+    parser.add_argument(
+        "--load-kwargs", default="{}", help="JSON dict of extra load kwargs"
+    )
+    parser.add_argument(
+        "--predict-kwargs", default="{}", help="JSON dict passed to model.predict"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on this port",
+    )
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+
+
+def start_metrics(args):
+    """Serves Prometheus metrics if --metrics-port is given"""
+    if args.metrics_port is not None:
+        from ocrtoolkit.utilities.metrics_utils import MetricsServer
+
+        MetricsServer(args.metrics_port, args.metrics_host).start()
+
+
+def run_serve(args):
+    from ocrtoolkit.core.server import serve
+
+    start_metrics(args)
+
+    serve(
+        load_model(args),
+        host=args.host,
+        port=args.port,
+        max_batch=args.max_batch,
+        max_latency=args.max_latency,
+        **json.loads(args.predict_kwargs),
+    )
+
+
+def parse_shard(value: str) -> tuple:
+    """Parses i/n into (i, n)"""
+    shard, num_shards = map(int, value.split("/"))
+    if not 0 <= shard < num_shards:
+        raise argparse.ArgumentTypeError(f"Invalid shard {value}")
+    return shard, num_shards
+
+
+def parse_size(value: str) -> tuple:
+    """Parses WxH into (w, h)"""
+    return tuple(map(int, value.lower().split("x")))
+
+
+def run_ocr(args):
+    from ocrtoolkit.core.runner import run_ocr
+
+    start_metrics(args)
+
+    rec_model = None
+    if args.rec_arch is not None:
+        rec_model = load_model(args, args.rec_arch, args.rec_path)
+    run_ocr(
+        load_model(args),
+        args.inputs,
+        args.output,
+        fmt=args.format,
+        bs=args.bs,
+        workers=args.workers,
+        rec_model=rec_model,
+        resume=not args.no_resume,
+        shard=args.shard[0],
+        num_shards=args.shard[1],
+        size=args.size,
+        **json.loads(args.predict_kwargs),
+    )
+
+
+def run_bench(args):
+    from ocrtoolkit.core.benchmark import benchmark_archs
+
+    load_kwargs = {
+        "device": args.device,
+        "model_kwargs": json.loads(args.model_kwargs),
+        **json.loads(args.load_kwargs),
+    }
+    if args.path is not None:
+        load_kwargs["path"] = args.path
+    df = benchmark_archs(
+        args.archs or None,
+        batch_sizes=args.bs,
+        num_threads=args.threads or [None],
+        num_images=args.num_images,
+        warmup=args.warmup,
+        load_kwargs=load_kwargs,
+        json_path=args.json,
+        **json.loads(args.predict_kwargs),
+    )
+    print(df.to_string(index=False, float_format="{:.2f}".format))
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ocrtoolkit")
+    parser.add_argument("--version", action="version", version=__version__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve a model over HTTP with dynamic batching"
+    )
+    add_model_args(serve_parser)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--max-batch", type=int, default=8)
+    serve_parser.add_argument(
+        "--max-latency", type=float, default=0.005, help="Max batching wait (s)"
+    )
+    serve_parser.set_defaults(func=run_serve)
+
+    ocr_parser = subparsers.add_parser(
+        "ocr", help="Run a model over directories, files or file lists"
+    )
+    add_model_args(ocr_parser)
+    ocr_parser.add_argument(
+        "inputs", nargs="+", help="Image dirs, image files or .txt file lists"
+    )
+    ocr_parser.add_argument("-o", "--output", required=True, help="Output file")
+    ocr_parser.add_argument("--format", choices=["jsonl", "csv", "h5"], default="jsonl")
+    ocr_parser.add_argument("--bs", type=int, default=8, help="Batch size")
+    ocr_parser.add_argument(
+        "--workers", type=int, default=4, help="Image decoding threads"
+    )
+    ocr_parser.add_argument(
+        "--rec-arch", default=None, help="Recognizer run on the detected boxes"
+    )
+    ocr_parser.add_argument("--rec-path", default=None)
+    ocr_parser.add_argument(
+        "--shard", type=parse_shard, default=(0, 1), help="Process shard i of n: i/n"
+    )
+    ocr_parser.add_argument(
+        "--size", type=parse_size, default=None, help="Resize images to WxH"
+    )
+    ocr_parser.add_argument(
+        "--no-resume", action="store_true", help="Start over instead of resuming"
+    )
+    ocr_parser.set_defaults(func=run_ocr)
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Benchmark CPU latency and throughput of architectures"
+    )
+    bench_parser.add_argument(
+        "archs", nargs="*", help="Architecture names (default: all local archs)"
+    )
+    bench_parser.add_argument("--path", default=None, help="Path to the model weights")
+    bench_parser.add_argument("--device", default="cpu")
+    bench_parser.add_argument("--model-kwargs", default="{}")
+    bench_parser.add_argument("--load-kwargs", default="{}")
+    bench_parser.add_argument("--predict-kwargs", default="{}")
+    bench_parser.add_argument("--bs", type=int, nargs="+", default=[1, 4, 8])
+    bench_parser.add_argument(
+        "--threads", type=int, nargs="+", default=None, help="Thread counts to try"
+    )
+    bench_parser.add_argument("--num-images", type=int, default=32)
+    bench_parser.add_argument("--warmup", type=int, default=1, help="Warmup batches")
+    bench_parser.add_argument("--json", default=None, help="Write results to JSON")
+    bench_parser.set_defaults(func=run_bench)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = get_parser().parse_args(argv)
+    args.func(args)
@@ -1,2 +1,52 @@
-from .detector import *
-from .recognizer import *
+from typing import TYPE_CHECKING
+
+from ocrtoolkit.lazy import attach
+
+if TYPE_CHECKING:
+    from .batcher import *
+    from .benchmark import *
+    from .detector import *
+    from .recognizer import *
+    from .runner import *
+    from .server import *
+
+# submodules are imported on first access of one of their names
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "batcher": [
+            "AsyncBatcher",
+            "get_batcher",
+            "close_batchers",
+            "apredict",
+            "apredict_ds",
+        ],
+        "benchmark": [
+            "SKIPPED_PREFIXES",
+            "set_num_threads",
+            "limited_threads",
+            "make_synthetic_images",
+            "benchmark_model",
+            "benchmark_archs",
+        ],
+        "detector": ["detect", "adetect_iter", "adetect", "detect_and_save_h5"],
+        "recognizer": ["recognize", "arecognize_iter", "arecognize"],
+        "runner": [
+            "collect_inputs",
+            "JsonlWriter",
+            "CsvWriter",
+            "H5Writer",
+            "WRITERS",
+            "RunStats",
+            "run_ocr",
+        ],
+        "server": [
+            "decode_image",
+            "results_to_dict",
+            "results_to_npz",
+            "ServerStats",
+            "create_app",
+            "serve",
+        ],
+    },
+)
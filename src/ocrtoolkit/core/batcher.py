@@ -0,0 +1,257 @@
+import asyncio
+import collections
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ocrtoolkit.datasets.base import BaseDS
+from ocrtoolkit.utilities.instrument_utils import trace_batch
+from ocrtoolkit.wrappers.model import BaseModel, DetectionModel
+
+_BATCHERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _load_np(ds: BaseDS, idx: int) -> np.ndarray:
+    return np.array(ds[idx])
+
+
+class AsyncBatcher:
+    """Batches predict requests coming from concurrent coroutines
+    Pending images are flushed as a single model.predict call once
+    max_batch images are queued or max_latency seconds have passed.
+    Decode, preprocess and predict run in executors, so the event loop
+    is never blocked by the model.
+    Cancelled requests are dropped from the batch before it is run.
+    With keep_model=False the batcher only holds a weak reference to the
+    model (see get_batcher), and must not outlive it.
+    """
+
+    max_batch: int
+    max_latency: float
+    kwargs: dict
+    num_batches: int
+    num_requests: int
+
+    def __init__(
+        self,
+        model: BaseModel,
+        max_batch: int = 8,
+        max_latency: float = 0.005,
+        executor: Optional[Executor] = None,
+        decode_executor: Optional[Executor] = None,
+        keep_model: bool = True,
+        **kwargs,
+    ):
+        self._model_ref = weakref.ref(model)
+        self._model = model if keep_model else None
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.kwargs = kwargs
+        # one inference thread, models are not assumed to be thread-safe
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ocrtoolkit-batcher"
+        )
+        self.decode_executor = decode_executor
+        self.num_batches = 0
+        self.num_requests = 0
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._has_items: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def model(self) -> BaseModel:
+        model = self._model_ref()
+        if model is None:
+            raise ReferenceError("The model of this batcher was released")
+        return model
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.num_requests / max(self.num_batches, 1)
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._worker = asyncio.ensure_future(self._run())
+
+    def _predict(self, images: List[np.ndarray]) -> list:
+        model = self.model
+        task = "det" if isinstance(model, DetectionModel) else "rec"
+        trace = trace_batch(task, len(images), max_batch=self.max_batch)
+        with trace.stage("preprocess"):
+            l_inputs = model.preprocess(images)
+        with trace.stage("predict"):
+            l_results = model.predict(l_inputs, **self.kwargs)
+        trace.finish(l_results)
+        return l_results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_items.wait()
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_latency)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._pending[: self.max_batch]
+            self._pending = self._pending[self.max_batch :]
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+            if not self._pending:
+                self._has_items.clear()
+
+            batch = [(image, fut) for image, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            images = [image for image, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self._predict, images
+                )
+            except asyncio.CancelledError:
+                for _, fut in batch:
+                    fut.cancel()
+                raise
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.num_batches += 1
+            self.num_requests += len(batch)
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    async def submit(self, image: np.ndarray) -> Any:
+        """Queues a single image and waits for its prediction"""
+        self._ensure_worker()
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((image, fut))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await fut
+
+    async def submit_ds_item(self, ds: BaseDS, idx: int) -> Any:
+        """Decodes ds[idx] in the decode executor, then queues it"""
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(self.decode_executor, _load_np, ds, idx)
+        result = await self.submit(image)
+        result.img_name = ds.names[idx]
+        return result
+
+    async def close(self):
+        """Stops the worker and shuts down the owned executor
+        A batcher cached by get_batcher is also removed from the cache
+        """
+        for batchers in list(_BATCHERS.values()):
+            for key, batcher in list(batchers.items()):
+                if batcher is self:
+                    del batchers[key]
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for _, fut in self._pending:
+            fut.cancel()
+        self._pending = []
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+
+
+def _release_batcher(loop_ref: weakref.ref, key: tuple):
+    """Closes and uncaches a batcher once its model is garbage collected"""
+    loop = loop_ref()
+    batcher = _BATCHERS.get(loop, {}).pop(key, None) if loop is not None else None
+    if batcher is None:
+        return
+    if loop.is_closed():
+        if batcher._own_executor:
+            batcher.executor.shutdown(wait=False)
+    else:
+        loop.call_soon_threadsafe(lambda: loop.create_task(batcher.close()))
+
+
+def get_batcher(model: BaseModel, **kwargs) -> AsyncBatcher:
+    """Returns the batcher shared by all coroutines of the running loop
+    that call the same model with the same predict kwargs.
+    Batcher options (max_batch, max_latency) only apply on creation.
+    Cached batchers only hold a weak reference to their model: once the
+    model is garbage collected (e.g. unloaded from the registry), its
+    batchers are closed and dropped from the cache.
+    """
+    options = {
+        key: kwargs.pop(key)
+        for key in ("max_batch", "max_latency", "executor", "decode_executor")
+        if key in kwargs
+    }
+    predict_kwargs = {
+        key: value for key, value in kwargs.items() if key in model.valid_kwargs
+    }
+    loop = asyncio.get_running_loop()
+    batchers = _BATCHERS.setdefault(loop, {})
+    key = (id(model), repr(sorted(predict_kwargs.items())))
+    batcher = batchers.get(key)
+    if batcher is None or batcher._model_ref() is not model:
+        batcher = AsyncBatcher(model, keep_model=False, **options, **predict_kwargs)
+        batchers[key] = batcher
+        weakref.finalize(model, _release_batcher, weakref.ref(loop), key)
+    return batcher
+
+
+async def close_batchers():
+    """Closes all the batchers cached for the running loop"""
+    batchers = _BATCHERS.pop(asyncio.get_running_loop(), {})
+    for batcher in list(batchers.values()):
+        await batcher.close()
+
+
+async def apredict(model: BaseModel, images: List[np.ndarray], **kwargs) -> list:
+    """Async counterpart of model.preprocess + model.predict
+    Images are merged with concurrent requests into shared batches
+    """
+    batcher = get_batcher(model, **kwargs)
+    return list(await asyncio.gather(*(batcher.submit(image) for image in images)))
+
+
+async def apredict_ds(
+    model: BaseModel,
+    ds: BaseDS,
+    timeout: Optional[float] = None,
+    prefetch: Optional[int] = None,
+    **kwargs,
+) -> AsyncIterator:
+    """Yields predictions for every item of ds, in order
+    At most prefetch items are decoded and in flight at any time.
+    timeout applies to each item, asyncio.TimeoutError is raised on expiry.
+    Pending items are cancelled if the iterator is closed early.
+    """
+    batcher = get_batcher(model, **kwargs)
+    prefetch = prefetch or 2 * batcher.max_batch
+    in_flight = collections.deque()
+    try:
+        for idx in range(len(ds)):
+            in_flight.append(
+                asyncio.ensure_future(
+                    asyncio.wait_for(batcher.submit_ds_item(ds, idx), timeout)
+                )
+            )
+            if len(in_flight) >= prefetch:
+                yield await in_flight.popleft()
+        while in_flight:
+            yield await in_flight.popleft()
+    finally:
+        for task in in_flight:
+            task.cancel()
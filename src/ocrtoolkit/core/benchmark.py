@@ -0,0 +1,160 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, List, Optional, Sequence, Union
+
+import numpy as np
+from loguru import logger
+
+from ocrtoolkit.datasets.base import BaseDS
+from ocrtoolkit.utilities.memory_utils import PeakRSSMonitor
+from ocrtoolkit.utilities.synth_utils import make_page_boxes, make_page_image
+from ocrtoolkit.wrappers.model import BaseModel, DetectionModel
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# remote or weightless archs, only benchmarked when asked for explicitly
+SKIPPED_PREFIXES = ("GCV_", "STUB_")
+
+
+def set_num_threads(num_threads: Optional[int]):
+    """Sets the intra-op threads of torch and OpenCV, if available"""
+    if num_threads is None:
+        return
+    import cv2
+
+    cv2.setNumThreads(num_threads)
+    try:
+        import torch
+
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+
+@contextmanager
+def limited_threads(num_threads: Optional[int]):
+    """Sets the intra-op threads of torch and OpenCV (see set_num_threads),
+    restoring the previous values on exit
+    """
+    import cv2
+
+    previous_cv2 = cv2.getNumThreads()
+    try:
+        import torch
+
+        previous_torch = torch.get_num_threads()
+    except ImportError:
+        torch = None
+    set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        cv2.setNumThreads(previous_cv2)
+        if torch is not None:
+            torch.set_num_threads(previous_torch)
+
+
+def make_synthetic_images(task: str, num_images: int, seed: int = 0) -> list:
+    """Pages for detection, word sized crops of a page for recognition"""
+    if task == "det":
+        return [make_page_image(seed=seed + idx) for idx in range(num_images)]
+    height = 48 * max(int(np.ceil(num_images / 12)), 1)
+    page = make_page_image(num_images, height=height, seed=seed)
+    boxes = make_page_boxes(num_images, page.shape[1], height, seed=seed).astype(int)
+    return [page[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes.tolist()]
+
+
+def benchmark_model(
+    model: BaseModel,
+    images: List[np.ndarray],
+    bs: int = 1,
+    warmup: int = 1,
+    **kwargs,
+) -> dict:
+    """Runs model over images in batches of bs after warmup batches
+    Returns the p50/p95 latency per batch (ms), images per second
+    and the peak RSS (MiB) during the run
+    """
+    l_batches = [images[idx : idx + bs] for idx in range(0, len(images), bs)]
+    for batch in l_batches[:warmup]:
+        model.predict(model.preprocess(batch), **kwargs)
+
+    l_latencies = []
+    with PeakRSSMonitor() as monitor:
+        start = time.perf_counter()
+        for batch in l_batches:
+            batch_start = time.perf_counter()
+            model.predict(model.preprocess(batch), **kwargs)
+            l_latencies.append(time.perf_counter() - batch_start)
+        total = time.perf_counter() - start
+    return {
+        "p50_ms": 1000 * float(np.percentile(l_latencies, 50)),
+        "p95_ms": 1000 * float(np.percentile(l_latencies, 95)),
+        "img_per_s": len(images) / total,
+        "peak_rss_mb": monitor.peak / 2**20,
+    }
+
+
+def benchmark_archs(
+    archs: Optional[Sequence[Union[str, type]]] = None,
+    ds: Optional[BaseDS] = None,
+    batch_sizes: Sequence[int] = (1, 4, 8),
+    num_threads: Sequence[Optional[int]] = (None,),
+    num_images: int = 32,
+    warmup: int = 1,
+    load_kwargs: Optional[dict] = None,
+    json_path: Optional[str] = None,
+    verbose: bool = True,
+    **kwargs,
+) -> "pd.DataFrame":
+    """Benchmarks the CPU latency and throughput of architectures
+    archs are arch classes or names (default: all registered archs except
+    remote and stub ones). Each is loaded once with load_kwargs and run on
+    the first num_images of ds (default: synthetic pages or word crops,
+    depending on the task) for every thread count and batch size.
+    Thread counts are restored once each run is over.
+    Archs failing to load are reported with their error.
+    Returns one row per arch, threads and batch size, optionally saved as
+    JSON records to json_path. kwargs are passed to model.predict.
+    """
+    import pandas as pd
+
+    from ocrtoolkit.models.arch import get_arch, list_archs
+
+    if archs is None:
+        archs = [name for name in list_archs() if not name.startswith(SKIPPED_PREFIXES)]
+    images = None
+    if ds is not None:
+        images = [np.array(ds[idx]) for idx in range(min(num_images, len(ds)))]
+
+    rows = []
+    for arch in archs:
+        arch = get_arch(arch) if isinstance(arch, str) else arch
+        name = arch.__name__
+        try:
+            model = arch(**(load_kwargs or {}))
+        except Exception as e:
+            logger.warning(f"Skipping {name}: {e!r}")
+            rows.append({"arch": name, "error": repr(e)})
+            continue
+        task = "det" if isinstance(model, DetectionModel) else "rec"
+        arch_images = images or make_synthetic_images(task, num_images)
+        for threads in num_threads:
+            with limited_threads(threads):
+                for bs in batch_sizes:
+                    row = {"arch": name, "task": task, "threads": threads, "bs": bs}
+                    row.update(
+                        benchmark_model(model, arch_images, bs, warmup, **kwargs)
+                    )
+                    rows.append(row)
+                    if verbose:
+                        logger.info(row)
+        del model
+
+    df = pd.DataFrame(rows)
+    if json_path is not None:
+        with open(json_path, "w") as f:
+            json.dump(df.to_dict(orient="records"), f, indent=2)
+    return df
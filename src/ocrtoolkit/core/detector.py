@@ -1,32 +1,67 @@
+from contextlib import nullcontext
+from functools import partial
+from typing import AsyncIterator, List, Optional
+
 import numpy as np
 from loguru import logger
-from tqdm.auto import tqdm
 
+from ocrtoolkit.core.batcher import apredict_ds
 from ocrtoolkit.datasets.base import BaseDS
-from ocrtoolkit.utilities.det_utils import save_dets
+from ocrtoolkit.utilities.cache_utils import ResultCache
+from ocrtoolkit.utilities.det_utils import write_dets
+from ocrtoolkit.utilities.instrument_utils import trace_batch
+from ocrtoolkit.utilities.memory_utils import (
+    AdaptiveBatchSize,
+    MemoryBudget,
+    PeakRSSMonitor,
+)
+from ocrtoolkit.wrappers.detection_results import DetectionResults
 from ocrtoolkit.wrappers.model import DetectionModel
 
 
-def _detect(model: DetectionModel, ds: BaseDS, **kwargs):
+def _detect(
+    model: DetectionModel, ds: BaseDS, cache: Optional[ResultCache] = None, **kwargs
+):
+    predict = partial(cache.predict, model) if cache is not None else model.predict
     if not ds.batched:
-        for idx, img in enumerate(ds):
-            l_np_imgs = model.preprocess([np.array(img)])
-            det_results = model.predict(l_np_imgs, **kwargs)[0]
-            det_results.img_name = ds.names[idx]
+        for idx in range(len(ds)):
+            trace = trace_batch("det", 1)
+            with trace.stage("decode"):
+                img = ds[idx]
+            with trace.stage("to_numpy"):
+                l_np_imgs = [np.array(img)]
+            with trace.stage("preprocess"):
+                l_inputs = model.preprocess(l_np_imgs)
+            with trace.stage("predict"):
+                l_det_results = predict(l_inputs, **kwargs)
+            with trace.stage("results"):
+                det_results = l_det_results[0]
+                det_results.img_name = ds.names[idx]
+            trace.finish(l_det_results)
             yield det_results
     else:
-        l_np_imgs = [np.array(img) for img in ds]
-        l_inputs = model.preprocess(l_np_imgs)
-        l_det_results = model.predict(l_inputs, **kwargs)
-        for idx, det_results in enumerate(l_det_results):
-            det_results.img_name = ds.names[idx]
-            yield det_results
+        trace = trace_batch("det", len(ds))
+        with trace.stage("decode"):
+            l_imgs = [ds[idx] for idx in range(len(ds))]
+        with trace.stage("to_numpy"):
+            l_np_imgs = [np.array(img) for img in l_imgs]
+        with trace.stage("preprocess"):
+            l_inputs = model.preprocess(l_np_imgs)
+        with trace.stage("predict"):
+            l_det_results = predict(l_inputs, **kwargs)
+        with trace.stage("results"):
+            for idx, det_results in enumerate(l_det_results):
+                det_results.img_name = ds.names[idx]
+        trace.finish(l_det_results)
+        yield from l_det_results
 
 
 def detect(model: DetectionModel, ds: BaseDS, stream=True, **kwargs):
     """Detects objects in a dataset
     Call model.preprocess methods before model.predict methods
     Images should be converted to np.ndarray before calling preprocess
+    Pass cache=ResultCache(...) to skip inference on already seen images
+    Stage timings are reported to the hooks of utilities.instrument_utils
     """
     if kwargs.get("verbose", True):
         logger.info("Stream mode: {}", stream)
@@ -38,24 +73,84 @@ def detect(model: DetectionModel, ds: BaseDS, stream=True, **kwargs):
     return list(_detect(model, ds, **kwargs))
 
 
+def adetect_iter(
+    model: DetectionModel,
+    ds: BaseDS,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> AsyncIterator[DetectionResults]:
+    """Async iterator over the results of detect, in dataset order
+    Decode and inference run in executors, off the event loop
+    Images are batched together with concurrent requests on the same model
+    Batching is tuned with max_batch, max_latency and prefetch kwargs
+    timeout is per image, asyncio.TimeoutError is raised on expiry
+    """
+    return apredict_ds(model, ds, timeout=timeout, **kwargs)
+
+
+async def adetect(
+    model: DetectionModel,
+    ds: BaseDS,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> List[DetectionResults]:
+    """Coroutine version of detect(model, ds, stream=False)
+    Cancelling the awaiting task cancels all of its pending images
+    """
+    if kwargs.get("verbose", True):
+        logger.info("Async mode: True")
+        logger.info("Running predict on {} samples", len(ds))
+    return [
+        result async for result in adetect_iter(model, ds, timeout=timeout, **kwargs)
+    ]
+
+
 def detect_and_save_h5(
     model: DetectionModel,
     ds: BaseDS,
     path: str,
     bs=4,
     start_batch_idx=0,
+    memory_budget_mb: Optional[float] = None,
+    adaptive_bs: bool = False,
     **kwargs,
 ):
     """Detects objects in a dataset
     Call model.preprocess methods before model.predict methods
     Images should be converted to np.ndarray before calling preprocess
-    Saves the detections to path.
-    Caution: This captures all detection results in mem before saving.
+    Saves the detections to path, batch by batch.
+    With memory_budget_mb, warns when the peak RSS of a batch nears the
+    budget. With adaptive_bs too, lowers the batch size to stay within it.
+    Batches are traced as "det", and their writes as "det_save".
     """
-    num_batches = ds.num_batches(bs)
-    l_det_results = []
-    for idx in tqdm(range(start_batch_idx, num_batches)):
-        batch = ds.batch(bs, idx)
-        l_det_results += detect(model, batch, stream=False, **kwargs)
+    import h5py
+    from tqdm.auto import tqdm
+
+    if start_batch_idx < 0:
+        start_batch_idx += ds.num_batches(bs)
+    start = start_batch_idx * bs
+    budget = MemoryBudget(memory_budget_mb) if memory_budget_mb else None
+    sizer = AdaptiveBatchSize(bs, budget) if budget and adaptive_bs else None
+    num_saved = 0
+    pbar = tqdm(total=max(len(ds) - start, 0))
+    with h5py.File(path, "w") as f:
+        group = f.create_group("dets")
+        while start < len(ds):
+            batch = ds.get_as_ds(slice(start, start + (sizer.next() if sizer else bs)))
+            batch.batched = True
+            with PeakRSSMonitor() if budget else nullcontext() as monitor:
+                l_det_results = detect(model, batch, stream=False, **kwargs)
+            if budget:
+                budget.check(monitor.peak, "detect_and_save_h5")
+            if sizer:
+                sizer.update(monitor.start, monitor.peak, len(batch))
 
-    save_dets(l_det_results, path)
+            trace = trace_batch("det_save", len(l_det_results))
+            with trace.stage("save"):
+                write_dets(group, l_det_results, num_saved)
+            trace.finish(l_det_results)
+            num_saved += len(l_det_results)
+            start += len(batch)
+            pbar.update(len(batch))
+    pbar.close()
+    logger.info(f"Detections saved to {path}")
@@ -1,30 +1,60 @@
+from functools import partial
+from typing import AsyncIterator, List, Optional
+
 import numpy as np
 from loguru import logger
 
+from ocrtoolkit.core.batcher import apredict_ds
 from ocrtoolkit.datasets.base import BaseDS
+from ocrtoolkit.utilities.cache_utils import ResultCache
+from ocrtoolkit.utilities.instrument_utils import trace_batch
 from ocrtoolkit.wrappers.model import RecognitionModel
+from ocrtoolkit.wrappers.recognition_results import RecognitionResults
 
 
-def _recognize(model: RecognitionModel, ds: BaseDS, **kwargs):
+def _recognize(
+    model: RecognitionModel, ds: BaseDS, cache: Optional[ResultCache] = None, **kwargs
+):
+    predict = partial(cache.predict, model) if cache is not None else model.predict
     if not ds.batched:
-        for idx, img in enumerate(ds):
-            l_np_imgs = model.preprocess([np.array(img)])
-            recog_results = model.predict(l_np_imgs, **kwargs)[0]
-            recog_results.img_name = ds.names[idx]
+        for idx in range(len(ds)):
+            trace = trace_batch("rec", 1)
+            with trace.stage("decode"):
+                img = ds[idx]
+            with trace.stage("to_numpy"):
+                l_np_imgs = [np.array(img)]
+            with trace.stage("preprocess"):
+                l_inputs = model.preprocess(l_np_imgs)
+            with trace.stage("predict"):
+                l_recog_results = predict(l_inputs, **kwargs)
+            with trace.stage("results"):
+                recog_results = l_recog_results[0]
+                recog_results.img_name = ds.names[idx]
+            trace.finish(l_recog_results)
             yield recog_results
     else:
-        l_np_imgs = [np.array(img) for img in ds]
-        l_inputs = model.preprocess(l_np_imgs)
-        l_recog_results = model.predict(l_inputs, **kwargs)
-        for idx, recog_results in enumerate(l_recog_results):
-            recog_results.img_name = ds.names[idx]
-            yield recog_results
+        trace = trace_batch("rec", len(ds))
+        with trace.stage("decode"):
+            l_imgs = [ds[idx] for idx in range(len(ds))]
+        with trace.stage("to_numpy"):
+            l_np_imgs = [np.array(img) for img in l_imgs]
+        with trace.stage("preprocess"):
+            l_inputs = model.preprocess(l_np_imgs)
+        with trace.stage("predict"):
+            l_recog_results = predict(l_inputs, **kwargs)
+        with trace.stage("results"):
+            for idx, recog_results in enumerate(l_recog_results):
+                recog_results.img_name = ds.names[idx]
+        trace.finish(l_recog_results)
+        yield from l_recog_results
 
 
 def recognize(model: RecognitionModel, ds: BaseDS, stream=True, **kwargs):
     """Recognizes text in a dataset
     Call model.preprocess methods before model.predict methods
     Images should be converted to np.ndarray before calling preprocess
+    Pass cache=ResultCache(...) to skip inference on already seen images
+    Stage timings are reported to the hooks of utilities.instrument_utils
     """
     if kwargs.get("verbose", True):
         logger.info("Stream mode: {}", stream)
@@ -34,3 +64,35 @@ def recognize(model: RecognitionModel, ds: BaseDS, stream=True, **kwargs):
     if stream:
         return gen
     return list(_recognize(model, ds, **kwargs))
+
+
+def arecognize_iter(
+    model: RecognitionModel,
+    ds: BaseDS,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> AsyncIterator[RecognitionResults]:
+    """Async iterator over the results of recognize, in dataset order
+    Decode and inference run in executors, off the event loop
+    Images are batched together with concurrent requests on the same model
+    Batching is tuned with max_batch, max_latency and prefetch kwargs
+    timeout is per image, asyncio.TimeoutError is raised on expiry
+    """
+    return apredict_ds(model, ds, timeout=timeout, **kwargs)
+
+
+async def arecognize(
+    model: RecognitionModel,
+    ds: BaseDS,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> List[RecognitionResults]:
+    """Coroutine version of recognize(model, ds, stream=False)
+    Cancelling the awaiting task cancels all of its pending images
+    """
+    if kwargs.get("verbose", True):
+        logger.info("Async mode: True")
+        logger.info("Running predict on {} samples", len(ds))
+    return [
+        result async for result in arecognize_iter(model, ds, timeout=timeout, **kwargs)
+    ]
@@ -0,0 +1,335 @@
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+from loguru import logger
+
+from ocrtoolkit.core.server import results_to_dict
+from ocrtoolkit.datasets.base import BaseDS
+from ocrtoolkit.datasets.fileds import FileDS
+from ocrtoolkit.utilities.instrument_utils import trace_batch
+from ocrtoolkit.utilities.io_utils import get_files
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import BaseModel, RecognitionModel
+
+
+def collect_inputs(
+    inputs: List[Union[str, Path]], shard: int = 0, num_shards: int = 1
+) -> List[str]:
+    """Returns the image paths of inputs, which can be directories,
+    image files or .txt files listing one image path per line
+    Only every num_shards-th path starting at shard is kept
+    """
+    l_paths = []
+    for source in inputs:
+        p_source = Path(source)
+        if p_source.is_dir():
+            l_paths += sorted(get_files(p_source))
+        elif p_source.suffix == ".txt":
+            with p_source.open() as f:
+                l_paths += [line.strip() for line in f if line.strip()]
+        else:
+            l_paths.append(str(p_source))
+    return l_paths[shard::num_shards]
+
+
+def _rewrite_atomic(path: Path, lines: List[str]):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", newline="") as f:
+        f.writelines(lines)
+    os.replace(tmp_path, path)
+
+
+class JsonlWriter:
+    """One JSON line per image"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.f = open(path, "a")
+
+    @staticmethod
+    def drop_unfinished(path: Union[str, Path], s_done: set) -> int:
+        """Removes the lines of images not in s_done (written by a batch
+        that was interrupted before its manifest entry), returns their number
+        """
+
+        def name(line: str) -> Optional[str]:
+            try:
+                return json.loads(line)["name"]
+            except (ValueError, KeyError, TypeError):
+                return None
+
+        with open(path) as f:
+            lines = f.readlines()
+        # a line cut by a crash has no newline, and is not valid JSON
+        kept = [line for line in lines if line.endswith("\n") and name(line) in s_done]
+        if len(kept) < len(lines):
+            _rewrite_atomic(Path(path), kept)
+        return len(lines) - len(kept)
+
+    def write(self, name: str, result):
+        self.f.write(json.dumps({"name": name, **results_to_dict(result)}) + "\n")
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class CsvWriter:
+    """One row per box (detection) or per image (recognition)"""
+
+    DET_FIELDS = ["name", "x1", "y1", "x2", "y2", "conf", "label", "text", "text_conf"]
+    REC_FIELDS = ["name", "text", "conf"]
+
+    def __init__(self, path: Union[str, Path]):
+        is_new = not Path(path).exists() or Path(path).stat().st_size == 0
+        self.f = open(path, "a", newline="")
+        self.csv = csv.writer(self.f)
+        self.is_new = is_new
+
+    @classmethod
+    def drop_unfinished(cls, path: Union[str, Path], s_done: set) -> int:
+        """Removes the rows of images not in s_done (written by a batch
+        that was interrupted before its manifest entry), returns their number
+        """
+        with open(path, newline="") as f:
+            lines = f.read().splitlines(keepends=True)
+        headers = (cls.DET_FIELDS, cls.REC_FIELDS)
+        kept = [
+            line
+            for idx, line in enumerate(lines)
+            if line.endswith("\n")
+            and (
+                next(csv.reader([line]), [""])[0] in s_done
+                or (idx == 0 and next(csv.reader([line])) in headers)
+            )
+        ]
+        if len(kept) < len(lines):
+            _rewrite_atomic(Path(path), kept)
+        return len(lines) - len(kept)
+
+    def write(self, name: str, result):
+        is_det = isinstance(result, DetectionResults)
+        if self.is_new:
+            self.csv.writerow(self.DET_FIELDS if is_det else self.REC_FIELDS)
+            self.is_new = False
+        if not is_det:
+            self.csv.writerow([name, result.text, result.conf])
+            return
+        for bbox in result.bboxes:
+            self.csv.writerow(
+                [name] + [bbox.to_dict()[field] for field in self.DET_FIELDS[1:]]
+            )
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class H5Writer:
+    """Detections in the layout of save_dets, readable with load_dets
+    Datasets are appended, so interrupted runs can be resumed
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        import h5py
+
+        self.f = h5py.File(path, "a")
+        self.group = self.f.require_group("dets")
+        self.idx = 1 + max((int(key.split("_")[-1]) for key in self.group), default=-1)
+
+    @staticmethod
+    def drop_unfinished(path: Union[str, Path], s_done: set) -> int:
+        """Removes the dets of images not in s_done (written by a batch
+        that was interrupted before its manifest entry), returns their number
+        """
+        import h5py
+
+        with h5py.File(path, "a") as f:
+            group = f.require_group("dets")
+            keys = [
+                key for key in group if str(group[key].attrs["img_name"]) not in s_done
+            ]
+            for key in keys:
+                del group[key]
+        return len(keys)
+
+    def write(self, name: str, result: DetectionResults):
+        dset = self.group.create_dataset(
+            f"dets_{self.idx}", data=result.to_numpy(encode=True)
+        )
+        dset.attrs["width"] = result.width
+        dset.attrs["height"] = result.height
+        dset.attrs["img_name"] = name
+        self.idx += 1
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "h5": H5Writer}
+
+
+class RunStats:
+    """Images processed and time spent per stage"""
+
+    def __init__(self):
+        self.num_images = 0
+        self.stage_times = defaultdict(float)
+        self.start_time = time.perf_counter()
+
+    def add(self, stage: str, elapsed: float):
+        self.stage_times[stage] += elapsed
+
+    @property
+    def images_per_second(self) -> float:
+        return self.num_images / max(time.perf_counter() - self.start_time, 1e-9)
+
+    def summary(self) -> dict:
+        """img/s and the mean ms per image of each stage"""
+        num_images = max(self.num_images, 1)
+        return {
+            "img/s": round(self.images_per_second, 2),
+            **{
+                f"{stage}_ms": round(1000 * total / num_images, 1)
+                for stage, total in self.stage_times.items()
+            },
+        }
+
+
+def _load_image(ds: BaseDS, idx: int) -> np.ndarray:
+    return np.array(ds[idx])
+
+
+def _recognize_crops(
+    rec_model: RecognitionModel, image: np.ndarray, det: DetectionResults, **kwargs
+):
+    crops = det.get_crops(image)
+    l_idxs = [idx for idx, crop in enumerate(crops) if crop.size > 0]
+    if not l_idxs:
+        return
+    l_rec = rec_model.predict(
+        rec_model.preprocess([crops[idx] for idx in l_idxs]), **kwargs
+    )
+    for idx, rec in zip(l_idxs, l_rec):
+        det.bboxes[idx].set_text_and_confidence(rec)
+
+
+def run_ocr(
+    model: BaseModel,
+    inputs: List[Union[str, Path]],
+    output: Union[str, Path],
+    fmt: str = "jsonl",
+    bs: int = 8,
+    workers: int = 4,
+    rec_model: Optional[RecognitionModel] = None,
+    resume: bool = True,
+    shard: int = 0,
+    num_shards: int = 1,
+    size: Optional[tuple] = None,
+    progress: bool = True,
+    **kwargs,
+) -> RunStats:
+    """Runs model over the images of inputs (see collect_inputs) and
+    writes the results to output in fmt (jsonl, csv or h5)
+    If rec_model is given, the crops of every detected box are recognized
+    and the texts are stored on the boxes.
+    Images are decoded by a pool of workers threads, one batch ahead.
+    Processed image names are appended to output + ".done" after each
+    batch is flushed, with resume=True these images are skipped on the
+    next run, and results of images missing from the manifest (from a
+    batch interrupted between the flush and the manifest) are removed
+    from output first. resume=False starts over, removing output and the
+    manifest. kwargs are passed to model.predict.
+    fmt="h5" (the layout of save_dets) only holds detections.
+    """
+    from tqdm.auto import tqdm
+
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format {fmt}. Available: {', '.join(WRITERS)}")
+    if fmt == "h5" and isinstance(model, RecognitionModel):
+        raise ValueError("fmt='h5' only holds detections, use jsonl or csv.")
+    l_paths = collect_inputs(inputs, shard, num_shards)
+    p_manifest = Path(f"{output}.done")
+    s_done = set()
+    if not resume:
+        p_manifest.unlink(missing_ok=True)
+        Path(output).unlink(missing_ok=True)
+    else:
+        if p_manifest.exists():
+            s_done = set(p_manifest.read_text().splitlines())
+        if Path(output).exists():
+            num_dropped = WRITERS[fmt].drop_unfinished(output, s_done)
+            if num_dropped:
+                logger.warning(f"Removed {num_dropped} unfinished results")
+    l_paths = [path for path in l_paths if path not in s_done]
+    logger.info(f"{len(l_paths)} images to process, {len(s_done)} already done")
+
+    stats = RunStats()
+    if not l_paths:
+        return stats
+    ds = FileDS(items=l_paths, names=l_paths, size=size, apply_gs=False)
+    writer = WRITERS[fmt](output)
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="ocrtoolkit-load")
+    l_batches = [range(idx, min(idx + bs, len(ds))) for idx in range(0, len(ds), bs)]
+    pbar = tqdm(total=len(ds), unit="img", disable=not progress)
+
+    def submit(batch_idxs):
+        return [executor.submit(_load_image, ds, idx) for idx in batch_idxs]
+
+    try:
+        l_futures = submit(l_batches[0])
+        for batch_num, batch_idxs in enumerate(l_batches):
+            batch_times = {}
+            start = time.perf_counter()
+            images = [future.result() for future in l_futures]
+            batch_times["load"] = time.perf_counter() - start
+            if batch_num + 1 < len(l_batches):
+                l_futures = submit(l_batches[batch_num + 1])
+
+            start = time.perf_counter()
+            l_results = model.predict(model.preprocess(images), **kwargs)
+            batch_times["predict"] = time.perf_counter() - start
+
+            if rec_model is not None:
+                start = time.perf_counter()
+                for image, det in zip(images, l_results):
+                    _recognize_crops(rec_model, image, det, **kwargs)
+                batch_times["recognize"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            names = [ds.names[idx] for idx in batch_idxs]
+            for name, result in zip(names, l_results):
+                result.img_name = name
+                writer.write(name, result)
+            writer.flush()
+            with p_manifest.open("a") as f:
+                f.write("".join(f"{name}\n" for name in names))
+            batch_times["write"] = time.perf_counter() - start
+
+            trace = trace_batch("ocr", len(images), max_batch=bs)
+            for stage, elapsed in batch_times.items():
+                stats.add(stage, elapsed)
+                trace.record(stage, elapsed)
+            trace.finish(l_results)
+            stats.num_images += len(images)
+            pbar.update(len(images))
+            pbar.set_postfix(stats.summary(), refresh=False)
+    finally:
+        pbar.close()
+        writer.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+    logger.info(f"Done: {stats.summary()}")
+    return stats
@@ -0,0 +1,183 @@
+import asyncio
+import io
+import time
+from typing import List
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from ocrtoolkit.core.batcher import AsyncBatcher
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import BaseModel, DetectionModel
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """Decodes encoded image bytes to an RGB array"""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image.")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def results_to_dict(result) -> dict:
+    """JSON friendly dict of a DetectionResults or RecognitionResults"""
+    if isinstance(result, DetectionResults):
+        return {
+            "width": result.width,
+            "height": result.height,
+            "bboxes": [bbox.to_dict() for bbox in result.bboxes],
+        }
+    return {
+        "width": result.width,
+        "height": result.height,
+        "text": result.text,
+        "conf": float(result.conf),
+    }
+
+
+def results_to_npz(l_results: list) -> bytes:
+    """Binary (npz) encoding of a list of results
+    Detection: dets_{i} arrays in the layout of DetectionResults.to_numpy,
+    plus sizes (Nx2 width, height). Recognition: texts and confs arrays.
+    """
+    arrays = {
+        "sizes": np.array([[res.width, res.height] for res in l_results]),
+    }
+    if l_results and isinstance(l_results[0], DetectionResults):
+        for idx, res in enumerate(l_results):
+            arrays[f"dets_{idx}"] = res.to_numpy(encode=True)
+    else:
+        arrays["texts"] = np.char.encode(
+            np.array([res.text for res in l_results], dtype=str), "UTF-8"
+        )
+        arrays["confs"] = np.array([res.conf for res in l_results], dtype=np.float32)
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+class ServerStats:
+    """Request counters and latencies of a running server"""
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.num_requests = 0
+        self.num_images = 0
+        self.num_errors = 0
+        self.total_latency = 0.0
+
+    def to_dict(self, batcher: AsyncBatcher) -> dict:
+        uptime = time.time() - self.start_time
+        return {
+            "uptime": uptime,
+            "num_requests": self.num_requests,
+            "num_images": self.num_images,
+            "num_errors": self.num_errors,
+            "images_per_second": self.num_images / max(uptime, 1e-9),
+            "mean_latency": self.total_latency / max(self.num_requests, 1),
+            "num_batches": batcher.num_batches,
+            "mean_batch_size": batcher.mean_batch_size,
+            "pending": len(batcher._pending),
+        }
+
+
+async def _read_images(request) -> List[bytes]:
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        l_data = []
+        async for part in reader:
+            l_data.append(await part.read())
+        return l_data
+    return [await request.read()]
+
+
+def create_app(
+    model: BaseModel,
+    max_batch: int = 8,
+    max_latency: float = 0.005,
+    **kwargs,
+):
+    """Creates an aiohttp app serving model
+    Routes:
+        POST /predict: one image as the request body, or several images
+            as multipart parts. ?format=json (default) or npz
+        GET /health: status, arch and task of the model
+        GET /stats: request counts, throughput, latency and batch sizes
+    Concurrent requests are batched together by an AsyncBatcher,
+    kwargs are passed to model.predict
+    """
+    from aiohttp import web
+
+    batcher = AsyncBatcher(
+        model, max_batch=max_batch, max_latency=max_latency, **kwargs
+    )
+    stats = ServerStats()
+    task = "det" if isinstance(model, DetectionModel) else "rec"
+
+    async def predict(request):
+        start = time.perf_counter()
+        stats.num_requests += 1
+        loop = asyncio.get_running_loop()
+        try:
+            l_data = await _read_images(request)
+            images = await asyncio.gather(
+                *(loop.run_in_executor(None, decode_image, data) for data in l_data)
+            )
+        except ValueError as e:
+            stats.num_errors += 1
+            raise web.HTTPBadRequest(text=str(e))
+        try:
+            l_results = await asyncio.gather(*(batcher.submit(im) for im in images))
+        except Exception:
+            stats.num_errors += 1
+            logger.exception("Prediction failed")
+            raise web.HTTPInternalServerError(text="Prediction failed.")
+        stats.num_images += len(images)
+        stats.total_latency += time.perf_counter() - start
+
+        if request.query.get("format", "json") == "npz":
+            return web.Response(
+                body=results_to_npz(l_results), content_type="application/x-npz"
+            )
+        return web.json_response(
+            {"results": [results_to_dict(res) for res in l_results]}
+        )
+
+    async def health(request):
+        return web.json_response(
+            {"status": "ok", "arch": model.arch, "task": task, "path": str(model.path)}
+        )
+
+    async def get_stats(request):
+        return web.json_response(stats.to_dict(batcher))
+
+    async def on_cleanup(app):
+        await batcher.close()
+
+    app = web.Application(client_max_size=64 * 1024**2)
+    app.add_routes(
+        [
+            web.post("/predict", predict),
+            web.get("/health", health),
+            web.get("/stats", get_stats),
+        ]
+    )
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def serve(
+    model: BaseModel,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_batch: int = 8,
+    max_latency: float = 0.005,
+    **kwargs,
+):
+    """Serves model over HTTP until interrupted, see create_app"""
+    from aiohttp import web
+
+    app = create_app(model, max_batch=max_batch, max_latency=max_latency, **kwargs)
+    logger.info(f"Serving {model.arch} on http://{host}:{port}")
+    web.run_app(app, host=host, port=port, print=None)
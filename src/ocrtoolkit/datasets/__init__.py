@@ -1,3 +1,18 @@
-from .base import *
-from .fileds import *
-from .imageds import *
+from typing import TYPE_CHECKING
+
+from ocrtoolkit.lazy import attach
+
+if TYPE_CHECKING:
+    from .base import *
+    from .fileds import *
+    from .imageds import *
+
+# submodules are imported on first access of one of their names
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "base": ["BaseDS"],
+        "fileds": ["FileDS"],
+        "imageds": ["ImageDS"],
+    },
+)
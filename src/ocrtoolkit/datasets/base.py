@@ -3,13 +3,12 @@ from collections.abc import Iterable
 from functools import partial
 from typing import Union
 
-import h5py
 import numpy as np
 from loguru import logger
-from sklearn.model_selection import train_test_split
 
 from ocrtoolkit.utilities.img_utils import (
     apply_ops,
+    tfm_identity,
     tfm_to_3ch,
     tfm_to_gray,
     tfm_to_pil,
@@ -154,8 +153,8 @@ class BaseDS:
     def _setup_tfms(self):
         self.tfms = [
             tfm_to_pil,
-            partial(tfm_to_size, size=self.size) if self.size else lambda x: x,
-            tfm_to_gray if self.apply_gs else lambda x: x,
+            partial(tfm_to_size, size=self.size) if self.size else tfm_identity,
+            tfm_to_gray if self.apply_gs else tfm_identity,
             tfm_to_3ch,
         ]
 
@@ -169,6 +168,8 @@ class BaseDS:
 
     def train_test_split(self, train_size=0.8, test_size=0.2):
         """Returns train_ds, test_ds"""
+        from sklearn.model_selection import train_test_split
+
         assert train_size + test_size <= 1, "train_size + test_size must be <= 1"
         ids_train, ids_test = train_test_split(
             range(len(self)), train_size=train_size, test_size=test_size
@@ -179,6 +180,8 @@ class BaseDS:
         )
 
     def save(self, path: str):
+        import h5py
+
         items_data = self.__class__._serialize_items(self.items)
         with h5py.File(path, "w") as f:
             group = f.create_group("class_attributes")
@@ -197,6 +200,8 @@ class BaseDS:
 
     @classmethod
     def load(cls, path) -> "BaseDS":
+        import h5py
+
         with h5py.File(path, "r") as f:
             group = f["class_attributes"]
             items = f["items"]
@@ -209,8 +214,9 @@ class BaseDS:
             names_ds = group["names"]
             names = [name.decode("utf-8") for name in names_ds]
             item_keys = sorted(f["items"].keys(), key=lambda x: int(x.split("_")[-1]))
-            item_data = [f["items"][key][()] for key in item_keys]
-            items = cls._deserialize_items(item_data)
+            # one item is read at a time, so raw and decoded items never
+            # all sit in memory together
+            items = cls._deserialize_items(f["items"][key][()] for key in item_keys)
 
             logger.info(f"Dataset loaded from {path}")
             return cls(
@@ -1,10 +1,17 @@
-from typing import List, Optional
+from pathlib import Path
+from typing import List, Optional, Union
 
 import numpy as np
 from loguru import logger
 
-from ocrtoolkit.utilities.model_utils import load_state_dict, reparameterize
-from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.datasets.base import BaseDS
+from ocrtoolkit.utilities.model_utils import (
+    compile_module,
+    hash_state_dict,
+    load_state_dict,
+    quantize_int8,
+    reparameterize,
+)
 from ocrtoolkit.wrappers.detection_results import DetectionResults
 from ocrtoolkit.wrappers.model import DetectionModel, RecognitionModel
 from ocrtoolkit.wrappers.recognition_results import RecognitionResults
@@ -16,7 +23,102 @@ except ImportError:
     logger.warning("Doctr is not installed.")
 
 
+def get_out_map_module(model):
+    """Wraps a doctr model in a module returning only the raw output map
+    (probability map for detection, logits for recognition)
+    so that it can be traced, scripted or exported to ONNX.
+    """
+    import torch
+
+    class OutMapModule(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, x):
+            return self.model(x, return_model_output=True)["out_map"]
+
+    return OutMapModule(model).eval()
+
+
+def postprocess_det(model, out_map: np.ndarray) -> List[dict]:
+    """Turns a NCHW probability map into doctr's per page predictions"""
+    l_preds = model.postprocessor(np.transpose(out_map, (0, 2, 3, 1)))
+    return [dict(zip(model.class_names, preds)) for preds in l_preds]
+
+
+def postprocess_rec(model, out_map: np.ndarray) -> List[tuple]:
+    """Turns recognition logits into doctr's (text, conf) predictions"""
+    import torch
+
+    return model.postprocessor(torch.from_numpy(out_map))
+
+
+def compile_model(
+    model,
+    task: str,
+    mode: str,
+    cache_dir: Optional[str] = None,
+    model_name: Optional[str] = None,
+):
+    """Returns a compiled version of a doctr torch model (see compile_module)
+    Only the tensor part of forward (up to the output map) is compiled and
+    wrapped in a module that still runs doctr's postprocessing, so that
+    doctr's predictors can use it as is.
+    Compiled artifacts are cached in cache_dir, keyed by the doctr model
+    name (default: the class name), a hash of the loaded weights, the
+    torch version, the device and the mode. Archs sharing a doctr class
+    (e.g. the CRNNs) thus never share an artifact.
+    """
+    import torch
+
+    device = next(model.parameters()).device
+    cache_dir = Path(cache_dir or Path.home() / ".cache" / "ocrtoolkit" / "compiled")
+    cache_key = "-".join(
+        [
+            model_name or model.__class__.__name__,
+            mode,
+            device.type,
+            torch.__version__,
+            hash_state_dict(model),
+        ]
+    )
+    example_inputs = (torch.rand((2, *model.cfg["input_shape"]), device=device),)
+    cache_path = cache_dir.joinpath(f"{cache_key}.pt")
+    if mode == "compile":
+        # one graph for all batch sizes, compiled during the warm-up
+        torch._dynamo.mark_dynamic(example_inputs[0], 0)
+        cache_path = cache_dir.joinpath(cache_key)
+    compiled = compile_module(
+        get_out_map_module(model), mode, example_inputs, cache_path
+    )
+
+    class CompiledDoctrModel(torch.nn.Module):
+        def __init__(self, model, compiled):
+            super().__init__()
+            self.compiled = compiled
+            self.cfg = model.cfg
+            self.postprocessor = model.postprocessor
+            self.class_names = getattr(model, "class_names", None)
+            self.vocab = getattr(model, "vocab", None)
+
+        def forward(self, x, return_model_output=False, return_preds=False, **kwargs):
+            out_map = self.compiled(x)
+            out = {}
+            if return_model_output:
+                out["out_map"] = out_map
+            if return_preds and task == "det":
+                out["preds"] = postprocess_det(self, out_map.cpu().numpy())
+            elif return_preds:
+                out["preds"] = self.postprocessor(out_map)
+            return out
+
+    return CompiledDoctrModel(model, compiled).eval()
+
+
 class DoctrDetModel(DetectionModel):
+    model_name: str = None  #: Name of the doctr architecture.
+
     def __init__(self, model, path, device, **kwargs):
         from doctr.models.detection.predictor import DetectionPredictor
 
@@ -29,32 +131,34 @@ class DoctrDetModel(DetectionModel):
         self.doctr_base_predictor = _OCRPredictor()
         self.predictor = DetectionPredictor(PreProcessor(input_shape, **kwargs), model)
 
-    def _predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
+    def _run_predictor(self, images: List[np.ndarray], **kwargs) -> List[dict]:
         import torch
 
         with torch.inference_mode():
-            l_preds = self.predictor(images, **kwargs)
+            return self.predictor(images, **kwargs)
+
+    def _predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
+        l_preds = self._run_predictor(images, **kwargs)
         l_loc_preds = [list(loc_pred.values())[0] for loc_pred in l_preds]
         l_loc_preds = self.doctr_base_predictor._remove_padding(images, l_loc_preds)
 
         l_results = []
         for image, preds in zip(images, l_loc_preds):
-            l_confs = preds[:, 4].tolist()
-            l_labels = ["0"] * len(l_confs)
-            l_coords = preds[:, :4].tolist()
-            l_bboxes = [
-                BBox(*bbox, conf=conf, label=label, normalized=True).denormalize(
-                    image.shape[1], image.shape[0]
-                )
-                for bbox, conf, label in zip(l_coords, l_confs, l_labels)
-            ]
             l_results.append(
-                DetectionResults(l_bboxes, width=image.shape[1], height=image.shape[0])
+                DetectionResults.from_arrays(
+                    preds[:, :4],
+                    width=image.shape[1],
+                    height=image.shape[0],
+                    confs=preds[:, 4],
+                    normalized=True,
+                )
             )
         return l_results
 
 
 class DoctrRecModel(RecognitionModel):
+    model_name: str = None  #: Name of the doctr architecture.
+
     def __init__(self, model, path, device, **kwargs):
         from doctr.models.recognition.predictor import RecognitionPredictor
 
@@ -70,11 +174,14 @@ class DoctrRecModel(RecognitionModel):
             PreProcessor(input_shape, preserve_aspect_ratio=True, **kwargs), model
         )
 
-    def _predict(self, images: List[np.ndarray], **kwargs) -> List[RecognitionResults]:
+    def _run_predictor(self, images: List[np.ndarray], **kwargs) -> List[tuple]:
         import torch
 
         with torch.inference_mode():
-            l_preds = self.predictor(images, **kwargs)
+            return self.predictor(images, **kwargs)
+
+    def _predict(self, images: List[np.ndarray], **kwargs) -> List[RecognitionResults]:
+        l_preds = self._run_predictor(images, **kwargs)
         l_results = []
         for image, preds in zip(images, l_preds):
             text, conf = preds
@@ -86,15 +193,58 @@ class DoctrRecModel(RecognitionModel):
         return l_results
 
 
+def quantize_model(
+    doctr_model: Union[DoctrDetModel, DoctrRecModel],
+    mode: str = "dynamic",
+    calib_ds: Optional[BaseDS] = None,
+    num_calib_batches: int = 8,
+):
+    """Quantizes the torch model of a loaded doctr model to int8, in place
+    For mode="static", calibration batches are built from the first
+    num_calib_batches batches of calib_ds, with the model's own
+    preprocessing. Quantized models run on the cpu. The mode is stored in
+    doctr_model.quantized, so cached results of the float model are not reused.
+    """
+    pre_processor = doctr_model.predictor.pre_processor
+    calib_batches = None
+    if mode == "static":
+        if calib_ds is None:
+            raise ValueError("Static quantization needs a calib_ds.")
+        num_images = min(len(calib_ds), num_calib_batches * pre_processor.batch_size)
+        l_np_imgs = doctr_model.preprocess(
+            [np.array(calib_ds[idx]) for idx in range(num_images)]
+        )
+        calib_batches = pre_processor(l_np_imgs)
+    if doctr_model.device != "cpu":
+        logger.warning("Quantized models only run on cpu, moving model to cpu.")
+        doctr_model.device = "cpu"
+    doctr_model.model = quantize_int8(doctr_model.model, mode, calib_batches)
+    doctr_model.predictor.model = doctr_model.model
+    doctr_model.quantized = mode
+    logger.info(f"Quantized {doctr_model.model_name} ({mode})")
+    return doctr_model
+
+
 def load(
     task: str,
     model_name: str,
     path: Optional[str],
     device: str,
     model_kwargs: dict,
+    quantize: Optional[str] = None,
+    calib_ds: Optional[BaseDS] = None,
+    compile: Optional[str] = None,
+    compile_cache_dir: Optional[str] = None,
     **kwargs,
 ):
-    """Factory method to load model."""
+    """Factory method to load model.
+    quantize="dynamic" or "static" quantizes the model to int8 (see
+    quantize_model), calib_ds is used to calibrate static quantization.
+    compile="script", "trace" or "compile" compiles the model once
+    weights are loaded (see compile_model).
+    """
+    if quantize and compile:
+        raise ValueError("quantize and compile cannot be combined.")
     pretrained = model_kwargs.pop("pretrained", path is None or path == "")
     pretrained_backbone = model_kwargs.pop("pretrained_backbone", True)
     if path is None:
@@ -114,8 +264,16 @@ def load(
 
         if model_name.startswith("fast_"):
             model = reparameterize(model)
+        if compile:
+            model = compile_model(
+                model.to(device), task, compile, compile_cache_dir, model_name
+            )
 
-        return DoctrDetModel(model, path, device, **kwargs)
+        det_model = DoctrDetModel(model, path, device, **kwargs)
+        det_model.model_name = model_name
+        if quantize:
+            quantize_model(det_model, quantize, calib_ds)
+        return det_model
     elif task == "rec":
         from doctr.models import recognition
 
@@ -127,6 +285,14 @@ def load(
         )
         if not pretrained:
             load_state_dict(path, model)
-        return DoctrRecModel(model, path, device, **kwargs)
+        if compile:
+            model = compile_model(
+                model.to(device), task, compile, compile_cache_dir, model_name
+            )
+        rec_model = DoctrRecModel(model, path, device, **kwargs)
+        rec_model.model_name = model_name
+        if quantize:
+            quantize_model(rec_model, quantize, calib_ds)
+        return rec_model
     else:
         raise NotImplementedError(f"Task {task} is not supported.")
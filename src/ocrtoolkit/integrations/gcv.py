@@ -1,3 +1,8 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from typing import List, Optional
 
 import cv2
@@ -11,30 +16,248 @@ except ImportError:
     logger.warning("Google Cloud Vision API is not installed.")
     pass
 
+from ocrtoolkit.utilities.network_utils import RateLimiter, retry_call
 from ocrtoolkit.wrappers.bbox import BBox
 from ocrtoolkit.wrappers.detection_results import DetectionResults
 from ocrtoolkit.wrappers.model import DetectionModel
 
+DOCUMENT_TEXT_DETECTION = 11  #: vision.Feature.Type.DOCUMENT_TEXT_DETECTION
+MAX_BATCH_SIZE = 16  #: Max images per batch_annotate_images request
+#: Per image status codes worth retrying: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED,
+#: INTERNAL and UNAVAILABLE (google.rpc.Code)
+RETRYABLE_CODES = (4, 8, 13, 14)
+
+
+class ImageError(RuntimeError):
+    """Some images of a batch failed with a retryable status code"""
+
+
+def get_retryable_errors() -> tuple:
+    """Transient errors worth retrying: throttling, unavailability, timeouts"""
+    errors = (ConnectionError, TimeoutError)
+    try:
+        from google.api_core import exceptions
+
+        errors += (
+            exceptions.TooManyRequests,
+            exceptions.ServiceUnavailable,
+            exceptions.InternalServerError,
+            exceptions.DeadlineExceeded,
+        )
+    except ImportError:
+        pass
+    return errors
+
+
+class UploadEncoder:
+    """Encodes images for upload to a remote OCR service.
+
+    Optionally crops to the content region (pixels darker than
+    content_thresh, plus margin), downscales so that the longest side
+    is at most max_side, and encodes with the given codec and quality.
+    encode returns the bytes and the (offset_x, offset_y, scale) transform,
+    which restore_bboxes uses to map boxes back to the original page.
+    """
+
+    QUALITY_FLAGS = {
+        ".jpg": cv2.IMWRITE_JPEG_QUALITY,
+        ".jpeg": cv2.IMWRITE_JPEG_QUALITY,
+        ".webp": cv2.IMWRITE_WEBP_QUALITY,
+    }
+
+    def __init__(
+        self,
+        max_side: Optional[int] = None,
+        ext: str = ".jpg",
+        quality: int = 95,
+        grayscale: bool = False,
+        crop_content: bool = False,
+        content_thresh: int = 200,
+        margin: int = 16,
+    ):
+        self.max_side = max_side
+        self.ext = ext
+        self.quality = quality
+        self.grayscale = grayscale
+        self.crop_content = crop_content
+        self.content_thresh = content_thresh
+        self.margin = margin
+
+    def get_content_region(self, image: np.ndarray) -> tuple:
+        """Returns x1, y1, x2, y2 of the dark pixels, padded by margin"""
+        h, w = image.shape[:2]
+        gray = image.min(axis=2) if image.ndim == 3 else image
+        mask = gray < self.content_thresh
+        rows, cols = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+        if len(rows) == 0:
+            return 0, 0, w, h
+        return (
+            max(cols[0] - self.margin, 0),
+            max(rows[0] - self.margin, 0),
+            min(cols[-1] + 1 + self.margin, w),
+            min(rows[-1] + 1 + self.margin, h),
+        )
+
+    def encode(self, image: np.ndarray) -> tuple:
+        offset_x, offset_y = 0, 0
+        if self.crop_content:
+            offset_x, offset_y, x2, y2 = self.get_content_region(image)
+            image = image[offset_y:y2, offset_x:x2]
+        scale = 1.0
+        if self.max_side is not None and max(image.shape[:2]) > self.max_side:
+            scale = self.max_side / max(image.shape[:2])
+            size = (round(image.shape[1] * scale), round(image.shape[0] * scale))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        if self.grayscale and image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        params = []
+        if self.ext in self.QUALITY_FLAGS:
+            params = [self.QUALITY_FLAGS[self.ext], self.quality]
+        content = cv2.imencode(self.ext, image, params)[1].tobytes()
+        return content, (offset_x, offset_y, scale)
+
+    @staticmethod
+    def restore_bboxes(bboxes: List[BBox], transform: tuple) -> List[BBox]:
+        """Maps boxes on the encoded image back to the original page"""
+        offset_x, offset_y, scale = transform
+        if (offset_x, offset_y, scale) == (0, 0, 1.0):
+            return bboxes
+        return [
+            BBox(
+                bbox.x1 / scale + offset_x,
+                bbox.y1 / scale + offset_y,
+                bbox.x2 / scale + offset_x,
+                bbox.y2 / scale + offset_y,
+                conf=bbox.conf,
+                label=bbox.label,
+                text=bbox.text,
+                text_conf=bbox.text_conf,
+            )
+            for bbox in bboxes
+        ]
+
 
 class GCVModel(DetectionModel):
-    """GCVModel."""
+    """Google Cloud Vision document text detection.
+
+    Images are sent with batch_annotate_images, batch_size images per
+    request, with at most max_in_flight requests running concurrently.
+    Requests failing with transient errors are retried with exponential
+    backoff, as are the images of a batch failing with RETRYABLE_CODES
+    (only those are sent again), and max_qps (if set) caps the images sent
+    per second. Images still failing get empty results, with the error
+    message in their error attribute.
+    Images are encoded with encoder (see UploadEncoder), returned boxes
+    are in original page coordinates. Encoded size and latency of each
+    request are appended to request_stats.
+    """
 
-    def __init__(self, client, path):
+    request_stats: List[dict]
+
+    def __init__(
+        self,
+        client,
+        path,
+        batch_size: int = 8,
+        max_in_flight: int = 8,
+        max_qps: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        encoder: Optional[UploadEncoder] = None,
+    ):
         super().__init__(model=client, path=path)
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.encoder = encoder or UploadEncoder()
+        self.rate_limiter = RateLimiter(max_qps) if max_qps else None
+        self.retry_on = get_retryable_errors()
+        self.request_stats = []
+        self._executor = ThreadPoolExecutor(max_in_flight, thread_name_prefix="gcv")
 
     def _map_location(self):
         pass
 
+    def _send(self, requests: list, responses: list, pending: List[int]):
+        """Sends the pending requests, fills their responses and leaves in
+        pending the ones that failed with a retryable status code
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(len(pending))
+        batch = self.model.batch_annotate_images(
+            requests=[requests[idx] for idx in pending]
+        )
+        failed = []
+        for idx, response in zip(pending, batch.responses):
+            responses[idx] = response
+            if response.error.code in RETRYABLE_CODES:
+                failed.append(idx)
+        pending[:] = failed
+        if failed:
+            raise ImageError(f"{len(failed)} images failed")
+
+    def _annotate(self, images: List[np.ndarray]) -> list:
+        """Returns the (bboxes, error) of each image, error is None on success"""
+        l_encoded = [self.encoder.encode(image) for image in images]
+        requests = [
+            {
+                "image": {"content": content},
+                "features": [{"type_": DOCUMENT_TEXT_DETECTION}],
+            }
+            for content, _ in l_encoded
+        ]
+        responses = [None] * len(requests)
+        pending = list(range(len(requests)))
+        start = time.perf_counter()
+        try:
+            retry_call(
+                self._send,
+                requests,
+                responses,
+                pending,
+                retry_on=self.retry_on + (ImageError,),
+                max_retries=self.max_retries,
+                backoff=self.backoff,
+            )
+        except ImageError:
+            pass  # reported per image below
+        stats = {
+            "num_images": len(images),
+            "raw_bytes": sum(image.nbytes for image in images),
+            "encoded_bytes": sum(len(content) for content, _ in l_encoded),
+            "latency": time.perf_counter() - start,
+        }
+        self.request_stats.append(stats)
+        logger.debug(f"GCV request: {stats}")
+        l_annotations = []
+        for response, (_, transform) in zip(responses, l_encoded):
+            if response.error.code:
+                error = f"GCV error {response.error.code}: {response.error.message}"
+                logger.warning(error)
+                l_annotations.append(([], error))
+                continue
+            bboxes = self.get_bounding_boxes(response)
+            l_annotations.append((self.encoder.restore_bboxes(bboxes, transform), None))
+        return l_annotations
+
     def _predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
+        l_chunks = [
+            images[idx : idx + self.batch_size]
+            for idx in range(0, len(images), self.batch_size)
+        ]
+        l_annotations = [
+            annotation
+            for l_chunk_annotations in self._executor.map(self._annotate, l_chunks)
+            for annotation in l_chunk_annotations
+        ]
         l_results = []
-        for image in images:
-            b64_img = cv2.imencode(".jpg", image)[1].tostring()
-            vision_image = vision.types.Image(content=b64_img)
-            response = self.model.document_text_detection(image=vision_image)
-            l_bboxes = self.get_bounding_boxes(response)
-            l_results.append(
-                DetectionResults(l_bboxes, width=image.shape[1], height=image.shape[0])
+        for image, (bboxes, error) in zip(images, l_annotations):
+            results = DetectionResults(
+                bboxes, width=image.shape[1], height=image.shape[0]
             )
+            results.error = error
+            l_results.append(results)
         return l_results
 
     @staticmethod
@@ -63,10 +286,95 @@ class GCVModel(DetectionModel):
         return bounding_boxes
 
 
-def load(path: Optional[str], model_kwargs: dict, **kwargs):
-    if path is not None:
-        credentials = service_account.Credentials.from_service_account_file(path)
-        model_kwargs["credentials"] = credentials
+def _make_annotation(text: str, x1: int, y1: int, x2: int, y2: int):
+    vertices = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+    return SimpleNamespace(
+        description=text,
+        bounding_poly=SimpleNamespace(
+            vertices=[SimpleNamespace(x=x, y=y) for x, y in vertices]
+        ),
+    )
+
+
+class FakeVisionClient:
+    """Offline stand-in for vision.ImageAnnotatorClient.
+
+    Answers batch_annotate_images and document_text_detection after
+    latency seconds, with one word per connected blob of dark pixels.
+    A fail_rate fraction of the calls raise ConnectionError, to exercise
+    the retries. Counts calls, images, failures and peak concurrency.
+
+    Example:
+        model = GCV_OCR(client=FakeVisionClient(latency=0.1, fail_rate=0.1))
+    """
+
+    def __init__(self, latency: float = 0.05, fail_rate: float = 0.0, seed=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.num_calls = 0
+        self.num_images = 0
+        self.num_failures = 0
+        self.max_concurrency = 0
+        self._concurrency = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _annotate_image(self, content: bytes):
+        image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_GRAYSCALE)
+        num_labels, _, stats, _ = cv2.connectedComponentsWithStats(
+            (image < 128).astype(np.uint8)
+        )
+        words = [
+            _make_annotation(f"word{idx}", x, y, x + w, y + h)
+            for idx, (x, y, w, h, _) in enumerate(stats[1:num_labels].tolist())
+        ]
+        h, w = image.shape
+        full_text = _make_annotation(" ".join(a.description for a in words), 0, 0, w, h)
+        return SimpleNamespace(
+            text_annotations=[full_text] + words if words else [],
+            error=SimpleNamespace(code=0, message=""),
+        )
+
+    def batch_annotate_images(self, requests: List[dict], **kwargs):
+        if len(requests) > MAX_BATCH_SIZE:
+            raise ValueError(f"At most {MAX_BATCH_SIZE} images per request.")
+        with self._lock:
+            self.num_calls += 1
+            self._concurrency += 1
+            self.max_concurrency = max(self.max_concurrency, self._concurrency)
+            fail = self._random.random() < self.fail_rate
+        try:
+            time.sleep(self.latency)
+            if fail:
+                with self._lock:
+                    self.num_failures += 1
+                raise ConnectionError("Fake Vision API unavailable")
+            responses = [
+                self._annotate_image(request["image"]["content"])
+                for request in requests
+            ]
+            with self._lock:
+                self.num_images += len(requests)
+            return SimpleNamespace(responses=responses)
+        finally:
+            with self._lock:
+                self._concurrency -= 1
+
+    def document_text_detection(self, image, **kwargs):
+        content = image["content"] if isinstance(image, dict) else image.content
+        request = {"image": {"content": content}}
+        return self.batch_annotate_images([request]).responses[0]
+
 
-    client = vision.ImageAnnotatorClient(credentials=credentials)
-    return GCVModel(client, path)
+def load(path: Optional[str], model_kwargs: dict, client=None, **kwargs):
+    """Creates an ImageAnnotatorClient with the service account file at path
+    (or the default credentials if path is None), unless a client is given.
+    kwargs (batch_size, max_in_flight, max_qps, max_retries, backoff,
+    encoder) are passed to GCVModel.
+    """
+    if client is None:
+        if path is not None:
+            credentials = service_account.Credentials.from_service_account_file(path)
+            model_kwargs["credentials"] = credentials
+        client = vision.ImageAnnotatorClient(**model_kwargs)
+    return GCVModel(client, path, **kwargs)
@@ -0,0 +1,275 @@
+import inspect
+import json
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+from loguru import logger
+
+from ocrtoolkit.integrations.doctr import (
+    DoctrDetModel,
+    DoctrRecModel,
+    get_out_map_module,
+    postprocess_det,
+    postprocess_rec,
+)
+from ocrtoolkit.wrappers.model import DetectionModel, RecognitionModel
+
+try:
+    from doctr.models.predictor.base import _OCRPredictor
+    from doctr.models.preprocessor import PreProcessor
+except ImportError:
+    logger.warning("Doctr is not installed.")
+
+META_KEY = "ocrtoolkit"
+GRAPH_OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+def create_session(
+    path: Union[str, Path],
+    device: str = "cpu",
+    intra_op_num_threads: int = 0,
+    inter_op_num_threads: int = 0,
+    graph_optimization_level: str = "all",
+    parallel_execution: bool = False,
+    optimized_model_path: Optional[str] = None,
+    providers: Optional[List[str]] = None,
+):
+    """Creates an onnxruntime InferenceSession
+    Thread counts of 0 let onnxruntime pick (one per physical core)
+    graph_optimization_level is one of disable, basic, extended, all
+    If optimized_model_path is set, the optimized graph is saved there
+    and can be loaded later with graph_optimization_level="disable"
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_num_threads
+    options.inter_op_num_threads = inter_op_num_threads
+    options.graph_optimization_level = getattr(
+        ort.GraphOptimizationLevel, GRAPH_OPT_LEVELS[graph_optimization_level]
+    )
+    options.execution_mode = (
+        ort.ExecutionMode.ORT_PARALLEL
+        if parallel_execution
+        else ort.ExecutionMode.ORT_SEQUENTIAL
+    )
+    if optimized_model_path is not None:
+        options.optimized_model_filepath = str(optimized_model_path)
+    if providers is None:
+        providers = ["CPUExecutionProvider"]
+        if device != "cpu":
+            providers.insert(0, "CUDAExecutionProvider")
+    return ort.InferenceSession(str(path), sess_options=options, providers=providers)
+
+
+def export_onnx(
+    model: Union[DoctrDetModel, DoctrRecModel],
+    path: Union[str, Path],
+    opset: int = 17,
+) -> str:
+    """Exports a loaded DOCTR_* model to ONNX
+    The batch dimension is dynamic, the spatial size is the one in model.cfg
+    The doctr model name, task, normalization and vocab are stored in the
+    ONNX metadata, so that the ONNX_DOCTR arch can rebuild the predictor
+    """
+    import onnx
+    import torch
+
+    task = "det" if isinstance(model, DetectionModel) else "rec"
+    doctr_model = model.model.cpu().eval()
+    input_shape = doctr_model.cfg["input_shape"]
+    dummy_input = torch.rand((1, *input_shape), dtype=torch.float32)
+    # the graph is traced (recent torch versions default to the dynamo
+    # exporter, which needs onnxscript)
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs["dynamo"] = False
+    # no_grad rather than inference_mode, which can break tracing in export
+    with torch.no_grad():
+        torch.onnx.export(
+            get_out_map_module(doctr_model),
+            dummy_input,
+            str(path),
+            input_names=["input"],
+            output_names=["out_map"],
+            dynamic_axes={"input": {0: "batch"}, "out_map": {0: "batch"}},
+            opset_version=opset,
+            do_constant_folding=True,
+            **export_kwargs,
+        )
+    model.model = doctr_model.to(model.device)
+
+    meta = {
+        "arch": model.arch,
+        "model_name": model.model_name,
+        "task": task,
+        "input_shape": list(input_shape),
+        "mean": list(doctr_model.cfg["mean"]),
+        "std": list(doctr_model.cfg["std"]),
+        "vocab": getattr(doctr_model, "vocab", None),
+    }
+    onnx_model = onnx.load(str(path))
+    prop = onnx_model.metadata_props.add()
+    prop.key, prop.value = META_KEY, json.dumps(meta)
+    onnx.save(onnx_model, str(path))
+    logger.info(f"Exported {model.arch} to {path}")
+    return str(path)
+
+
+class OnnxSessionMixin:
+    """Shared setup of the onnxruntime backed doctr models
+    The session replaces the torch model, preprocessing and postprocessing
+    are still done by doctr. postproc_model is an untrained doctr model
+    of the same architecture, only used for its postprocessor.
+    """
+
+    def _setup_session(self, postproc_model, meta: dict, kwargs: dict):
+        self.postproc_model = postproc_model
+        self.model_name = meta["model_name"]
+        self.input_name = self.model.get_inputs()[0].name
+        kwargs["mean"] = kwargs.get("mean", tuple(meta["mean"]))
+        kwargs["std"] = kwargs.get("std", tuple(meta["std"]))
+
+    def _map_location(self):
+        """Device is chosen through the session providers"""
+        pass
+
+    def _run_session(self, batch) -> np.ndarray:
+        return self.model.run(None, {self.input_name: batch.numpy()})[0]
+
+
+class OnnxDetModel(OnnxSessionMixin, DoctrDetModel):
+    """DoctrDetModel running an exported ONNX graph with onnxruntime"""
+
+    def __init__(self, session, postproc_model, path, meta, **kwargs):
+        DetectionModel.__init__(self, session, path)
+        self._setup_session(postproc_model, meta, kwargs)
+        kwargs["batch_size"] = kwargs.get("batch_size", 2)
+        self.doctr_base_predictor = _OCRPredictor()
+        self.pre_processor = PreProcessor(tuple(meta["input_shape"][1:]), **kwargs)
+
+    def _run_predictor(self, images: List[np.ndarray], **kwargs) -> List[dict]:
+        l_preds = []
+        for batch in self.pre_processor(images):
+            l_preds += postprocess_det(self.postproc_model, self._run_session(batch))
+        return l_preds
+
+
+def _session_module(onnx_model: "OnnxRecModel"):
+    """Wraps the session of onnx_model in a module that doctr's
+    RecognitionPredictor can run in place of the torch model
+    """
+    import torch
+
+    class OnnxSessionModule(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            # doctr predictors read the device and dtype of the first parameter
+            self.anchor = torch.nn.Parameter(torch.zeros(0), requires_grad=False)
+
+        def forward(self, x, return_model_output=False, return_preds=False, **kwargs):
+            out_map = onnx_model._run_session(x.cpu())
+            out = {}
+            if return_model_output:
+                out["out_map"] = torch.from_numpy(out_map)
+            if return_preds:
+                out["preds"] = postprocess_rec(onnx_model.postproc_model, out_map)
+            return out
+
+    return OnnxSessionModule()
+
+
+class OnnxRecModel(OnnxSessionMixin, DoctrRecModel):
+    """DoctrRecModel running an exported ONNX graph with onnxruntime
+    The session runs inside doctr's RecognitionPredictor, so wide crops
+    are split and merged back exactly as with the torch model
+    """
+
+    def __init__(self, session, postproc_model, path, meta, **kwargs):
+        from doctr.models.recognition.predictor import RecognitionPredictor
+
+        RecognitionModel.__init__(self, session, path)
+        kwargs.pop("vocab", None)
+        kwargs.pop("max_length", None)
+        self._setup_session(postproc_model, meta, kwargs)
+        kwargs["batch_size"] = kwargs.get("batch_size", 32)
+        self.pre_processor = PreProcessor(
+            tuple(meta["input_shape"][-2:]), preserve_aspect_ratio=True, **kwargs
+        )
+        self.predictor = RecognitionPredictor(self.pre_processor, _session_module(self))
+
+
+def check_parity(
+    ref_model: Union[DoctrDetModel, DoctrRecModel],
+    onnx_model: Union[OnnxDetModel, OnnxRecModel],
+    images: List[np.ndarray],
+    atol: float = 1e-3,
+) -> dict:
+    """Compares an ONNX model with the PyTorch model it was exported from
+    Returns the max abs difference of the raw output maps on the first
+    batch of images, and whether the final results agree:
+    same boxes (within 1px) for detection, same texts for recognition
+    """
+    import torch
+
+    batch = onnx_model.pre_processor(images)[0]
+    with torch.no_grad():
+        module = get_out_map_module(ref_model.model)
+        ref_out_map = module(batch.to(ref_model.device)).cpu().numpy()
+    max_abs_diff = float(np.abs(ref_out_map - onnx_model._run_session(batch)).max())
+
+    ref_results = ref_model.predict(images)
+    onnx_results = onnx_model.predict(images)
+    if isinstance(ref_model, DetectionModel):
+        results_match = all(
+            len(ref) == len(res)
+            and all(
+                np.allclose(a.values, b.values, atol=1)
+                for a, b in zip(ref.bboxes, res.bboxes)
+            )
+            for ref, res in zip(ref_results, onnx_results)
+        )
+    else:
+        results_match = all(
+            ref.text == res.text for ref, res in zip(ref_results, onnx_results)
+        )
+    report = {
+        "max_abs_diff": max_abs_diff,
+        "results_match": results_match,
+        "passed": max_abs_diff <= atol and results_match,
+    }
+    logger.info(f"ONNX parity: {report}")
+    return report
+
+
+def _build_postproc_model(meta: dict):
+    from doctr.models import detection, recognition
+
+    module = detection if meta["task"] == "det" else recognition
+    model_kwargs = {"vocab": meta["vocab"]} if meta.get("vocab") else {}
+    return module.__dict__[meta["model_name"]](
+        pretrained=False, pretrained_backbone=False, **model_kwargs
+    )
+
+
+def load(path: Optional[str], device: str, model_kwargs: dict, **kwargs):
+    """Loads a model exported with export_onnx.
+    model_kwargs are passed to create_session (threads, optimizations)
+    """
+    if path is None:
+        raise ValueError("Path to an exported .onnx file is required.")
+    session = create_session(path, device, **model_kwargs)
+    meta = json.loads(session.get_modelmeta().custom_metadata_map[META_KEY])
+    postproc_model = _build_postproc_model(meta)
+    if meta["task"] == "det":
+        return OnnxDetModel(session, postproc_model, path, meta, **kwargs)
+    elif meta["task"] == "rec":
+        return OnnxRecModel(session, postproc_model, path, meta, **kwargs)
+    else:
+        raise NotImplementedError(f"Task {meta['task']} is not supported.")
@@ -1,4 +1,10 @@
-from typing import List, Optional
+import queue
+import subprocess
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import List, Optional, Union
 
 import importlib_resources
 import numpy as np
@@ -15,7 +21,6 @@ except ImportError:
 
 
 from ocrtoolkit.utilities.network_utils import download_file
-from ocrtoolkit.wrappers.bbox import BBox
 from ocrtoolkit.wrappers.detection_results import DetectionResults
 from ocrtoolkit.wrappers.model import DetectionModel, RecognitionModel
 from ocrtoolkit.wrappers.recognition_results import RecognitionResults
@@ -28,40 +33,74 @@ DET_MODEL_URLS = {
 
 
 class PaddleOCRDetModel(DetectionModel):
-    def _predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
-        import torch
+    """Paddle TextDetector wrapper
+    A TextDetector runs one image per call, so images are dispatched
+    concurrently to a pool of TextDetector instances (the model and the
+    optional extra_predictors), each owning its own paddle predictor.
+    The thread pool is shut down by close(), or once the model is
+    garbage collected.
+    """
+
+    def __init__(self, model, path, device="cpu", extra_predictors=None, **kwargs):
+        super().__init__(model, path, device, **kwargs)
+        self.predictors = [model] + list(extra_predictors or [])
+        self._pool = queue.SimpleQueue()
+        for predictor in self.predictors:
+            self._pool.put(predictor)
+        self._executor = None
+        if len(self.predictors) > 1:
+            self._executor = ThreadPoolExecutor(
+                len(self.predictors), thread_name_prefix="ppocr_det"
+            )
+            # the finalizer holds the executor only, not the model
+            self._finalizer = weakref.finalize(
+                self, self._executor.shutdown, wait=False
+            )
 
-        l_results = []
+    def close(self):
+        """Shuts down the thread pool, later predictions run serially"""
+        if self._executor is not None:
+            self._finalizer()
+            self._executor = None
 
-        for image in images:
-            with torch.inference_mode():
-                preds, _ = self.model(image, **kwargs)
-            logger.info(preds.shape)
-            l_bboxes = self.get_bounding_boxes(preds)
-            l_results.append(
-                DetectionResults(l_bboxes, width=image.shape[1], height=image.shape[0])
-            )
-        return l_results
+    def _map_location(self):
+        """Device is chosen at load time through use_gpu"""
+        pass
+
+    def _detect_one(self, image: np.ndarray, **kwargs) -> DetectionResults:
+        predictor = self._pool.get()
+        try:
+            preds, elapsed = predictor(image, **kwargs)
+        finally:
+            self._pool.put(predictor)
+        logger.debug("PaddleOCR det: {} boxes in {:.3f}s", len(preds), elapsed)
+        return DetectionResults.from_arrays(
+            self.get_bounding_boxes(preds),
+            width=image.shape[1],
+            height=image.shape[0],
+        )
+
+    def _predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
+        if self._executor is None or len(images) == 1:
+            return [self._detect_one(image, **kwargs) for image in images]
+        return list(self._executor.map(partial(self._detect_one, **kwargs), images))
 
     @staticmethod
-    def get_bounding_boxes(dt_boxes):
-        """Returns BBox objects from numpy polygon results
+    def get_bounding_boxes(dt_boxes: np.ndarray) -> np.ndarray:
+        """Returns xyxy boxes from numpy polygon results
         dt_boxes shape: nx4x2
         Use only numpy operations and no for loops
-        return: list of BBox
+        return: nx4 array of x1, y1, x2, y2
         """
-        dt_boxes_reshaped = dt_boxes.reshape(-1, 2, 4)
-        x_min = np.min(dt_boxes_reshaped[:, :, 0], axis=1)
-        y_min = np.min(dt_boxes_reshaped[:, :, 1], axis=1)
-        x_max = np.max(dt_boxes_reshaped[:, :, 0], axis=1)
-        y_max = np.max(dt_boxes_reshaped[:, :, 1], axis=1)
-
-        xyxy_boxes = np.stack((x_min, y_min, x_max, y_max), axis=1)
-
-        return [BBox.from_numpy(bbox) for bbox in xyxy_boxes]
+        dt_boxes = np.asarray(dt_boxes).reshape(-1, 4, 2)
+        return np.concatenate((dt_boxes.min(axis=1), dt_boxes.max(axis=1)), axis=1)
 
 
 class PaddleOCRRecModel(RecognitionModel):
+    def _map_location(self):
+        """Device is chosen at load time through use_gpu"""
+        pass
+
     def _predict(self, images: List[np.ndarray], **kwargs) -> List[RecognitionResults]:
         import torch
 
@@ -78,6 +117,35 @@ class PaddleOCRRecModel(RecognitionModel):
         return l_results
 
 
+def export_onnx(
+    model_dir: Union[str, Path], path: Union[str, Path], opset: int = 11
+) -> str:
+    """Converts a paddle inference dir (as used by PPOCR_* archs) to ONNX
+    Requires paddle2onnx. The resulting file can be loaded back with
+    the same PPOCR_* arch, e.g. PPOCR_DBNET(path="det.onnx")
+    """
+    subprocess.run(
+        [
+            "paddle2onnx",
+            "--model_dir",
+            str(model_dir),
+            "--model_filename",
+            "inference.pdmodel",
+            "--params_filename",
+            "inference.pdiparams",
+            "--save_file",
+            str(path),
+            "--opset_version",
+            str(opset),
+            "--enable_onnx_checker",
+            "True",
+        ],
+        check=True,
+    )
+    logger.info(f"Exported {model_dir} to {path}")
+    return str(path)
+
+
 def load(
     task: str,
     model_name: str,
@@ -86,6 +154,12 @@ def load(
     model_kwargs: dict,
     **kwargs,
 ):
+    """Loads a PaddleOCR inference model
+    model_kwargs update the paddleocr args (e.g. cpu_threads, use_tensorrt)
+    For detection, num_workers > 1 creates that many TextDetector
+    instances run concurrently on a thread pool. Lower cpu_threads
+    accordingly to avoid oversubscribing the cores.
+    """
     if path is None:
         try:
             path = download_file(
@@ -95,6 +169,9 @@ def load(
             raise ValueError(f"No pretrained model for {model_name}.") from e
 
     model_kwargs["use_gpu"] = device != "cpu"
+    if str(path).endswith(".onnx"):
+        # paddleocr runs .onnx graphs with onnxruntime
+        model_kwargs["use_onnx"] = True
     model_kwargs["rec_char_dict_path"] = model_kwargs.get(
         "rec_char_dict_path", EN_DICT_FILE
     )
@@ -107,15 +184,18 @@ def load(
         from paddleocr.tools.infer import predict_det
 
         dict_args["det_model_dir"] = path
-        logger.info(all_args)
-        predictor = predict_det.TextDetector(all_args)
-        return PaddleOCRDetModel(predictor, path, device, **kwargs)
+        logger.debug(all_args)
+        num_workers = kwargs.pop("num_workers", 1)
+        predictors = [predict_det.TextDetector(all_args) for _ in range(num_workers)]
+        return PaddleOCRDetModel(
+            predictors[0], path, device, extra_predictors=predictors[1:], **kwargs
+        )
 
     elif task == "rec":
         from paddleocr.tools.infer import predict_rec
 
         dict_args["rec_model_dir"] = path
-        logger.info(all_args)
+        logger.debug(all_args)
         predictor = predict_rec.TextRecognizer(all_args)
         return PaddleOCRRecModel(predictor, path, device, **kwargs)
 
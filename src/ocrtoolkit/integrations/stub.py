@@ -0,0 +1,92 @@
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel, RecognitionModel
+from ocrtoolkit.wrappers.recognition_results import RecognitionResults
+
+
+class StubMixin:
+    """Simulated inference cost: per_batch + per_image * len(images) seconds
+    Spent sleeping, or busy-waiting on the CPU if busy is True
+    """
+
+    per_batch: float = 0.0
+    per_image: float = 0.0
+    busy: bool = False
+
+    def _map_location(self):
+        pass
+
+    def _spend(self, num_images: int):
+        cost = self.per_batch + self.per_image * num_images
+        if not self.busy:
+            time.sleep(cost)
+            return
+        end = time.perf_counter() + cost
+        while time.perf_counter() < end:
+            pass
+
+
+class StubDetModel(StubMixin, DetectionModel):
+    """Detector without weights, for testing pipelines and benchmarks
+    Returns one box per connected run of dark rows (a crude text line finder)
+    """
+
+    def __init__(self, path=None, per_batch=0.0, per_image=0.0, busy=False):
+        super().__init__(model=None, path=path)
+        self.per_batch = per_batch
+        self.per_image = per_image
+        self.busy = busy
+
+    def _predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
+        self._spend(len(images))
+        l_results = []
+        for image in images:
+            gray = image.min(axis=2) if image.ndim == 3 else image
+            dark_rows = np.concatenate([[0], (gray < 128).any(axis=1), [0]])
+            edges = np.flatnonzero(np.diff(dark_rows.astype(np.int8)))
+            ys = edges.reshape(-1, 2)
+            coords = np.zeros((len(ys), 4))
+            coords[:, 1], coords[:, 3] = ys[:, 0], ys[:, 1]
+            coords[:, 2] = image.shape[1]
+            l_results.append(
+                DetectionResults.from_arrays(coords, image.shape[1], image.shape[0])
+            )
+        return l_results
+
+
+class StubRecModel(StubMixin, RecognitionModel):
+    """Recognizer without weights, for testing pipelines and benchmarks
+    Returns the crop size as text, e.g. "32x128", with confidence 1.0
+    """
+
+    def __init__(self, path=None, per_batch=0.0, per_image=0.0, busy=False):
+        super().__init__(model=None, path=path)
+        self.per_batch = per_batch
+        self.per_image = per_image
+        self.busy = busy
+
+    def _predict(self, images: List[np.ndarray], **kwargs) -> List[RecognitionResults]:
+        self._spend(len(images))
+        return [
+            RecognitionResults(
+                f"{image.shape[0]}x{image.shape[1]}",
+                1.0,
+                width=image.shape[1],
+                height=image.shape[0],
+            )
+            for image in images
+        ]
+
+
+def load(task: str, path: Optional[str], model_kwargs: dict, **kwargs):
+    """model_kwargs: per_batch, per_image (seconds) and busy"""
+    if task == "det":
+        return StubDetModel(path, **model_kwargs)
+    elif task == "rec":
+        return StubRecModel(path, **model_kwargs)
+    else:
+        raise NotImplementedError(f"Task {task} is not supported.")
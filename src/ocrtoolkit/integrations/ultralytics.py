@@ -2,7 +2,6 @@ from typing import List, Optional
 
 import numpy as np
 
-from ocrtoolkit.wrappers.bbox import BBox
 from ocrtoolkit.wrappers.detection_results import DetectionResults
 from ocrtoolkit.wrappers.model import DetectionModel
 
@@ -16,15 +15,15 @@ class UltralyticsModel(DetectionModel):
         for image, preds in zip(images, l_preds):
             np_preds = preds.cpu().numpy()
             d_names = np_preds.names
-            l_coords = np_preds.boxes.xyxy.tolist()
-            l_confs = np_preds.boxes.conf.tolist()
-            l_labels = [d_names[int(i)] for i in np_preds.boxes.cls]
-            l_bboxes = [
-                BBox(*bbox, conf=conf, label=label, normalized=False)
-                for bbox, conf, label in zip(l_coords, l_confs, l_labels)
-            ]
+            names = np.array([d_names[i] for i in range(len(d_names))])
             l_results.append(
-                DetectionResults(l_bboxes, width=image.shape[1], height=image.shape[0])
+                DetectionResults.from_arrays(
+                    np_preds.boxes.xyxy,
+                    width=image.shape[1],
+                    height=image.shape[0],
+                    confs=np_preds.boxes.conf,
+                    labels=names[np_preds.boxes.cls.astype(int)],
+                )
             )
         return l_results
 
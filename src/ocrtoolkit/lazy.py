@@ -0,0 +1,38 @@
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def attach(
+    package: str, submodules: Dict[str, List[str]]
+) -> Tuple[Callable, Callable, List[str]]:
+    """Lazy loading of the names of a package (PEP 562)
+    submodules maps each submodule to the names it exports. A submodule is
+    only imported when one of its names (or itself) is first accessed.
+    Like star imports, later submodules win on duplicate names, and names
+    win over submodules (unless that submodule was imported first, as
+    importing a submodule sets it on the package).
+    Returns __getattr__, __dir__ and __all__ for the package
+
+    Example (in a package __init__):
+        __getattr__, __dir__, __all__ = attach(__name__, {"bbox": ["BBox"]})
+    """
+    name_to_module = {
+        name: module for module, names in submodules.items() for name in names
+    }
+
+    def __getattr__(name: str):
+        module = name_to_module.get(name)
+        if module is None:
+            if name in submodules:
+                return importlib.import_module(f"{package}.{name}")
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(f"{package}.{module}"), name)
+        # cached, later lookups skip __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(name_to_module))
+
+    return __getattr__, __dir__, list(name_to_module)
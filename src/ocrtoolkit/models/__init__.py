@@ -1 +1,52 @@
-from .arch import *
+from typing import TYPE_CHECKING
+
+from ocrtoolkit.lazy import attach
+
+if TYPE_CHECKING:
+    from .arch import *
+    from .cascade import *
+    from .registry import *
+
+# submodules are imported on first access of one of their names
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "arch": [
+            "BaseArch",
+            "ArchitectureFactory",
+            "factory",
+            "UL_YOLOV8",
+            "UL_RTDETR",
+            "DOCTR_CRNN_VGG16",
+            "DOCTR_CRNN_MOBILENET_L",
+            "DOCTR_CRNN_MOBILENET_S",
+            "DOCTR_PARSEQ",
+            "DOCTR_VITSTR_S",
+            "DOCTR_VITSTR_B",
+            "DOCTR_DB_RESNET50",
+            "DOCTR_DB_RESNET34",
+            "DOCTR_DB_MOBILENET_L",
+            "DOCTR_FAST_T",
+            "DOCTR_FAST_S",
+            "DOCTR_FAST_B",
+            "PPOCR_SVTR_LCNET",
+            "PPOCR_DBNET",
+            "ONNX_DOCTR",
+            "GCV_OCR",
+            "STUB_DET",
+            "STUB_REC",
+            "list_archs",
+            "get_arch",
+        ],
+        "cascade": [
+            "CascadeStats",
+            "RecognitionCascade",
+            "ink_coverage",
+            "DetectionCascade",
+        ],
+        "registry": ["ModelRegistry", "registry"],
+    },
+)
+
+# the registry instance shadows its submodule, as with the former star import
+from .registry import registry  # noqa: E402
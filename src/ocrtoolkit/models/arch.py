@@ -1,5 +1,7 @@
 import importlib
 
+from ocrtoolkit.models.registry import registry
+
 
 class BaseArch(type):
     """Base class for all architectures."""
@@ -15,8 +17,21 @@ class ArchitectureFactory:
     def create_arch_class(class_name, framework_module, model_name=None, task=None):
         """Create an architecture class dynamically."""
 
-        def load(path=None, device="cpu", model_kwargs=None, **kwargs):
-            """Load the model with the specified configuration."""
+        def load(path=None, device="cpu", model_kwargs=None, shared=None, **kwargs):
+            """Load the model with the specified configuration.
+            If shared is True (default: registry.share_by_default), the model
+            is taken from the in-process registry, and loaded only once.
+            Call registry.release(model) when done with a shared model.
+            """
+            if shared is None:
+                shared = registry.share_by_default
+            if shared:
+                key = registry.make_key(
+                    class_name, path, device, model_kwargs, **kwargs
+                )
+                return registry.acquire(
+                    key, lambda: load(path, device, model_kwargs, False, **kwargs)
+                )
 
             framework = importlib.import_module(
                 f"ocrtoolkit.integrations.{framework_module}"
@@ -39,7 +54,15 @@ class ArchitectureFactory:
                 load_kwargs["task"] = task
                 load_kwargs["device"] = device
 
-            return framework.load(**load_kwargs)
+            elif class_name.startswith("ONNX_"):
+                load_kwargs["device"] = device
+
+            elif class_name.startswith("STUB_"):
+                load_kwargs["task"] = task
+
+            model = framework.load(**load_kwargs)
+            model.arch = class_name
+            return model
 
         return type(class_name, (BaseArch,), {"load": staticmethod(load)})
 
@@ -90,5 +113,30 @@ PPOCR_SVTR_LCNET = factory.create_arch_class(
 # paddleocr detection
 PPOCR_DBNET = factory.create_arch_class("PPOCR_DBNET", "paddleocr", "DB", "det")
 
+# onnxruntime, any DOCTR_* model exported with integrations.onnx.export_onnx
+ONNX_DOCTR = factory.create_arch_class("ONNX_DOCTR", "onnx")
+
 # gcv
 GCV_OCR = factory.create_arch_class("GCV_OCR", "gcv")
+
+# stubs without weights, for tests and benchmarks
+STUB_DET = factory.create_arch_class("STUB_DET", "stub", task="det")
+STUB_REC = factory.create_arch_class("STUB_REC", "stub", task="rec")
+
+
+def list_archs() -> list:
+    """Returns the names of all the available architectures"""
+    return sorted(
+        name
+        for name, value in globals().items()
+        if isinstance(value, type)
+        and issubclass(value, BaseArch)
+        and value is not BaseArch
+    )
+
+
+def get_arch(name: str):
+    """Returns the architecture class with the given name, e.g. DOCTR_PARSEQ"""
+    if name.upper() not in list_archs():
+        raise ValueError(f"Unknown arch {name}. Available: {', '.join(list_archs())}")
+    return globals()[name.upper()]
@@ -0,0 +1,260 @@
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from ocrtoolkit.utilities.cache_utils import get_model_identity
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel, RecognitionModel
+from ocrtoolkit.wrappers.recognition_results import RecognitionResults
+
+
+class CascadeStats:
+    """Counters of a cascade: images seen, images escalated
+    and time spent in each stage
+    """
+
+    num_images: int
+    num_escalated: int
+    time_fast: float
+    time_strong: float
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.num_images = 0
+        self.num_escalated = 0
+        self.time_fast = 0.0
+        self.time_strong = 0.0
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.num_escalated / self.num_images if self.num_images else 0.0
+
+    def to_dict(self) -> dict:
+        num_images = max(self.num_images, 1)
+        return {
+            "num_images": self.num_images,
+            "num_escalated": self.num_escalated,
+            "escalation_rate": self.escalation_rate,
+            "time_fast": self.time_fast,
+            "time_strong": self.time_strong,
+            "ms_per_image": 1000 * (self.time_fast + self.time_strong) / num_images,
+        }
+
+    def __repr__(self):
+        return str(self.to_dict())
+
+
+def _fn_name(fn: Optional[Callable]) -> Optional[str]:
+    if fn is None:
+        return None
+    return f"{fn.__module__}.{getattr(fn, '__qualname__', repr(fn))}"
+
+
+class RecognitionCascade(RecognitionModel):
+    """Recognizer running a fast model on all crops and a strong model
+    only on the crops the fast model is unsure about.
+
+    A crop is escalated if its confidence is below conf_thresh, or if
+    reject_fn(result) returns True (e.g. a regex the text must match).
+    Escalated crops are sent to the strong model in a single batch and
+    the results are merged back in input order.
+    If keep_best is True, the fast result is kept when the strong model
+    is even less confident. Statistics are accumulated in self.stats.
+
+    Example:
+        cascade = RecognitionCascade(DOCTR_CRNN_MOBILENET_S(), DOCTR_PARSEQ())
+    """
+
+    def __init__(
+        self,
+        fast_model: RecognitionModel,
+        strong_model: RecognitionModel,
+        conf_thresh: float = 0.8,
+        reject_fn: Optional[Callable[[RecognitionResults], bool]] = None,
+        keep_best: bool = False,
+    ):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.conf_thresh = conf_thresh
+        self.reject_fn = reject_fn
+        self.keep_best = keep_best
+        self.valid_kwargs = fast_model.valid_kwargs | strong_model.valid_kwargs
+        self.stats = CascadeStats()
+        super().__init__(model=None, path=None, device=fast_model.device)
+
+    def _map_location(self):
+        pass
+
+    def preprocess(self, images: List[np.ndarray], **kwargs) -> List[np.ndarray]:
+        """Returns images as is, each model preprocesses the crops it runs on"""
+        return images
+
+    def identity(self, **kwargs) -> str:
+        """Cache identity, from both models and the escalation options"""
+        return repr(
+            (
+                self.__class__.__name__,
+                get_model_identity(self.fast_model, **kwargs),
+                get_model_identity(self.strong_model, **kwargs),
+                self.conf_thresh,
+                _fn_name(self.reject_fn),
+                self.keep_best,
+            )
+        )
+
+    def escalate(self, result: RecognitionResults) -> bool:
+        """Returns True if the strong model should re-run this crop"""
+        if result.conf < self.conf_thresh:
+            return True
+        return self.reject_fn is not None and bool(self.reject_fn(result))
+
+    def _predict(self, images: List[np.ndarray], **kwargs) -> List[RecognitionResults]:
+        start = time.perf_counter()
+        l_results = self.fast_model.predict(
+            self.fast_model.preprocess(images), **kwargs
+        )
+        self.stats.time_fast += time.perf_counter() - start
+        self.stats.num_images += len(images)
+
+        escalate_idxs = [
+            idx for idx, result in enumerate(l_results) if self.escalate(result)
+        ]
+        if not escalate_idxs:
+            return l_results
+
+        start = time.perf_counter()
+        l_strong = self.strong_model.predict(
+            self.strong_model.preprocess([images[idx] for idx in escalate_idxs]),
+            **kwargs,
+        )
+        self.stats.time_strong += time.perf_counter() - start
+        self.stats.num_escalated += len(escalate_idxs)
+
+        for idx, strong in zip(escalate_idxs, l_strong):
+            if not self.keep_best or strong.conf >= l_results[idx].conf:
+                l_results[idx] = strong
+        return l_results
+
+
+def ink_coverage(image: np.ndarray, results: DetectionResults, ink_thresh=128, step=4):
+    """Returns the fraction of ink pixels (darker than ink_thresh)
+    lying inside the detected boxes, computed on a 1/step subsampled page
+    Returns 1.0 for pages without ink
+    """
+    gray = image[::step, ::step]
+    if gray.ndim == 3:
+        gray = gray.mean(axis=2)
+    ink = gray < ink_thresh
+    num_ink = ink.sum()
+    if num_ink == 0:
+        return 1.0
+    covered = np.zeros_like(ink)
+    for bbox in results.bboxes:
+        covered[
+            bbox.y1 // step : -(-bbox.y2 // step), bbox.x1 // step : -(-bbox.x2 // step)
+        ] = True
+    return float((ink & covered).sum() / num_ink)
+
+
+class DetectionCascade(DetectionModel):
+    """Detector running a cheap model on all pages and an expensive model
+    only on the pages whose cheap results look poor.
+
+    A page is escalated if any of the enabled checks fails:
+        * min_mean_conf: mean box confidence below this value
+        * min_ink_coverage: fraction of the ink inside the detected boxes
+          below this value, i.e. too few boxes for the ink on the page
+        * escalate_fn(image, results): custom predicate returning True
+    Pages without any box are always escalated.
+    All escalated pages of a predict call go to the expensive model in one
+    batch, so use batched datasets (e.g. detect_and_save_h5) to keep the
+    big model at full batch efficiency. Statistics are in self.stats.
+
+    Example:
+        cascade = DetectionCascade(DOCTR_FAST_T(), DOCTR_DB_RESNET50())
+    """
+
+    def __init__(
+        self,
+        fast_model: DetectionModel,
+        strong_model: DetectionModel,
+        min_mean_conf: Optional[float] = 0.5,
+        min_ink_coverage: Optional[float] = 0.8,
+        escalate_fn: Optional[Callable[[np.ndarray, DetectionResults], bool]] = None,
+        ink_thresh: int = 128,
+    ):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.min_mean_conf = min_mean_conf
+        self.min_ink_coverage = min_ink_coverage
+        self.escalate_fn = escalate_fn
+        self.ink_thresh = ink_thresh
+        self.valid_kwargs = fast_model.valid_kwargs | strong_model.valid_kwargs
+        self.stats = CascadeStats()
+        super().__init__(model=None, path=None, device=fast_model.device)
+
+    def _map_location(self):
+        pass
+
+    def preprocess(self, images: List[np.ndarray], **kwargs) -> List[np.ndarray]:
+        """Returns images as is, each model preprocesses the pages it runs on"""
+        return images
+
+    def identity(self, **kwargs) -> str:
+        """Cache identity, from both models and the escalation options"""
+        return repr(
+            (
+                self.__class__.__name__,
+                get_model_identity(self.fast_model, **kwargs),
+                get_model_identity(self.strong_model, **kwargs),
+                self.min_mean_conf,
+                self.min_ink_coverage,
+                _fn_name(self.escalate_fn),
+                self.ink_thresh,
+                self.tiling,
+            )
+        )
+
+    def escalate(self, image: np.ndarray, results: DetectionResults) -> bool:
+        """Returns True if the strong model should re-run this page"""
+        if len(results) == 0:
+            return True
+        if self.min_mean_conf is not None:
+            if np.mean([bbox.conf for bbox in results.bboxes]) < self.min_mean_conf:
+                return True
+        if self.min_ink_coverage is not None:
+            coverage = ink_coverage(image, results, ink_thresh=self.ink_thresh)
+            if coverage < self.min_ink_coverage:
+                return True
+        return self.escalate_fn is not None and bool(self.escalate_fn(image, results))
+
+    def _predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
+        start = time.perf_counter()
+        l_results = self.fast_model.predict(
+            self.fast_model.preprocess(images), **kwargs
+        )
+        self.stats.time_fast += time.perf_counter() - start
+        self.stats.num_images += len(images)
+
+        escalate_idxs = [
+            idx
+            for idx, (image, results) in enumerate(zip(images, l_results))
+            if self.escalate(image, results)
+        ]
+        if not escalate_idxs:
+            return l_results
+
+        start = time.perf_counter()
+        l_strong = self.strong_model.predict(
+            self.strong_model.preprocess([images[idx] for idx in escalate_idxs]),
+            **kwargs,
+        )
+        self.stats.time_strong += time.perf_counter() - start
+        self.stats.num_escalated += len(escalate_idxs)
+
+        for idx, strong in zip(escalate_idxs, l_strong):
+            l_results[idx] = strong
+        return l_results
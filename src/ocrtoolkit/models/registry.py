@@ -0,0 +1,155 @@
+import gc
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+
+class _Entry:
+    def __init__(self, model):
+        self.model = model
+        self.refcount = 0
+
+
+class ModelRegistry:
+    """Registry of the models loaded in this process.
+
+    Models are keyed by arch, path, device and load kwargs, loading the
+    same key twice returns the already loaded instance instead of
+    rebuilding the network and reading the weights again.
+    Each acquire increments a refcount, release decrements it.
+    Released models stay loaded for reuse until they are unloaded
+    explicitly, or evicted (least recently used first) once more than
+    max_models are loaded. Models still in use are never evicted.
+    Unloaded and evicted models are closed, if they have a close method.
+    Shared instances are shared state: calls like set_tiling affect
+    every user of the model.
+    """
+
+    max_models: Optional[int]
+    share_by_default: bool
+
+    def __init__(self, max_models: Optional[int] = None, share_by_default=False):
+        self.max_models = max_models
+        self.share_by_default = share_by_default
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(arch: str, path, device: str, model_kwargs=None, **kwargs) -> str:
+        return repr(
+            (
+                arch,
+                str(path),
+                device,
+                sorted((k, repr(v)) for k, v in (model_kwargs or {}).items()),
+                sorted((k, repr(v)) for k, v in kwargs.items()),
+            )
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str):
+        return key in self._entries
+
+    def _find(self, key_or_model) -> Optional[str]:
+        if isinstance(key_or_model, str):
+            return key_or_model if key_or_model in self._entries else None
+        for key, entry in self._entries.items():
+            if entry.model is key_or_model:
+                return key
+        return None
+
+    def acquire(self, key: str, loader: Callable[[], Any]):
+        """Returns the model registered under key, loading it if needed
+        The load runs under the registry lock, so concurrent threads
+        asking for the same model load it only once.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(loader())
+                self._entries[key] = entry
+                logger.info(f"Registered model {key}")
+            else:
+                logger.debug(f"Reusing model {key}")
+            self._entries.move_to_end(key)
+            entry.refcount += 1
+            self._evict()
+            return entry.model
+
+    def release(self, key_or_model):
+        """Marks one user of the model as done with it"""
+        with self._lock:
+            key = self._find(key_or_model)
+            if key is None:
+                return
+            entry = self._entries[key]
+            entry.refcount = max(entry.refcount - 1, 0)
+            self._evict()
+
+    def refcount(self, key_or_model) -> int:
+        key = self._find(key_or_model)
+        return self._entries[key].refcount if key is not None else 0
+
+    def unload(self, key_or_model=None, force=False):
+        """Unloads a model, or all unused models if key_or_model is None
+        Models still in use are only unloaded if force is True.
+        """
+        with self._lock:
+            if key_or_model is None:
+                keys = list(self._entries)
+            else:
+                keys = [key for key in [self._find(key_or_model)] if key is not None]
+            for key in keys:
+                if force or self._entries[key].refcount == 0:
+                    self._close(self._entries.pop(key).model)
+                    logger.info(f"Unloaded model {key}")
+        self._free_memory()
+
+    def _evict(self):
+        if self.max_models is None:
+            return
+        unused = [key for key, entry in self._entries.items() if entry.refcount == 0]
+        num_evicted = 0
+        for key in unused[: max(len(self._entries) - self.max_models, 0)]:
+            self._close(self._entries.pop(key).model)
+            num_evicted += 1
+            logger.info(f"Evicted model {key}")
+        if num_evicted:
+            self._free_memory()
+
+    @staticmethod
+    def _close(model):
+        """Releases the resources (e.g. thread pools) of models having a close"""
+        close = getattr(model, "close", None)
+        if callable(close):
+            close()
+
+    @staticmethod
+    def _free_memory():
+        gc.collect()
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    @contextmanager
+    def use(self, arch, **kwargs):
+        """Context manager acquiring a shared arch(**kwargs) model
+        and releasing it on exit
+        """
+        model = arch(shared=True, **kwargs)
+        try:
+            yield model
+        finally:
+            self.release(model)
+
+
+registry = ModelRegistry()
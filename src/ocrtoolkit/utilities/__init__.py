@@ -1,10 +1,126 @@
-from .det_utils import *
-from .draw_utils import *
-from .ds_utils import *
-from .eval_utils import *
-from .geometry_utils import *
-from .img_utils import *
-from .io_utils import *
-from .misc_utils import *
-from .model_utils import *
-from .network_utils import *
+from typing import TYPE_CHECKING
+
+from ocrtoolkit.lazy import attach
+
+if TYPE_CHECKING:
+    from .cache_utils import *
+    from .det_utils import *
+    from .draw_utils import *
+    from .ds_utils import *
+    from .eval_utils import *
+    from .geometry_utils import *
+    from .img_utils import *
+    from .instrument_utils import *
+    from .io_utils import *
+    from .memory_utils import *
+    from .metrics_utils import *
+    from .misc_utils import *
+    from .model_utils import *
+    from .network_utils import *
+
+# submodules are imported on first access of one of their names
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "cache_utils": ["hash_file", "hash_image", "get_model_identity", "ResultCache"],
+        "det_utils": [
+            "write_dets",
+            "save_dets",
+            "save_dets_as_label_studio",
+            "load_dets",
+            "export_annotated",
+        ],
+        "draw_utils": [
+            "FONT_PATH",
+            "draw_bbox",
+            "draw_bboxes",
+            "get_font",
+            "fit_font_size",
+            "draw_ocr_text",
+            "draw_ocr_sheet",
+        ],
+        "ds_utils": ["concat_ds"],
+        "eval_utils": [
+            "COCO_IOU_THRESHOLDS",
+            "compare_dataframes",
+            "compare_rec_models",
+            "match_detections",
+            "evaluate_detections",
+        ],
+        "geometry_utils": ["estimate_page_angle", "remap_boxes", "rotate_boxes"],
+        "img_utils": [
+            "tfm_identity",
+            "tfm_to_pil",
+            "tfm_to_gray",
+            "tfm_to_size",
+            "tfm_to_3ch",
+            "cv2_tfm_to_3ch",
+            "pil_to_bytes",
+            "bytes_to_pil",
+            "apply_ops",
+        ],
+        "instrument_utils": [
+            "NULL_TRACE",
+            "BatchTrace",
+            "add_hook",
+            "remove_hook",
+            "instrument",
+            "set_memory_tracking",
+            "trace_batch",
+            "HistogramSink",
+            "SummarySink",
+            "JsonlSink",
+        ],
+        "io_utils": [
+            "extract_files",
+            "convert_tif_to_jpg",
+            "get_files",
+            "change_suffixes",
+            "FileLock",
+        ],
+        "memory_utils": [
+            "get_rss",
+            "get_peak_rss",
+            "PeakRSSMonitor",
+            "MemoryBudget",
+            "AdaptiveBatchSize",
+        ],
+        "metrics_utils": [
+            "CONTENT_TYPE",
+            "LATENCY_BUCKETS",
+            "RATIO_BUCKETS",
+            "Counter",
+            "Histogram",
+            "MetricsRegistry",
+            "MetricsSink",
+            "MetricsServer",
+        ],
+        "misc_utils": [
+            "get_uuid",
+            "is_var_file",
+            "is_var_dir",
+            "is_var_single_image",
+            "is_var_list_images",
+            "get_samples",
+            "filter_list",
+            "partition_list",
+        ],
+        "model_utils": [
+            "load_state_dict",
+            "reparameterize",
+            "quantized_engine",
+            "quantize_int8",
+            "hash_state_dict",
+            "compile_module",
+        ],
+        "network_utils": [
+            "RETRYABLE_ERRORS",
+            "retrieve_file",
+            "hash_file_sha256",
+            "verify_file_integrity",
+            "download_file",
+            "RateLimiter",
+            "retry_call",
+        ],
+    },
+)
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import numpy as np
 
@@ -60,3 +60,94 @@ def resolve_lines(boxes: np.ndarray, paragraph_break: float) -> List[List[int]]:
         lines.extend(resolve_sub_lines(boxes, words, paragraph_break))
 
     return lines
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray, metric="iou") -> np.ndarray:
+    """Pairwise overlap of (N, 4) and (M, 4) xyxy boxes, returns (N, M)
+    metric="iou": intersection over union
+    metric="ios": intersection over the area of the smaller box,
+    which also matches a box truncated by a tile edge to its full version
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bot_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = np.clip(bot_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    if metric == "iou":
+        denom = area_a[:, None] + area_b[None, :] - inter
+    elif metric == "ios":
+        denom = np.minimum(area_a[:, None], area_b[None, :])
+    else:
+        raise ValueError(f"Unknown metric {metric}")
+    return inter / np.maximum(denom, 1e-6)
+
+
+def nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    iou_thresh=0.5,
+    labels: Optional[np.ndarray] = None,
+    metric="iou",
+    return_groups=False,
+):
+    """Greedy non maximum suppression on (N, 4) xyxy boxes
+    If labels (N,) are given, boxes of different labels never suppress
+    each other. Returns the kept indices, by decreasing score.
+    If return_groups is True, also returns for each kept index
+    the indices it suppressed (itself included).
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(boxes) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return (empty, []) if return_groups else empty
+    if labels is not None:
+        # shift each label to its own region so that labels never overlap
+        _, label_ids = np.unique(labels, return_inverse=True)
+        offset = label_ids.reshape(-1) * (boxes.max() - boxes.min() + 1)
+        boxes = boxes + offset[:, None]
+
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    keep, groups = [], []
+    while order.size:
+        idx = order[0]
+        overlaps = box_iou(boxes[idx], boxes[order[1:]], metric=metric)[0]
+        suppressed = overlaps > iou_thresh
+        keep.append(idx)
+        groups.append(np.concatenate(([idx], order[1:][suppressed])))
+        order = order[1:][~suppressed]
+    keep = np.array(keep, dtype=np.int64)
+    return (keep, groups) if return_groups else keep
+
+
+def get_tile_boxes(width: int, height: int, tile_size: Tuple[int, int], overlap=0.2):
+    """Returns (K, 4) xyxy tiles covering a width x height image, row major
+    Neighbouring tiles overlap by overlap * tile_size pixels and
+    the last tile of each row/column is aligned to the image border.
+    Images smaller than tile_size give a single tile.
+    """
+
+    def starts(length, tile):
+        if length <= tile:
+            return np.array([0])
+        stride = max(int(tile * (1 - overlap)), 1)
+        return np.append(np.arange(0, length - tile, stride), length - tile)
+
+    tile_w, tile_h = tile_size
+    x1, y1 = np.meshgrid(starts(width, tile_w), starts(height, tile_h))
+    x1, y1 = x1.ravel(), y1.ravel()
+    x2, y2 = np.minimum(x1 + tile_w, width), np.minimum(y1 + tile_h, height)
+    return np.stack([x1, y1, x2, y2], axis=1)
+
+
+def on_tile_seams(boxes: np.ndarray, tiles: np.ndarray) -> np.ndarray:
+    """Returns a (N,) mask of the boxes touching a region covered by
+    more than one tile. Only those boxes can be duplicated across tiles.
+    """
+    xs, xe = np.unique(tiles[:, 0]), np.unique(tiles[:, 2])
+    ys, ye = np.unique(tiles[:, 1]), np.unique(tiles[:, 3])
+    on_x = (boxes[:, None, 0] < xe[None, :-1]) & (boxes[:, None, 2] > xs[None, 1:])
+    on_y = (boxes[:, None, 1] < ye[None, :-1]) & (boxes[:, None, 3] > ys[None, 1:])
+    return on_x.any(axis=1) | on_y.any(axis=1)
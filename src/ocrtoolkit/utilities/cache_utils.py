@@ -0,0 +1,218 @@
+import hashlib
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+import numpy as np
+from loguru import logger
+
+from ocrtoolkit.utilities.instrument_utils import trace_batch
+
+
+def hash_file(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Returns the blake2b hex digest of a file
+    For directories (e.g. paddle inference dirs), hashes all files in it
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    p_path = Path(path)
+    l_files = sorted(p_path.rglob("*")) if p_path.is_dir() else [p_path]
+    for file in l_files:
+        if not file.is_file():
+            continue
+        if file != p_path:
+            hasher.update(file.relative_to(p_path).as_posix().encode())
+        with file.open("rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def hash_image(image: np.ndarray) -> str:
+    """Returns a content hash of an image array, including shape and dtype"""
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(str((image.shape, image.dtype.str)).encode())
+    hasher.update(np.ascontiguousarray(image).data)
+    return hasher.hexdigest()
+
+
+def get_model_identity(model, **kwargs) -> str:
+    """Returns a string identifying the model configuration
+    Built from the arch class, the weight path and hash of the weights,
+    the quantization mode, the predict kwargs the model accepts
+    (valid_kwargs) and the tiling options
+    The weights hash is computed once and stored on the model
+    Models made of other models (e.g. cascades) define identity(**kwargs)
+    """
+    if hasattr(model, "identity"):
+        return model.identity(**kwargs)
+    weights_hash = getattr(model, "_weights_hash", None)
+    if weights_hash is None:
+        path = getattr(model, "path", None)
+        is_local = path is not None and Path(str(path)).exists()
+        weights_hash = hash_file(path) if is_local else "none"
+        model._weights_hash = weights_hash
+    filtered_kwargs = sorted(
+        (key, repr(value))
+        for key, value in kwargs.items()
+        if key in getattr(model, "valid_kwargs", set())
+    )
+    return repr(
+        (
+            getattr(model, "arch", None) or model.__class__.__name__,
+            str(getattr(model, "path", None)),
+            weights_hash,
+            getattr(model, "quantized", None),
+            filtered_kwargs,
+            getattr(model, "tiling", None),
+        )
+    )
+
+
+class ResultCache:
+    """On-disk cache of DetectionResults/RecognitionResults
+    Entries are keyed by a hash of the preprocessed image and the
+    model identity (see get_model_identity), and pickled to cache_dir.
+    Total size is bounded by max_size_mb, least recently used entries
+    are evicted first.
+    Keeps hit/miss statistics for the lifetime of the object.
+    """
+
+    cache_dir: Path
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_size_mb: float = 1024,
+    ):
+        self.cache_dir = Path(
+            cache_dir or Path.home() / ".cache" / "ocrtoolkit" / "results"
+        )
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._size = 0
+        self._scan()
+
+    def _scan(self):
+        """Indexes existing entries with their size and last access time"""
+        for file in self.cache_dir.glob("*/*.pkl"):
+            stat = file.stat()
+            self._entries[file.stem] = (stat.st_size, stat.st_mtime)
+            self._size += stat.st_size
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir.joinpath(key[:2], f"{key}.pkl")
+
+    @staticmethod
+    def make_key(model_identity: str, image: np.ndarray) -> str:
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(model_identity.encode())
+        hasher.update(hash_image(image).encode())
+        return hasher.hexdigest()
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached entries in bytes"""
+        return self._size
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached result for key or None"""
+        path = self._path(key)
+        try:
+            with path.open("rb") as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries[key] = (self._entries[key][0], path.stat().st_mtime)
+        return result
+
+    def put(self, key: str, result: Any):
+        """Stores result under key, evicting old entries if over budget"""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp_path.open("wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        stat = path.stat()
+        with self._lock:
+            old_size = self._entries.get(key, (0, 0))[0]
+            self._entries[key] = (stat.st_size, stat.st_mtime)
+            self._size += stat.st_size - old_size
+            self._evict()
+
+    def _evict(self):
+        if self._size <= self.max_size:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda x: x[1][1]):
+            if self._size <= self.max_size:
+                break
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            del self._entries[key]
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Removes all entries from disk"""
+        with self._lock:
+            for key in list(self._entries):
+                self._path(key).unlink(missing_ok=True)
+            self._entries = {}
+            self._size = 0
+
+    def predict(self, model, l_inputs: List[np.ndarray], **kwargs) -> list:
+        """Runs model.predict only on inputs that are not cached yet
+        l_inputs are preprocessed images, as passed to model.predict
+        Results come back in the same order as l_inputs
+        """
+        identity = get_model_identity(model, **kwargs)
+        keys = [self.make_key(identity, image) for image in l_inputs]
+        l_results = [self.get(key) for key in keys]
+        miss_idxs = [idx for idx, result in enumerate(l_results) if result is None]
+        if miss_idxs:
+            l_new = model.predict([l_inputs[idx] for idx in miss_idxs], **kwargs)
+            for idx, result in zip(miss_idxs, l_new):
+                self.put(keys[idx], result)
+                l_results[idx] = result
+        trace_batch(
+            "cache",
+            len(keys),
+            hits=len(keys) - len(miss_idxs),
+            misses=len(miss_idxs),
+        ).finish()
+        logger.debug("Result cache: {}", self.stats())
+        return l_results
@@ -1,19 +1,38 @@
 import json
+import os
 from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
 
-import h5py
+import cv2
+import numpy as np
 from loguru import logger
 
+if TYPE_CHECKING:
+    import h5py
+
+# imwrite params per extension, quality (0-100) is filled in
+ENCODE_PARAMS = {
+    ".jpg": cv2.IMWRITE_JPEG_QUALITY,
+    ".jpeg": cv2.IMWRITE_JPEG_QUALITY,
+    ".webp": cv2.IMWRITE_WEBP_QUALITY,
+}
+
+
+def write_dets(group: "h5py.Group", l_dets, start_idx: int = 0):
+    """Writes l_dets to group as dets_{start_idx}, dets_{start_idx + 1}, ..."""
+    for idx, dets in enumerate(l_dets, start_idx):
+        npy_bboxes = dets.to_numpy(encode=True)
+        dset = group.create_dataset(f"dets_{idx}", data=npy_bboxes)
+        dset.attrs["width"] = dets.width
+        dset.attrs["height"] = dets.height
+        dset.attrs["img_name"] = dets.img_name
+
 
 def save_dets(l_dets, path: str):
+    import h5py
+
     with h5py.File(path, "w") as f:
-        group = f.create_group("dets")
-        for idx, dets in enumerate(l_dets):
-            npy_bboxes = dets.to_numpy(encode=True)
-            dset = group.create_dataset(f"dets_{idx}", data=npy_bboxes)
-            dset.attrs["width"] = dets.width
-            dset.attrs["height"] = dets.height
-            dset.attrs["img_name"] = dets.img_name
+        write_dets(f.create_group("dets"), l_dets)
         logger.info(f"Detections saved to {path}")
 
 
@@ -63,6 +82,8 @@ def save_dets_as_label_studio(l_dets, path: str, subdir_images="images"):
 
 
 def load_dets(path: str):
+    import h5py
+
     from ocrtoolkit.wrappers.bbox import BBox
     from ocrtoolkit.wrappers.detection_results import DetectionResults
 
@@ -80,3 +101,91 @@ def load_dets(path: str):
                 DetectionResults(l_bboxes, dets_width, dets_height, dets_img_name)
             )
         return l_dets
+
+
+# set in each export worker by _init_export_worker
+_export_state = None
+
+
+def _init_export_worker(parent_ds, output_dir, ext, params, draw_kwargs):
+    global _export_state
+    _export_state = (parent_ds, output_dir, ext, params, draw_kwargs)
+
+
+def _export_page(page) -> str:
+    """Draws all dets of one page on it and writes it, returns the path"""
+    parent_ds, output_dir, ext, params, draw_kwargs = _export_state
+    img_name, l_dets = page
+    # decoded once, however many dets refer to the page
+    canvas = np.array(parent_ds[img_name])
+    for dets in l_dets:
+        canvas = dets.draw_on(canvas, **draw_kwargs)
+    path = Path(output_dir).joinpath(Path(img_name).stem + ext)
+    if not cv2.imwrite(str(path), cv2.cvtColor(canvas, cv2.COLOR_RGB2BGR), params):
+        raise OSError(f"Could not write {path}")
+    return path.as_posix()
+
+
+def export_annotated(
+    l_dets,
+    parent_ds,
+    output_dir: str,
+    ext: str = ".jpg",
+    quality: int = 90,
+    workers: Optional[int] = None,
+    chunksize: int = 4,
+    progress: bool = True,
+    **draw_kwargs,
+) -> List[str]:
+    """Draws l_dets on their pages of parent_ds and writes them to output_dir
+    as <img_name stem><ext>, in parallel across workers processes (default:
+    the CPU count, 0 draws in the calling process)
+    Each page is decoded once and all the dets on it are drawn together
+    (see DetectionResults.draw_on, which takes draw_kwargs: color,
+    show_conf, show_label, show_text). quality (0-100) applies to jpg and
+    webp outputs. parent_ds is sent once per worker, pages are sent to the
+    workers chunksize at a time.
+    Returns the written paths, one per page in order of first appearance
+    Raises ValueError, before writing anything, if page names share a stem
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from tqdm.autonotebook import tqdm
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ext = ext if ext.startswith(".") else f".{ext}"
+    params = []
+    if ext.lower() in ENCODE_PARAMS:
+        params = [ENCODE_PARAMS[ext.lower()], int(quality)]
+
+    d_pages = {}
+    for dets in l_dets:
+        d_pages.setdefault(dets.img_name, []).append(dets)
+    pages = list(d_pages.items())
+    d_stems = {}
+    for img_name in d_pages:
+        d_stems.setdefault(Path(img_name).stem, []).append(img_name)
+    l_clashes = [names for names in d_stems.values() if len(names) > 1]
+    if l_clashes:
+        raise ValueError(f"Pages would overwrite each other: {l_clashes}")
+    initargs = (parent_ds, output_dir, ext, params, draw_kwargs)
+
+    workers = os.cpu_count() if workers is None else workers
+    workers = min(workers, len(pages))
+    if workers <= 0:
+        _init_export_worker(*initargs)
+        l_paths = [_export_page(page) for page in tqdm(pages, disable=not progress)]
+    else:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_export_worker, initargs=initargs
+        ) as executor:
+            l_paths = list(
+                tqdm(
+                    executor.map(_export_page, pages, chunksize=chunksize),
+                    total=len(pages),
+                    disable=not progress,
+                )
+            )
+    logger.info(f"Exported {len(l_paths)} annotated pages to {output_dir}")
+    return l_paths
@@ -1,4 +1,6 @@
+from functools import lru_cache
 from pathlib import Path
+from typing import List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
@@ -36,6 +38,91 @@ def draw_bbox(
     return image
 
 
+def draw_bboxes(
+    image: np.ndarray,
+    boxes: np.ndarray,
+    labels: Optional[List[str]] = None,
+    color: tuple = (255, 0, 0),
+    text_color: tuple = (255, 255, 255),
+):
+    """Draws all boxes (Nx4 x1, y1, x2, y2) and their labels on image
+    Same look as draw_bbox on each box, but line width and font scale are
+    computed once, all rectangles are drawn in a single polylines call and
+    labels are drawn last, so boxes never cover them
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4).astype(np.int32)
+    if len(boxes) == 0:
+        return image
+    lw = max(round(sum(image.shape[:2]) / 2 * 0.003), 2)
+    x1, y1, x2, y2 = boxes.T
+    corners = np.stack([x1, y1, x2, y1, x2, y2, x1, y2], axis=1).reshape(-1, 4, 2)
+    cv2.polylines(image, list(corners), True, color, thickness=lw, lineType=cv2.LINE_AA)
+    if not labels:
+        return image
+    tf = max(lw - 1, 1)  # font thickness
+    for (p1_x, p1_y), label in zip(boxes[:, :2].tolist(), labels):
+        if not label:
+            continue
+        w, h = cv2.getTextSize(label, 0, fontScale=lw / 3, thickness=tf)[0]
+        outside = p1_y - h >= 3
+        p2 = p1_x + w, p1_y - h - 3 if outside else p1_y + h + 3
+        cv2.rectangle(image, (p1_x, p1_y), p2, (*color, 1), -1, cv2.LINE_AA)
+        cv2.putText(
+            image,
+            label,
+            (p1_x, p1_y - 2 if outside else p1_y + h + 2),
+            0,
+            lw / 3,
+            text_color,
+            thickness=tf,
+            lineType=cv2.LINE_AA,
+        )
+    return image
+
+
+@lru_cache(maxsize=256)
+def get_font(size: int, path: Union[str, Path] = FONT_PATH) -> ImageFont.FreeTypeFont:
+    """Returns the TrueType font at path in size, loaded once per size"""
+    return ImageFont.truetype(str(path), size)
+
+
+def fit_font_size(
+    text: str,
+    max_width: float,
+    max_size: int = 72,
+    min_size: int = 1,
+    path: Union[str, Path] = FONT_PATH,
+) -> int:
+    """Largest font size in [min_size, max_size] whose rendered text is at
+    most max_width wide (min_size if none), found by binary search
+    """
+
+    def fits(size: int) -> bool:
+        return get_font(size, path).getbbox(text)[2] <= max_width
+
+    if max_size <= min_size:
+        return min_size
+    width = get_font(max_size, path).getbbox(text)[2]
+    if width <= max_width:
+        return max_size
+    # text width grows about linearly with the size: search around that guess
+    lo, hi = min_size, max_size - 1
+    guess = min(max(int(max_size * max_width / width), min_size), hi)
+    if fits(guess):
+        lo = guess
+        if lo < hi and not fits(lo + 1):
+            return lo
+    else:
+        hi = max(guess - 1, min_size)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if fits(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
 def draw_ocr_text(
     image: np.ndarray,
     text: str = "",
@@ -48,23 +135,9 @@ def draw_ocr_text(
     img = img.resize((x * scale_factor for x in img.size))
     img_width, img_height = img.size
 
-    initial_font_size = 72  # Starting font size
-
-    # Initial font load
-    font = ImageFont.truetype(FONT_PATH, initial_font_size)
-
-    # Try to fit the text within the image width
+    # Fit the text within the image width
+    font = get_font(fit_font_size(text, img_width * 0.9))
     text_width, text_height = font.getbbox(text)[2:]
-    max_text_width = img_width * 0.9
-
-    while text_width > max_text_width:
-        # Decrease font size to try to fit the text
-        initial_font_size -= 2
-        font = ImageFont.truetype(FONT_PATH, initial_font_size)
-        text_width, text_height = font.getbbox(text)[2:]
-
-        if initial_font_size <= 1:
-            break
 
     font_scale_factor = img_width / 400
     rectangle_height = text_height + int(20 * font_scale_factor)
@@ -84,3 +157,53 @@ def draw_ocr_text(
     draw.text((text_x, text_y), text, fill=text_color, font=font)
 
     return np.array(img_with_rectangle)
+
+
+def draw_ocr_sheet(
+    images: List[np.ndarray],
+    texts: List[str],
+    cols: int = 6,
+    cell_size: Tuple[int, int] = (240, 64),
+    label_height: int = 28,
+    color: tuple = (255, 0, 0),
+    text_color: tuple = (255, 255, 255),
+    padding: int = 4,
+) -> np.ndarray:
+    """Renders crops and their texts as one contact sheet, cols per row
+    Each crop is resized to fit cell_size (w, h), with its text below on
+    a label_height band. Everything is drawn on a single canvas, so it is
+    much faster than one draw_ocr_text per crop.
+    """
+    cell_w, cell_h = cell_size
+    step_x, step_y = cell_w + padding, cell_h + label_height + padding
+    rows = max((len(images) + cols - 1) // cols, 1)
+    sheet = Image.new(
+        "RGB", (cols * step_x + padding, rows * step_y + padding), (0, 0, 0)
+    )
+    draw = ImageDraw.Draw(sheet)
+    max_font_size = max(label_height - 6, 1)
+    for idx, (image, text) in enumerate(zip(images, texts)):
+        x = padding + (idx % cols) * step_x
+        y = padding + (idx // cols) * step_y
+        img = Image.fromarray(image)
+        scale = min(cell_w / max(img.width, 1), cell_h / max(img.height, 1))
+        img = img.resize(
+            (max(round(img.width * scale), 1), max(round(img.height * scale), 1))
+        )
+        sheet.paste(
+            img, (x + (cell_w - img.width) // 2, y + (cell_h - img.height) // 2)
+        )
+
+        band_y = y + cell_h
+        draw.rectangle(
+            [x, band_y, x + cell_w - 1, band_y + label_height - 1], fill=color
+        )
+        font = get_font(fit_font_size(text, cell_w * 0.95, max_font_size))
+        left, top, right, bottom = font.getbbox(text)
+        draw.text(
+            (x + (cell_w - right) // 2, band_y + (label_height - bottom - top) // 2),
+            text,
+            fill=text_color,
+            font=font,
+        )
+    return np.array(sheet)
@@ -1,16 +1,27 @@
-from typing import List, Tuple, Union
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
 
-import pandas as pd
+import numpy as np
+
+from ocrtoolkit.utilities.box_utils import box_iou
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# COCO AP: IoU thresholds 0.5:0.05:0.95, precision sampled at 101 recalls
+COCO_IOU_THRESHOLDS = tuple(np.round(np.linspace(0.5, 0.95, 10), 2))
+RECALL_POINTS = np.linspace(0, 1, 101)
 
 
 def compare_dataframes(
-    df_a: pd.DataFrame,
-    df_b: pd.DataFrame,
+    df_a: "pd.DataFrame",
+    df_b: "pd.DataFrame",
     index_a: str,
     index_b: str,
     cols_to_compare: Union[List, List[Tuple]],
     how: str,
-) -> pd.DataFrame:
+) -> "pd.DataFrame":
     """
     Compare two dataframes based on specified indices and columns.
 
@@ -27,6 +38,8 @@ def compare_dataframes(
         pd.DataFrame: DataFrame containing comparison results as percentage of matches.
         pd.DataFrame: The merged dataframes used for comparison.
     """
+    import pandas as pd
+
     # Set indices if they are not already set
     if index_a != df_a.index.name:
         df_a = df_a.set_index(index_a)
@@ -55,3 +68,282 @@ def compare_dataframes(
         pd.DataFrame(match_percentages, index=["Match Percentage"]),
         comparison_results,
     )
+
+
+def _run_timed(model, ds, bs: int) -> Tuple[list, float]:
+    l_results, elapsed = [], 0.0
+    for idx in range(ds.num_batches(bs)):
+        l_np_imgs = [np.array(img) for img in ds.batch(bs, idx)]
+        start = time.perf_counter()
+        l_results += model.predict(model.preprocess(l_np_imgs))
+        elapsed += time.perf_counter() - start
+    return l_results, elapsed
+
+
+def compare_rec_models(
+    ref_model,
+    model,
+    ds,
+    labels: Optional[List[str]] = None,
+    bs: int = 32,
+    warmup: int = 1,
+) -> "pd.DataFrame":
+    """
+    Compare accuracy and latency of a recognition model with a reference,
+    e.g. an int8 quantized model with its float version.
+
+    Args:
+        ref_model: Reference RecognitionModel.
+        model: RecognitionModel to compare.
+        ds: Validation dataset of text crops.
+        labels (Optional[List[str]]): Ground truth texts, in ds order.
+        bs (int): Batch size used for both models.
+        warmup (int): Number of batches run before timing.
+
+    Returns:
+        pd.DataFrame: One row per model with ms per image, speedup,
+        agreement with the reference texts, mean confidence and
+        exact match accuracy if labels are given.
+    """
+    for idx in range(min(warmup, ds.num_batches(bs))):
+        l_np_imgs = [np.array(img) for img in ds.batch(bs, idx)]
+        for m in (ref_model, model):
+            m.predict(m.preprocess(l_np_imgs))
+
+    ref_results, ref_time = _run_timed(ref_model, ds, bs)
+    results, elapsed = _run_timed(model, ds, bs)
+    ref_texts = [res.text for res in ref_results]
+
+    rows = {}
+    for name, l_res, t in (
+        ("reference", ref_results, ref_time),
+        ("model", results, elapsed),
+    ):
+        texts = [res.text for res in l_res]
+        rows[name] = {
+            "ms_per_image": 1000 * t / max(len(ds), 1),
+            "speedup": ref_time / t if t else float("nan"),
+            "agreement": np.mean([a == b for a, b in zip(texts, ref_texts)]),
+            "mean_conf": np.mean([res.conf for res in l_res]),
+        }
+        if labels is not None:
+            rows[name]["accuracy"] = np.mean(
+                [text == label for text, label in zip(texts, labels)]
+            )
+    import pandas as pd
+
+    return pd.DataFrame(rows).T
+
+
+def match_detections(
+    ious: np.ndarray,
+    scores: np.ndarray,
+    iou_thresholds: Sequence[float] = (0.5,),
+    method: str = "greedy",
+) -> np.ndarray:
+    """Matches P predictions to G ground truths from their (P, G) ious,
+    once per IoU threshold, returns a (P, T) bool array of true positives
+    method="greedy": COCO matching, predictions in decreasing score order
+    take the free ground truth they overlap most
+    method="hungarian": one to one matching maximizing the total IoU
+    (ignores scores, needs scipy)
+    Pairs below a threshold never match. Set the ious of pairs that must
+    not match (e.g. different labels) to 0
+    """
+    num_preds, num_gts = ious.shape
+    tp = np.zeros((num_preds, len(iou_thresholds)), dtype=bool)
+    if num_preds == 0 or num_gts == 0:
+        return tp
+    if method == "hungarian":
+        from scipy.optimize import linear_sum_assignment
+
+        for t, thr in enumerate(iou_thresholds):
+            weights = np.where(ious >= thr, ious, 0)
+            rows, cols = linear_sum_assignment(weights, maximize=True)
+            tp[rows[weights[rows, cols] > 0], t] = True
+        return tp
+    if method != "greedy":
+        raise ValueError(f"Unknown method {method}")
+
+    rank = np.empty(num_preds, dtype=np.int64)
+    rank[np.argsort(-scores, kind="stable")] = np.arange(num_preds)
+    # candidate pairs, by pred rank then decreasing iou
+    p_idx, g_idx = np.nonzero(ious >= min(iou_thresholds))
+    pair_ious = ious[p_idx, g_idx]
+    order = np.lexsort((-pair_ious, rank[p_idx]))
+    p_idx, g_idx, pair_ious = p_idx[order], g_idx[order], pair_ious[order]
+    for t, thr in enumerate(iou_thresholds):
+        keep = pair_ious >= thr
+        p, g = p_idx[keep], g_idx[keep]
+        # usual case: no pred or ground truth is in two pairs, all match
+        if len(p) == 0 or (np.bincount(p).max() == 1 and np.bincount(g).max() == 1):
+            tp[p, t] = True
+            continue
+        done_p, used_g = set(), set()
+        for pi, gi in zip(p.tolist(), g.tolist()):
+            if pi in done_p or gi in used_g:
+                continue
+            done_p.add(pi)
+            used_g.add(gi)
+            tp[pi, t] = True
+    return tp
+
+
+def _eval_chunk(args) -> Dict[str, list]:
+    """Matches the (pred, gt) pairs of a chunk (as DetectionResults.to_arrays),
+    returns per label: [scores, (P, T) true positives, number of ground truths]
+    """
+    pairs, iou_thresholds, method = args
+    stats = {}
+    for (coords, scores, labels), (gt_coords, _, gt_labels) in pairs:
+        # labels are matched separately, on their own (smaller) iou blocks
+        for label in set(labels.tolist()) | set(gt_labels.tolist()):
+            mask, gt_mask = labels == label, gt_labels == label
+            ious = box_iou(coords[mask], gt_coords[gt_mask])
+            entry = stats.setdefault(label, [[], [], 0])
+            entry[0].append(scores[mask])
+            entry[1].append(
+                match_detections(ious, scores[mask], iou_thresholds, method)
+            )
+            entry[2] += int(gt_mask.sum())
+    return {
+        label: [np.concatenate(l_scores), np.concatenate(l_tp), num_gts]
+        for label, (l_scores, l_tp, num_gts) in stats.items()
+    }
+
+
+def _average_precision(tp: np.ndarray, num_gts: int) -> np.ndarray:
+    """COCO 101 point interpolated AP of score sorted (P, T) true positives"""
+    num_preds, num_thrs = tp.shape
+    if num_gts == 0:
+        return np.full(num_thrs, np.nan)
+    if num_preds == 0:
+        return np.zeros(num_thrs)
+    tp_cum = np.cumsum(tp, axis=0)
+    recall = tp_cum / num_gts
+    precision = tp_cum / np.arange(1, num_preds + 1)[:, None]
+    # precision envelope: best precision at this recall or higher
+    precision = np.maximum.accumulate(precision[::-1], axis=0)[::-1]
+    l_ap = []
+    for t in range(num_thrs):
+        idxs = np.searchsorted(recall[:, t], RECALL_POINTS, side="left")
+        found = idxs < num_preds
+        l_ap.append(precision[idxs[found], t].sum() / len(RECALL_POINTS))
+    return np.array(l_ap)
+
+
+def evaluate_detections(
+    l_preds: list,
+    l_gts: list,
+    iou_thresholds: Sequence[float] = COCO_IOU_THRESHOLDS,
+    iou_threshold: float = 0.5,
+    conf_threshold: float = 0.0,
+    method: str = "greedy",
+    workers: Optional[int] = 0,
+    chunksize: int = 512,
+    summary_key: str = "all",
+) -> "pd.DataFrame":
+    """
+    Evaluate predicted DetectionResults against ground truths
+    (e.g. from datasets.io.load_yolo), matched per image on img_name.
+
+    Args:
+        l_preds (list): Predicted DetectionResults. Predictions of images
+            that are not in l_gts are ignored, predictions sharing an
+            img_name are merged.
+        l_gts (list): Ground truth DetectionResults, one per image.
+        iou_thresholds (Sequence[float]): IoU thresholds averaged in "ap".
+        iou_threshold (float): IoU threshold of precision, recall and f1.
+        conf_threshold (float): Min conf of predictions counted in
+            precision, recall and f1 (AP uses all of them).
+        method (str): "greedy" (COCO) or "hungarian", see match_detections.
+        workers (Optional[int]): Processes matching chunks of chunksize
+            images, None for the CPU count, 0 for the calling process.
+        chunksize (int): Images per chunk sent to a worker.
+        summary_key (str): Index of the summary row, must not be a label.
+
+    Returns:
+        pd.DataFrame: One row per label and a summary_key row with num_gt,
+        num_pred, tp, fp, fn, precision, recall, f1, ap50, ap75 (when in
+        iou_thresholds) and ap (mean over iou_thresholds). The summary row
+        sums the counts (micro precision, recall and f1) and averages the
+        APs of the labels having ground truths, e.g. COCO mAP.
+    """
+    import pandas as pd
+
+    thresholds = sorted(set(iou_thresholds) | {iou_threshold})
+    ap_idxs = [thresholds.index(thr) for thr in sorted(set(iou_thresholds))]
+    no_preds = (np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=str))
+    # arrays are much cheaper than BBox objects to send to the workers
+    d_preds = {}
+    for preds in l_preds:
+        d_preds.setdefault(preds.img_name, []).append(preds.to_arrays())
+    d_preds = {
+        img_name: tuple(map(np.concatenate, zip(*l_arrays)))
+        for img_name, l_arrays in d_preds.items()
+    }
+    pairs = [(d_preds.get(gts.img_name, no_preds), gts.to_arrays()) for gts in l_gts]
+    chunks = [
+        (pairs[start : start + chunksize], thresholds, method)
+        for start in range(0, len(pairs), chunksize)
+    ]
+
+    workers = os.cpu_count() if workers is None else workers
+    if min(workers, len(chunks)) <= 1:
+        l_stats = [_eval_chunk(chunk) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(min(workers, len(chunks))) as executor:
+            l_stats = list(executor.map(_eval_chunk, chunks))
+
+    stats = {}
+    for chunk_stats in l_stats:
+        for label, (scores, tp, num_gts) in chunk_stats.items():
+            entry = stats.setdefault(label, [[], [], 0])
+            entry[0].append(scores)
+            entry[1].append(tp)
+            entry[2] += num_gts
+
+    if summary_key in stats:
+        raise ValueError(
+            f"Label {summary_key!r} clashes with the summary row, "
+            "pass another summary_key."
+        )
+    t_idx = thresholds.index(iou_threshold)
+    ap_cols = {
+        f"ap{round(thr * 100)}": thresholds.index(thr)
+        for thr in (0.5, 0.75)
+        if thr in iou_thresholds
+    }
+    count_cols = ["num_gt", "num_pred", "tp", "fp", "fn"]
+    rows = {}
+    for label in sorted(stats):
+        l_scores, l_tp, num_gts = stats[label]
+        scores = np.concatenate(l_scores)
+        order = np.argsort(-scores, kind="stable")
+        scores, tp = scores[order], np.concatenate(l_tp)[order]
+        selected = scores >= conf_threshold
+        num_tp = int(tp[selected, t_idx].sum())
+        ap = _average_precision(tp, num_gts)
+        rows[label] = [
+            num_gts,
+            len(scores),
+            num_tp,
+            int(selected.sum()) - num_tp,
+            num_gts - num_tp,
+            *ap[list(ap_cols.values())],
+            ap[ap_idxs].mean(),
+        ]
+
+    df = pd.DataFrame.from_dict(
+        rows, orient="index", columns=[*count_cols, *ap_cols, "ap"]
+    )
+    # mean skips the nan AP of labels without ground truths
+    df.loc[summary_key] = [*df[count_cols].sum(), *df[[*ap_cols, "ap"]].mean()]
+    df[count_cols] = df[count_cols].astype(int)
+    df["precision"] = df["tp"] / (df["tp"] + df["fp"]).clip(lower=1)
+    df["recall"] = df["tp"] / df["num_gt"].clip(lower=1)
+    pr_sum = df["precision"] + df["recall"]
+    df["f1"] = 2 * df["precision"] * df["recall"] / pr_sum.where(pr_sum > 0, 1)
+    return df[[*count_cols, "precision", "recall", "f1", *ap_cols, "ap"]]
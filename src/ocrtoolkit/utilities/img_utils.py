@@ -6,6 +6,11 @@ import numpy as np
 from PIL import Image
 
 
+def tfm_identity(img):
+    """Returns image unchanged (a picklable no-op transform)"""
+    return img
+
+
 def tfm_to_pil(img: Union[Image.Image, np.ndarray]):
     """ "Converts image to PIL image"""
     return Image.fromarray(img) if isinstance(img, np.ndarray) else img
@@ -0,0 +1,284 @@
+import json
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ocrtoolkit.utilities.memory_utils import get_rss
+
+# hooks called with every finished BatchTrace, see add_hook
+_hooks: List[Callable] = []
+_hooks_lock = threading.Lock()
+# see set_memory_tracking
+_memory_tracking = {"rss": False, "tracemalloc": False, "started": False}
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullTrace:
+    """Returned by trace_batch when no hook is registered, records nothing"""
+
+    _stage = _NullStage()
+
+    def __bool__(self):
+        return False
+
+    def stage(self, name: str):
+        return self._stage
+
+    def record(self, name: str, elapsed: float):
+        pass
+
+    def finish(self, results=None, **extra):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class BatchTrace:
+    """Durations (seconds) of the stages of one batch, its size and the
+    number of boxes in its results. Passed to the hooks on finish.
+    extra holds optional fields, e.g. max_batch, cache hits or the error
+    raised in a stage (which finishes the trace).
+    memory holds the RSS after each stage and its tracemalloc peak (bytes)
+    if enabled with set_memory_tracking.
+    """
+
+    def __init__(self, task: str, batch_size: int, hooks: List[Callable], **extra):
+        self.task = task
+        self.batch_size = batch_size
+        self.num_boxes = 0
+        self.stages: Dict[str, float] = {}
+        self.memory: Dict[str, dict] = {}
+        self.extra = extra
+        self.start_time = time.time()
+        self._hooks = hooks
+
+    @contextmanager
+    def stage(self, name: str):
+        if _memory_tracking["tracemalloc"]:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield self
+        except Exception as e:
+            self.record(name, time.perf_counter() - start)
+            self.finish(error=type(e).__name__)
+            raise
+        self.record(name, time.perf_counter() - start)
+        if _memory_tracking["rss"]:
+            self._sample_memory(name)
+
+    def _sample_memory(self, name: str):
+        memory = {"rss": get_rss()}
+        if _memory_tracking["tracemalloc"]:
+            memory["traced"] = tracemalloc.get_traced_memory()[1]
+        self.memory[name] = memory
+
+    def record(self, name: str, elapsed: float):
+        """Adds elapsed seconds to stage name"""
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def finish(self, results=None, **extra):
+        """Counts the boxes of results (if detections) and calls the hooks"""
+        if results is not None:
+            self.num_boxes = sum(len(res) for res in results if hasattr(res, "bboxes"))
+        self.extra.update(extra)
+        for hook in self._hooks:
+            hook(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "task": self.task,
+            "start_time": self.start_time,
+            "batch_size": self.batch_size,
+            "num_boxes": self.num_boxes,
+            "stages": self.stages,
+            **({"memory": self.memory} if self.memory else {}),
+            **self.extra,
+        }
+
+
+def add_hook(hook: Callable):
+    """Registers hook(trace: BatchTrace), called after every instrumented batch
+    Any callable works, see SummarySink, JsonlSink and HistogramSink
+    """
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + [hook]
+
+
+def remove_hook(hook: Callable):
+    global _hooks
+    with _hooks_lock:
+        _hooks = [h for h in _hooks if h is not hook]
+
+
+@contextmanager
+def instrument(*hooks: Callable):
+    """Registers hooks for the duration of the block
+
+    Example:
+        with instrument(SummarySink()) as (summary,):
+            list(detect(model, ds))
+        print(summary)
+    """
+    for hook in hooks:
+        add_hook(hook)
+    try:
+        yield hooks
+    finally:
+        for hook in hooks:
+            remove_hook(hook)
+
+
+def set_memory_tracking(enabled: bool = True, use_tracemalloc: bool = False):
+    """Samples the RSS (and the tracemalloc peak) after every traced stage
+    tracemalloc slows allocations down noticeably, use it for debugging.
+    """
+    _memory_tracking["rss"] = enabled
+    _memory_tracking["tracemalloc"] = enabled and use_tracemalloc
+    if _memory_tracking["tracemalloc"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _memory_tracking["started"] = True
+    elif not _memory_tracking["tracemalloc"] and _memory_tracking["started"]:
+        tracemalloc.stop()
+        _memory_tracking["started"] = False
+
+
+def trace_batch(task: str, batch_size: int, **extra):
+    """Returns a BatchTrace, or NULL_TRACE (no overhead) if no hook is set"""
+    hooks = _hooks
+    if not hooks:
+        return NULL_TRACE
+    return BatchTrace(task, batch_size, hooks, **extra)
+
+
+class HistogramSink:
+    """Keeps every stage duration in memory, per task and stage"""
+
+    def __init__(self):
+        self.durations: Dict[tuple, List[float]] = defaultdict(list)
+        self.num_batches = defaultdict(int)
+        self.num_images = defaultdict(int)
+        self.num_boxes = defaultdict(int)
+        self.peak_memory: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, trace: BatchTrace):
+        with self._lock:
+            self.num_batches[trace.task] += 1
+            self.num_images[trace.task] += trace.batch_size
+            self.num_boxes[trace.task] += trace.num_boxes
+            for stage, elapsed in trace.stages.items():
+                self.durations[(trace.task, stage)].append(elapsed)
+            for stage, memory in trace.memory.items():
+                peak = self.peak_memory.setdefault((trace.task, stage), {})
+                for key, value in memory.items():
+                    peak[key] = max(peak.get(key, 0), value)
+
+    def get_durations(self, task: str, stage: str) -> np.ndarray:
+        return np.asarray(self.durations.get((task, stage), []))
+
+    def percentile(self, task: str, stage: str, q: float) -> float:
+        """q-th percentile of the stage duration per batch, in seconds"""
+        durations = self.get_durations(task, stage)
+        return float(np.percentile(durations, q)) if len(durations) else 0.0
+
+    def histogram(self, task: str, stage: str, bins=10):
+        """(counts, bin_edges) of the stage durations, see np.histogram"""
+        return np.histogram(self.get_durations(task, stage), bins=bins)
+
+
+class SummarySink(HistogramSink):
+    """Summary table of the time spent per task and stage"""
+
+    def summary(self) -> List[dict]:
+        rows = []
+        task_totals = defaultdict(float)
+        for (task, _), durations in self.durations.items():
+            task_totals[task] += sum(durations)
+        for (task, stage), durations in self.durations.items():
+            total = sum(durations)
+            rows.append(
+                {
+                    "task": task,
+                    "stage": stage,
+                    "batches": len(durations),
+                    "total_s": total,
+                    "share": total / max(task_totals[task], 1e-12),
+                    "ms_per_img": 1000 * total / max(self.num_images[task], 1),
+                    "p50_ms": 1000 * self.percentile(task, stage, 50),
+                    "p95_ms": 1000 * self.percentile(task, stage, 95),
+                    **{
+                        f"peak_{key}_mb": value / 2**20
+                        for key, value in self.peak_memory.get(
+                            (task, stage), {}
+                        ).items()
+                    },
+                }
+            )
+        return rows
+
+    def __str__(self):
+        header = (
+            f"{'task':<10}{'stage':<12}{'batches':>8}{'total_s':>10}"
+            f"{'share':>8}{'ms/img':>10}{'p50_ms':>10}{'p95_ms':>10}"
+        )
+        with_rss = bool(self.peak_memory)
+        if with_rss:
+            header += f"{'rss_mb':>10}"
+        lines = [header]
+        for row in self.summary():
+            line = (
+                f"{row['task']:<10}{row['stage']:<12}{row['batches']:>8}"
+                f"{row['total_s']:>10.3f}{row['share']:>8.1%}{row['ms_per_img']:>10.2f}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            )
+            if with_rss:
+                line += f"{row.get('peak_rss_mb', 0):>10.1f}"
+            lines.append(line)
+        for task in self.num_batches:
+            lines.append(
+                f"{task}: {self.num_images[task]} images, "
+                f"{self.num_boxes[task]} boxes in {self.num_batches[task]} batches"
+            )
+        return "\n".join(lines)
+
+
+class JsonlSink:
+    """Appends one JSON line per batch trace to path"""
+
+    def __init__(self, path: str, flush_every: Optional[int] = 100):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+        self._num_pending = 0
+
+    def __call__(self, trace: BatchTrace):
+        line = json.dumps(trace.to_dict())
+        with self._lock:
+            self._file.write(line + "\n")
+            self._num_pending += 1
+            if self.flush_every and self._num_pending >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._num_pending = 0
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -1,10 +1,11 @@
+import os
 import tarfile
+import time
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 from loguru import logger
 from PIL import Image
-from tqdm.autonotebook import tqdm
 
 from ocrtoolkit.utilities.misc_utils import filter_list
 
@@ -25,6 +26,8 @@ def extract_files(tar_path: str, tar_file_name_list: list, output_dir: str):
 
 
 def convert_tif_to_jpg(path_tif: Path, path_jpeg: Path, ext=".jpg"):
+    from tqdm.autonotebook import tqdm
+
     path_jpeg.mkdir(parents=True, exist_ok=True)
     for item in tqdm(list(path_tif.glob("*.tif"))):
         img = Image.open(item).convert("RGB")
@@ -41,6 +44,8 @@ def get_files(
     Filter for ignoring hidden directories by default
     Filter for ignoring hidden files by default
     """
+    from tqdm.autonotebook import tqdm
+
     p_source = Path(source).resolve()
     l_files = []
     l_all_files = list(p_source.iterdir())
@@ -84,3 +89,64 @@ def change_suffixes(
         logger.warning(f"Found {len(l_nonexistent)} non-existent files")
         logger.warning(f"Few samples: {l_nonexistent}")
     return l_filtered
+
+
+class FileLock:
+    """Exclusive inter-process lock on path (created if missing)
+    Blocks until the lock is free, or raises TimeoutError after timeout
+    seconds. Uses flock on POSIX and msvcrt.locking on Windows.
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: Optional[float] = None):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._file = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a+")
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock():
+            if deadline is not None and time.monotonic() > deadline:
+                self._file.close()
+                self._file = None
+                raise TimeoutError(f"Could not lock {self.path}")
+            time.sleep(0.05)
+
+    def release(self):
+        if self._file is None:
+            return
+        if os.name == "nt":
+            import msvcrt
+
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
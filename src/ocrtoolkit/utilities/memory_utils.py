@@ -0,0 +1,148 @@
+import os
+import sys
+import threading
+from typing import Optional
+
+from loguru import logger
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def get_rss() -> int:
+    """Returns the resident set size of this process in bytes
+    Uses psutil if installed, else /proc/self/statm, else the peak RSS
+    reported by getrusage (on platforms without /proc)
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return get_peak_rss()
+
+
+def get_peak_rss() -> int:
+    """Returns the peak resident set size of this process so far in bytes"""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRSSMonitor:
+    """Context manager sampling the RSS every interval seconds on a
+    background thread, and keeping the peak seen while active
+
+    Example:
+        with PeakRSSMonitor() as monitor:
+            model.predict(images)
+        print(monitor.peak / 2**20, "MiB")
+    """
+
+    peak: int
+    start: int
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self.start = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, get_rss())
+
+    def __enter__(self):
+        self.start = self.peak = get_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, get_rss())
+        return False
+
+    @property
+    def increase(self) -> int:
+        """Peak RSS above the RSS at enter, in bytes"""
+        return self.peak - self.start
+
+
+class MemoryBudget:
+    """RSS budget of a job, warns once usage goes over warn_fraction of it
+    Warns again only after usage dropped back below warn_fraction
+    """
+
+    def __init__(self, budget_mb: float, warn_fraction: float = 0.9):
+        self.budget = int(budget_mb * 2**20)
+        self.warn_fraction = warn_fraction
+        self.num_warnings = 0
+        self._warned = False
+
+    def usage(self, rss: Optional[int] = None) -> float:
+        """Fraction of the budget used by rss (default: current RSS)"""
+        return (get_rss() if rss is None else rss) / self.budget
+
+    def check(self, rss: Optional[int] = None, where: str = "") -> float:
+        usage = self.usage(rss)
+        if usage < self.warn_fraction:
+            self._warned = False
+        elif not self._warned:
+            self._warned = True
+            self.num_warnings += 1
+            logger.warning(
+                f"Memory at {usage:.0%} of the {self.budget / 2**20:.0f} MiB budget"
+                + (f" ({where})" if where else "")
+            )
+        return usage
+
+    def __call__(self, trace):
+        """Hook checking the RSS sampled by every stage of a batch trace"""
+        for stage, memory in trace.memory.items():
+            self.check(memory["rss"], f"{trace.task}/{stage}")
+
+
+class AdaptiveBatchSize:
+    """Picks the largest batch size (up to bs) expected to fit in budget
+    The memory cost per image is the largest RSS growth per image seen in
+    a batch so far, see update. Batch sizes are halved down to min_bs, and
+    grow back (doubling) once they fit again.
+    """
+
+    def __init__(self, bs: int, budget: MemoryBudget, min_bs: int = 1):
+        self.max_bs = bs
+        self.bs = bs
+        self.min_bs = min_bs
+        self.budget = budget
+        self.per_image = 0.0
+
+    def update(self, rss_before: int, rss_peak: int, batch_size: int):
+        growth = max(rss_peak - rss_before, 0) / max(batch_size, 1)
+        self.per_image = max(self.per_image, growth)
+
+    def _fits(self, bs: int, rss: int) -> bool:
+        return (
+            rss + self.per_image * bs <= self.budget.budget * self.budget.warn_fraction
+        )
+
+    def next(self) -> int:
+        """Batch size for the next batch"""
+        rss = get_rss()
+        bs = self.bs
+        while bs > self.min_bs and not self._fits(bs, rss):
+            bs = max(bs // 2, self.min_bs)
+        while bs < self.max_bs and self._fits(min(2 * bs, self.max_bs), rss):
+            bs = min(2 * bs, self.max_bs)
+        if bs != self.bs:
+            logger.warning(f"Batch size {self.bs} -> {bs} to stay within memory budget")
+            self.bs = bs
+        return bs
@@ -0,0 +1,267 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ocrtoolkit.utilities.instrument_utils import add_hook, remove_hook
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds, from sub-millisecond stages to slow pages
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+RATIO_BUCKETS = (0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875, 1.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str]) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, labelvalues):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        value = value.replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def get(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in items
+        ]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per labels: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][idx] += 1
+            state[1] += value
+
+    def get_count(self, **labels) -> int:
+        state = self._values.get(tuple(str(labels[n]) for n in self.labelnames))
+        return sum(state[0]) if state else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(c), s)) for key, (c, s) in self._values.items())
+        lines = []
+        labelnames = self.labelnames + ("le",)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(labelnames, key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsSink:
+    """Hook (see instrument_utils.add_hook) turning batch traces into
+    counters and histograms: images, batches, boxes, stage latency,
+    batch fill ratio, cache hits / misses and errors
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, prefix="ocrtoolkit"):
+        self.registry = registry or MetricsRegistry()
+        register = self.registry.register
+        self.images = register(
+            Counter(f"{prefix}_images_total", "Images processed", ["task"])
+        )
+        self.batches = register(
+            Counter(f"{prefix}_batches_total", "Batches processed", ["task"])
+        )
+        self.boxes = register(
+            Counter(f"{prefix}_boxes_total", "Boxes produced", ["task"])
+        )
+        self.errors = register(
+            Counter(f"{prefix}_errors_total", "Failed batches", ["task", "error"])
+        )
+        self.cache = register(
+            Counter(
+                f"{prefix}_cache_requests_total", "Result cache lookups", ["result"]
+            )
+        )
+        self.stage_seconds = register(
+            Histogram(
+                f"{prefix}_stage_seconds",
+                "Time spent per batch in each stage",
+                ["task", "stage"],
+            )
+        )
+        self.batch_fill = register(
+            Histogram(
+                f"{prefix}_batch_fill_ratio",
+                "Batch size over the max batch size",
+                ["task"],
+                buckets=RATIO_BUCKETS,
+            )
+        )
+
+    def __call__(self, trace):
+        task = trace.task
+        extra = trace.extra
+        if "hits" in extra:
+            self.cache.inc(extra["hits"], result="hit")
+            self.cache.inc(extra["misses"], result="miss")
+            return
+        if "error" in extra:
+            self.errors.inc(task=task, error=extra["error"])
+        else:
+            self.images.inc(trace.batch_size, task=task)
+            self.batches.inc(task=task)
+            self.boxes.inc(trace.num_boxes, task=task)
+            if extra.get("max_batch"):
+                self.batch_fill.observe(
+                    trace.batch_size / extra["max_batch"], task=task
+                )
+        for stage, elapsed in trace.stages.items():
+            self.stage_seconds.observe(elapsed, task=task, stage=stage)
+
+
+class MetricsServer:
+    """Serves the metrics of sink on http://host:port/metrics from a
+    daemon thread, and feeds sink from the instrumentation hooks
+
+    Example:
+        with MetricsServer(port=9464):
+            run_ocr(model, inputs, output)
+    """
+
+    def __init__(
+        self,
+        port: int = 9464,
+        host: str = "127.0.0.1",
+        sink: Optional[MetricsSink] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.sink = sink or MetricsSink()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsServer":
+        registry = self.sink.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ocrtoolkit-metrics", daemon=True
+        )
+        self._thread.start()
+        add_hook(self.sink)
+        return self
+
+    def stop(self):
+        remove_hook(self.sink)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
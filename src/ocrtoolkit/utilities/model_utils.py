@@ -1,3 +1,12 @@
+import hashlib
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+
 def load_state_dict(path, model, ignore_keys: list = None):
     import torch
 
@@ -51,3 +60,149 @@ def reparameterize(model):
             reparameterize(child)
 
     return model
+
+
+@contextmanager
+def quantized_engine(backend: Optional[str]):
+    """Sets torch.backends.quantized.engine to backend (if not None),
+    restoring the previous engine on exit
+    """
+    import torch
+
+    previous = torch.backends.quantized.engine
+    if backend is not None:
+        torch.backends.quantized.engine = backend
+    try:
+        yield
+    finally:
+        torch.backends.quantized.engine = previous
+
+
+def quantize_int8(
+    model, mode="dynamic", calib_batches: list = None, backend: Optional[str] = None
+):
+    """Quantizes a torch model to int8 for CPU inference.
+
+    mode="dynamic": Linear/LSTM/GRU weights are stored in int8 and
+    activations are quantized on the fly. No calibration needed.
+    mode="static": additionally, the convolutional feature extractor
+    (model.feat_extractor) is quantized with FX graph mode post training
+    quantization, observers are calibrated by running calib_batches
+    through the full model. Heads stay dynamically quantized.
+    backend is the quantized engine used while quantizing (default: the
+    current torch.backends.quantized.engine), the global engine is left
+    unchanged. The returned model lives on the cpu. If no float parameter
+    is left, an empty one is added, as doctr's predictors read the device
+    and dtype of the first parameter.
+    """
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    model = model.cpu().eval()
+    backend = backend or torch.backends.quantized.engine
+    with quantized_engine(backend):
+        if mode == "static":
+            from torch.ao.quantization import get_default_qconfig_mapping
+            from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+            if not calib_batches:
+                raise ValueError("Static quantization needs calibration batches.")
+            if not hasattr(model, "feat_extractor"):
+                raise ValueError("Static quantization needs a model.feat_extractor.")
+            example_inputs = (calib_batches[0][:1],)
+            model.feat_extractor = prepare_fx(
+                model.feat_extractor,
+                get_default_qconfig_mapping(backend),
+                example_inputs,
+            )
+            with torch.no_grad():
+                for batch in calib_batches:
+                    model(batch)
+            model.feat_extractor = convert_fx(model.feat_extractor)
+        elif mode != "dynamic":
+            raise ValueError(f"Unknown quantization mode {mode}.")
+
+        model = quantize_dynamic(
+            model, {torch.nn.Linear, torch.nn.LSTM, torch.nn.GRU}, dtype=torch.qint8
+        )
+    if next(model.parameters(), None) is None:
+        model.register_parameter(
+            "device_anchor", torch.nn.Parameter(torch.zeros(0), requires_grad=False)
+        )
+    return model
+
+
+def hash_state_dict(module) -> str:
+    """Returns the blake2b hex digest of the names, dtypes, shapes and
+    values of the state_dict of a torch module
+    """
+    import torch
+
+    hasher = hashlib.blake2b(digest_size=20)
+    for name, tensor in sorted(module.state_dict().items()):
+        if not isinstance(tensor, torch.Tensor):
+            continue
+        tensor = tensor.detach().cpu().contiguous()
+        hasher.update(f"{name}:{tensor.dtype}:{tuple(tensor.shape)}".encode())
+        hasher.update(tensor.reshape(-1).view(torch.uint8).numpy().tobytes())
+    return hasher.hexdigest()
+
+
+@contextmanager
+def _inductor_cache_dir(path):
+    """Sets the inductor cache dir to path, restoring the previous one on exit"""
+    import torch
+
+    previous = os.environ.get("TORCHINDUCTOR_CACHE_DIR")
+    os.environ["TORCHINDUCTOR_CACHE_DIR"] = str(path)
+    try:
+        with torch._inductor.config.patch(fx_graph_cache=True):
+            yield
+    finally:
+        if previous is None:
+            os.environ.pop("TORCHINDUCTOR_CACHE_DIR", None)
+        else:
+            os.environ["TORCHINDUCTOR_CACHE_DIR"] = previous
+
+
+def compile_module(module, mode: str, example_inputs: tuple, cache_path=None):
+    """Compiles a torch module to cut the python overhead of forward passes.
+
+    mode="script": torch.jit.script
+    mode="trace": torch.jit.trace on example_inputs
+    mode="compile": torch.compile
+    TorchScript artifacts are loaded from cache_path when it exists,
+    else saved there after compilation. For torch.compile, the module is
+    warmed up on example_inputs with cache_path as the inductor cache dir
+    (only during that call), so that later processes reuse its kernels.
+    """
+    import torch
+
+    if mode == "compile":
+        compiled = torch.compile(module.eval())
+        if cache_path is not None:
+            # inductor compiles lazily, on the first call
+            with _inductor_cache_dir(cache_path), torch.no_grad():
+                compiled(*example_inputs)
+        return compiled
+
+    if mode not in ("script", "trace"):
+        raise ValueError(f"Unknown compile mode {mode}.")
+    device = next(module.parameters()).device
+    if cache_path is not None and Path(cache_path).is_file():
+        logger.info(f"Loading compiled module from {cache_path}")
+        return torch.jit.load(str(cache_path), map_location=device)
+
+    module = module.eval()
+    with torch.no_grad():
+        if mode == "script":
+            compiled = torch.jit.script(module)
+        else:
+            compiled = torch.jit.trace(module, example_inputs)
+    if cache_path is not None:
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(cache_path).with_suffix(f".{os.getpid()}.tmp")
+        torch.jit.save(compiled, str(tmp_path))
+        os.replace(tmp_path, cache_path)
+        logger.info(f"Saved compiled module to {cache_path}")
+    return compiled
@@ -1,16 +1,32 @@
 import hashlib
+import http.client
+import os
+import random
+import shutil
+import threading
+import time
 import urllib.error
 import urllib.request
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional, Tuple, Type
 
 from loguru import logger
-from tqdm.autonotebook import tqdm
 
-from ocrtoolkit.utilities.io_utils import extract_files
+from ocrtoolkit.utilities.io_utils import FileLock, extract_files
 
+# errors after which a download is retried, resuming where it stopped
+# (URLErrors, e.g. 404 or an unknown host, move on to the next URL instead)
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, http.client.HTTPException)
 
-def retrieve_file(url: str, filename: Path, chunk_size: int = 1024) -> None:
+
+def retrieve_file(
+    url: str,
+    filename: Path,
+    chunk_size: int = 1 << 20,
+    resume: bool = True,
+    timeout: float = 60.0,
+    progress: bool = True,
+) -> None:
     """
     Helper function to retrieve a file from a URL.
 
@@ -18,15 +34,52 @@ def retrieve_file(url: str, filename: Path, chunk_size: int = 1024) -> None:
         url (str): URL of the file to download.
         filename (Path): Destination filename as a Path object.
         chunk_size (int): Size of the chunks for downloading the file.
+        resume (bool): Continue a partial filename with an HTTP Range request.
+            The download restarts from scratch if the server ignores it.
+        timeout (float): Socket timeout in seconds.
+        progress (bool): Show a progress bar.
+
+    Raises:
+        ConnectionError: If the connection closed before the end of the file.
     """
-    with filename.open("wb") as fh, urllib.request.urlopen(url) as response:
-        progress_bar = tqdm(total=response.length)
-        for chunk in iter(lambda: response.read(chunk_size), ""):
-            if not chunk:
-                break
-            progress_bar.update(chunk_size)
-            fh.write(chunk)
-        progress_bar.close()
+    from tqdm.autonotebook import tqdm
+
+    offset = filename.stat().st_size if resume and filename.is_file() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    try:
+        response = urllib.request.urlopen(
+            urllib.request.Request(url, headers=headers), timeout=timeout
+        )
+    except urllib.error.HTTPError as e:
+        # range not satisfiable: the partial file is already complete
+        if e.code == 416 and offset:
+            return
+        raise
+    with response:
+        if offset and response.status != 206:
+            offset = 0
+        total = None if response.length is None else offset + response.length
+        with filename.open("ab" if offset else "wb") as fh, tqdm(
+            total=total,
+            initial=offset,
+            unit="B",
+            unit_scale=True,
+            disable=not progress,
+        ) as progress_bar:
+            while chunk := response.read(chunk_size):
+                fh.write(chunk)
+                progress_bar.update(len(chunk))
+    if total is not None and filename.stat().st_size < total:
+        raise ConnectionError(f"Incomplete download of {url}")
+
+
+def hash_file_sha256(file_path: Path, chunk_size: int = 1 << 20) -> str:
+    """Returns the SHA256 hex digest of a file"""
+    hasher = hashlib.sha256()
+    with file_path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
 
 def verify_file_integrity(file_path: Path, hash_prefix: str) -> bool:
@@ -40,11 +93,63 @@ def verify_file_integrity(file_path: Path, hash_prefix: str) -> bool:
     Returns:
         bool: True if the file integrity is verified, False otherwise.
     """
-    hasher = hashlib.sha256()
-    with file_path.open("rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest().startswith(hash_prefix)
+    return hash_file_sha256(file_path).startswith(hash_prefix)
+
+
+def _env_list(name: str, sep: str) -> List[str]:
+    return [item for item in os.environ.get(name, "").split(sep) if item]
+
+
+def _link_atomic(src: Path, dst: Path):
+    """Hard links (or copies) src to dst, replacing dst atomically"""
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _add_blob(file_path: Path, blob_dir: Path, move: bool) -> Path:
+    """Stores file_path in blob_dir under its SHA256, returns the blob path"""
+    blob_path = blob_dir / hash_file_sha256(file_path)
+    if blob_path.is_file():
+        if move:
+            file_path.unlink()
+        return blob_path
+    blob_dir.mkdir(parents=True, exist_ok=True)
+    if move:
+        try:
+            os.replace(file_path, blob_path)
+            return blob_path
+        except OSError:
+            pass
+    tmp = blob_dir / f".{blob_path.name}.{os.getpid()}.tmp"
+    shutil.copyfile(file_path, tmp)
+    os.replace(tmp, blob_path)
+    if move:
+        file_path.unlink()
+    return blob_path
+
+
+def _find_blob(blob_dir: Path, hash_prefix: Optional[str]) -> Optional[Path]:
+    if not hash_prefix or not blob_dir.is_dir():
+        return None
+    return next(blob_dir.glob(f"{hash_prefix}*"), None)
+
+
+def _untar(file_path: Path) -> str:
+    output_dir = file_path.parent.joinpath(file_path.stem)
+    if output_dir.is_dir():
+        logger.info(f"Found {output_dir}. Skipping untar.")
+        return output_dir.as_posix()
+    logger.info(f"Extracting to {output_dir}")
+    tmp_dir = output_dir.with_name(f".{output_dir.name}.{os.getpid()}.tmp")
+    suffixes = [".pdiparams", ".pdiparams.info", ".pdmodel"]
+    extract_files(file_path.as_posix(), suffixes, tmp_dir)
+    os.replace(tmp_dir, output_dir)
+    return output_dir.as_posix()
 
 
 def download_file(
@@ -54,6 +159,11 @@ def download_file(
     cache_dir: Optional[str] = None,
     cache_subdir: Optional[str] = None,
     untar: bool = False,
+    mirrors: Optional[List[str]] = None,
+    offline_dirs: Optional[List[str]] = None,
+    offline: Optional[bool] = None,
+    max_retries: int = 5,
+    progress: bool = True,
 ) -> Path:
     """
     Download a file from a URL to a local directory, optionally verifying its hash.
@@ -65,50 +175,163 @@ def download_file(
         cache_dir: Root directory for caching the file.
         cache_subdir: Optional subdirectory to use for caching.
         untar: Whether to untar the file.
+        mirrors: Base URLs tried before url, as mirror/file_name.
+            Default: the comma separated OCRTOOLKIT_MIRRORS.
+        offline_dirs: Directories searched for file_name before downloading.
+            Default: the OCRTOOLKIT_OFFLINE_DIRS paths (os.pathsep separated).
+        offline: Never download, default: OCRTOOLKIT_OFFLINE=1.
+        max_retries: Retries per URL, each resuming the partial download.
+        progress: Show a progress bar.
 
     Returns:
         Path: The path to the downloaded (and verified) file.
         If untar is True, the file is untarred and folder is returned.
+
+    Files are stored once per content in <cache_dir>/ocrtoolkit/blobs (named
+    by SHA256), and hard linked (or copied) to their cache path. Downloads
+    go to a partial file under an inter-process lock, so concurrent workers
+    download a file once, and an interrupted download resumes where it
+    stopped. The cache path is only replaced atomically, once complete.
     """
     if file_name is None:
         file_name = Path(url).name.split("&")[0]
+    if mirrors is None:
+        mirrors = _env_list("OCRTOOLKIT_MIRRORS", ",")
+    if offline_dirs is None:
+        offline_dirs = _env_list("OCRTOOLKIT_OFFLINE_DIRS", os.pathsep)
+    if offline is None:
+        offline = os.environ.get("OCRTOOLKIT_OFFLINE", "0") == "1"
 
-    cache_dir_path = Path(cache_dir or Path.home() / ".cache")
-    if cache_subdir:
-        cache_dir_path /= cache_subdir
+    cache_root = Path(cache_dir or Path.home() / ".cache")
+    blob_dir = cache_root / "ocrtoolkit" / "blobs"
+    cache_dir_path = cache_root / cache_subdir if cache_subdir else cache_root
     cache_dir_path.mkdir(parents=True, exist_ok=True)
 
     file_path = cache_dir_path / file_name
 
-    if file_path.is_file() and (
-        hash_prefix is None or verify_file_integrity(file_path, hash_prefix)
-    ):
-        logger.info(f"Found {file_path}. Skipping download.")
-    else:
-        try:
-            logger.info(f"Downloading to {file_path}")
-            retrieve_file(url, file_path)
-        except (urllib.error.URLError, IOError) as e:
-            if url.startswith("https"):
-                alternative_url = url.replace("https:", "http:")
-                retrieve_file(alternative_url, file_path)
-            else:
-                raise e
-
-        if hash_prefix and not verify_file_integrity(file_path, hash_prefix):
-            file_path.unlink()
-            raise ValueError(
-                f"Corrupted download, hash of {url} does not match its expected value"
+    with FileLock(cache_dir_path / f".{file_name}.lock"):
+        blob_path = _find_blob(blob_dir, hash_prefix)
+
+        def is_valid(path: Path) -> bool:
+            if not path.is_file() or hash_prefix is None:
+                return path.is_file()
+            # a link to the blob of that hash needs no rehashing
+            if blob_path is not None and os.path.samefile(path, blob_path):
+                return True
+            return verify_file_integrity(path, hash_prefix)
+
+        if is_valid(file_path):
+            logger.info(f"Found {file_path}. Skipping download.")
+            if untar and file_path.suffix == ".tar":
+                return _untar(file_path)
+            return file_path.as_posix()
+
+        l_offline = [Path(d) / file_name for d in offline_dirs]
+        offline_path = next((path for path in l_offline if is_valid(path)), None)
+        if blob_path is not None:
+            logger.info(f"Found {file_name} in the cache as {blob_path.name}")
+        elif offline_path is not None:
+            logger.info(f"Found {offline_path}")
+            blob_path = _add_blob(offline_path, blob_dir, move=False)
+        elif offline:
+            raise FileNotFoundError(
+                f"{file_name} not found in {cache_dir_path} or {offline_dirs} "
+                "and downloads are disabled (offline)"
             )
+        else:
+            l_urls = [f"{mirror.rstrip('/')}/{file_name}" for mirror in mirrors]
+            l_urls.append(url)
+            if url.startswith("https:"):
+                l_urls.append(url.replace("https:", "http:", 1))
 
-    if untar and file_path.suffix == ".tar" and file_path.is_file():
-        output_dir = file_path.parent.joinpath(file_path.stem)
-        if output_dir.is_dir():
-            logger.info(f"Found {output_dir}. Skipping untar.")
-            return output_dir.as_posix()
-        logger.info(f"Extracting to {output_dir}")
-        suffixes = [".pdiparams", ".pdiparams.info", ".pdmodel"]
-        extract_files(file_path.as_posix(), suffixes, output_dir)
-        return output_dir.as_posix()
+            part_path = cache_dir_path / f".{file_name}.part"
+            for idx, candidate in enumerate(l_urls):
+                try:
+                    logger.info(f"Downloading {candidate} to {file_path}")
+                    retry_call(
+                        retrieve_file,
+                        candidate,
+                        part_path,
+                        retry_on=RETRYABLE_ERRORS,
+                        max_retries=max_retries,
+                        progress=progress,
+                    )
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    # a partial file of another URL may not be the same file
+                    part_path.unlink(missing_ok=True)
+                    if idx == len(l_urls) - 1:
+                        raise
+                    logger.warning(f"Download of {candidate} failed: {e!r}")
 
-    return file_path.as_posix()
+            if hash_prefix and not verify_file_integrity(part_path, hash_prefix):
+                part_path.unlink()
+                raise ValueError(
+                    f"Corrupted download, hash of {url} does not match "
+                    "its expected value"
+                )
+            blob_path = _add_blob(part_path, blob_dir, move=True)
+
+        _link_atomic(blob_path, file_path)
+        if untar and file_path.suffix == ".tar":
+            return _untar(file_path)
+        return file_path.as_posix()
+
+
+class RateLimiter:
+    """Thread safe token bucket limiting calls to rate per second
+    Up to burst tokens can be spent at once after an idle period.
+    Larger requests are paid in installments of at most burst tokens,
+    so the rate also holds for them.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Blocks until tokens are available and spends them"""
+        remaining = tokens
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                installment = min(remaining, self.burst)
+                if self._tokens >= installment:
+                    self._tokens -= installment
+                    remaining -= installment
+                    if remaining <= 0:
+                        return
+                    installment = min(remaining, self.burst)
+                wait = (installment - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def retry_call(
+    fn: Callable,
+    *args,
+    retry_on: Tuple[Type[BaseException], ...] = (ConnectionError, TimeoutError),
+    max_retries: int = 5,
+    backoff: float = 0.5,
+    max_backoff: float = 30.0,
+    **kwargs,
+):
+    """Calls fn(*args, **kwargs), retrying on the retry_on exceptions
+    with exponential backoff and full jitter
+    The last exception is raised after max_retries retries
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == max_retries:
+                raise
+            delay = random.uniform(0, min(max_backoff, backoff * 2**attempt))
+            logger.debug(f"Retrying {fn} in {delay:.2f}s after {e!r}")
+            time.sleep(delay)
@@ -0,0 +1,77 @@
+from typing import Optional
+
+import numpy as np
+
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+
+
+def make_page_boxes(
+    num_boxes: int,
+    width: int = 2480,
+    height: int = 3508,
+    words_per_line: int = 12,
+    min_line_h: float = 16,
+    seed: Optional[int] = 0,
+) -> np.ndarray:
+    """Returns (num_boxes, 4) xyxy word boxes laid out like a text page
+    Words are placed left to right in lines, top to bottom, with some
+    jitter in size and position. Lines are at least min_line_h pixels
+    high, so very large num_boxes extend past height (a long scroll).
+    """
+    rng = np.random.default_rng(seed)
+    idxs = np.arange(num_boxes)
+    num_lines = max(int(np.ceil(num_boxes / words_per_line)), 1)
+    line_h = max(height / num_lines, min_line_h)
+    word_w = width / words_per_line
+    col = idxs % words_per_line
+    line = idxs // words_per_line
+    x1 = col * word_w + rng.uniform(0, 0.05, num_boxes) * word_w
+    x2 = x1 + rng.uniform(0.8, 0.95, num_boxes) * word_w
+    y1 = line * line_h + rng.uniform(0, 0.1, num_boxes) * line_h
+    y2 = y1 + rng.uniform(0.6, 0.8, num_boxes) * line_h
+    return np.stack([x1, y1, x2, y2], axis=1)
+
+
+def make_detection_results(
+    num_boxes: int,
+    width: int = 2480,
+    height: int = 3508,
+    num_labels: int = 3,
+    with_text: bool = True,
+    seed: Optional[int] = 0,
+) -> DetectionResults:
+    """Returns a synthetic DetectionResults with num_boxes word boxes
+    (see make_page_boxes), random confidences, labels and texts
+    """
+    rng = np.random.default_rng(seed)
+    np_boxes = make_page_boxes(num_boxes, width, height, seed=seed)
+    height = max(height, int(np.ceil(np_boxes[:, 3].max(initial=0))))
+    boxes = np_boxes.tolist()
+    confs = rng.uniform(0.3, 1.0, num_boxes).tolist()
+    labels = rng.integers(0, num_labels, num_boxes).astype(str).tolist()
+    l_bboxes = [
+        BBox(
+            *box,
+            conf=conf,
+            label=label,
+            text=f"word{idx}" if with_text else "",
+            text_conf=conf if with_text else 0,
+        )
+        for idx, (box, conf, label) in enumerate(zip(boxes, confs, labels))
+    ]
+    return DetectionResults(l_bboxes, width, height, img_name="synthetic")
+
+
+def make_page_image(
+    num_boxes: int = 200,
+    width: int = 1240,
+    height: int = 1754,
+    seed: Optional[int] = 0,
+) -> np.ndarray:
+    """Returns a white RGB page with a dark rectangle per word box"""
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    boxes = make_page_boxes(num_boxes, width, height, seed=seed).astype(int)
+    for x1, y1, x2, y2 in boxes.tolist():
+        image[y1:y2, x1:x2] = 32
+    return image
@@ -1,5 +1,20 @@
 """Wrappers for various OCR-related tasks."""
 
-from .bbox import *
-from .detection_results import *
-from .recognition_results import *
+from typing import TYPE_CHECKING
+
+from ocrtoolkit.lazy import attach
+
+if TYPE_CHECKING:
+    from .bbox import *
+    from .detection_results import *
+    from .recognition_results import *
+
+# submodules are imported on first access of one of their names
+__getattr__, __dir__, __all__ = attach(
+    __name__,
+    {
+        "bbox": ["BBox"],
+        "detection_results": ["DetectionResults"],
+        "recognition_results": ["RecognitionResults"],
+    },
+)
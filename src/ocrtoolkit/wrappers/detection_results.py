@@ -1,12 +1,11 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 from ocrtoolkit.datasets.base import BaseDS
 from ocrtoolkit.datasets.imageds import ImageDS
 from ocrtoolkit.utilities.box_utils import resolve_lines
-from ocrtoolkit.utilities.draw_utils import draw_bbox
+from ocrtoolkit.utilities.draw_utils import draw_bboxes
 from ocrtoolkit.utilities.misc_utils import get_samples, get_uuid
 from ocrtoolkit.wrappers.bbox import BBox
 
@@ -23,16 +22,76 @@ class DetectionResults:
     width: int
     height: int
     img_name: str
+    error: Optional[str] = None  #: Why the image has no results, e.g. an API error.
 
     def __init__(self, bboxes, width, height, img_name="", denormalize=True):
-        self.bboxes = bboxes
+        self._arrays = None
+        self._bboxes = bboxes
         self.width = width
         self.height = height
         self.img_name = img_name
         if denormalize:
-            self.bboxes = [bbox.denormalize(self.width, self.height) for bbox in bboxes]
+            self._bboxes = [
+                bbox.denormalize(self.width, self.height) for bbox in bboxes
+            ]
+
+    @classmethod
+    def from_arrays(
+        cls,
+        coords: np.ndarray,
+        width: int,
+        height: int,
+        confs: Optional[np.ndarray] = None,
+        labels: Optional[np.ndarray] = None,
+        normalized=False,
+        img_name="",
+    ) -> "DetectionResults":
+        """Creates a DetectionResults from raw model outputs
+        coords is a Nx4 array of x1, y1, x2, y2, confs and labels are
+        optional arrays of length N (defaults to conf 1.0 and label "0")
+        Denormalization is done in one vectorized op, and the BBox objects
+        are only built when self.bboxes is first accessed
+        """
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 4)
+        if normalized:
+            coords = coords * np.array([width, height, width, height])
+        num_boxes = len(coords)
+        confs = (
+            np.ones(num_boxes)
+            if confs is None
+            else np.asarray(confs, dtype=np.float64).reshape(-1)
+        )
+        labels = (
+            np.full(num_boxes, "0")
+            if labels is None
+            else np.asarray(labels).astype(str).reshape(-1)
+        )
+        results = cls([], width, height, img_name, denormalize=False)
+        results._bboxes = None
+        results._arrays = (coords.astype(np.int64), confs, labels)
+        return results
+
+    @property
+    def bboxes(self) -> List[BBox]:
+        if self._bboxes is None:
+            coords, confs, labels = self._arrays
+            self._bboxes = [
+                BBox(*bbox, conf=conf, label=label)
+                for bbox, conf, label in zip(
+                    coords.tolist(), confs.tolist(), labels.tolist()
+                )
+            ]
+            self._arrays = None
+        return self._bboxes
+
+    @bboxes.setter
+    def bboxes(self, bboxes: List[BBox]):
+        self._bboxes = bboxes
+        self._arrays = None
 
     def __len__(self):
+        if self._arrays is not None:
+            return len(self._arrays[0])
         return len(self.bboxes)
 
     def __getitem__(self, idx):
@@ -56,18 +115,54 @@ class DetectionResults:
         2. Nx9 array with the x1, y1, x2, y2, conf, normalized, label,
         text, text_conf
         """
-        bboxes = self.bboxes
-        if normalize:
-            bboxes = [bbox.normalize(self.width, self.height) for bbox in self.bboxes]
-        np_arr = np.array([bbox.to_numpy(encode=encode) for bbox in bboxes])
+        if self._arrays is not None and len(self) > 0:
+            np_arr = self._arrays_to_numpy(normalize)
+            if encode:
+                np_arr = np.char.encode(np_arr, "UTF-8")
+        else:
+            np_arr = self._bboxes_to_numpy(normalize, encode)
         if include_meta:
-            metadata = [[self.img_name, self.width, self.height]] * len(bboxes)
+            metadata = [[self.img_name, self.width, self.height]] * len(np_arr)
             np_meta = np.array(metadata)
             if encode:
                 np_meta = np.char.encode(np_meta, "UTF-8")
             np_arr = np.concatenate([np_arr, np_meta], axis=1)
         return np_arr
 
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the (N, 4) coords, (N,) confs and (N,) str labels
+        Free for results built with from_arrays (no BBox objects are built)
+        """
+        if self._arrays is not None:
+            return self._arrays
+        bboxes = self.bboxes
+        return (
+            np.array([bbox.values for bbox in bboxes], dtype=np.float64).reshape(-1, 4),
+            np.array([bbox.conf for bbox in bboxes], dtype=np.float64),
+            np.array([str(bbox.label) for bbox in bboxes], dtype=str),
+        )
+
+    def _arrays_to_numpy(self, normalize=False) -> np.ndarray:
+        """Same layout as BBox.to_numpy, built column-wise from the arrays"""
+        coords, confs, labels = self._arrays
+        num_boxes = len(coords)
+        if normalize:
+            coords = coords / np.array([self.width, self.height] * 2)
+        columns = [coords[:, i].astype(str) for i in range(4)] + [
+            np.full(num_boxes, str(normalize)),
+            confs.astype(str),
+            labels,
+            np.full(num_boxes, ""),
+            np.full(num_boxes, "0"),
+        ]
+        return np.stack(columns, axis=1)
+
+    def _bboxes_to_numpy(self, normalize=False, encode=False) -> np.ndarray:
+        bboxes = self.bboxes
+        if normalize:
+            bboxes = [bbox.normalize(self.width, self.height) for bbox in self.bboxes]
+        return np.array([bbox.to_numpy(encode=encode) for bbox in bboxes])
+
     def group_bboxes(
         self, groups: Optional[List[List[int]]] = None, detect_lines=False, **kwargs
     ):
@@ -271,6 +366,35 @@ class DetectionResults:
         self.bboxes.sort(key=lambda x: x.x1)
         return self
 
+    def draw_on(
+        self,
+        canvas: np.ndarray,
+        color: tuple = (255, 0, 0),
+        show_conf=False,
+        show_label=False,
+        show_text=False,
+    ) -> np.ndarray:
+        """Draws the bboxes on canvas (an RGB array, modified in place)
+        All bboxes are drawn in one draw_bboxes call
+        If bbox color is dark, text color is light and vice versa
+        """
+        black, white = (0, 0, 0), (255, 255, 255)
+        text_color = white if np.mean(color) < 128 else black
+        coords = self.to_arrays()[0]
+        labels = None
+        if show_label or show_conf or show_text:
+            labels = []
+            for bbox in self.bboxes:
+                parts = []
+                if show_label:
+                    parts.append(bbox.label)
+                if show_conf:
+                    parts.append(f"{bbox.conf:.2f}")
+                if show_text:
+                    parts.append(bbox.text)
+                labels.append(" ".join(parts))
+        return draw_bboxes(canvas, coords, labels, color=color, text_color=text_color)
+
     def draw(
         self,
         parent_ds: "BaseDS",
@@ -285,30 +409,19 @@ class DetectionResults:
         If show_label is True, displays label
         If boxes are normalized, it is denormalized before drawing
         If bbox color is dark, text color is light and vice versa
+        For many pages, see det_utils.export_annotated
         """
-        canvas = np.array(parent_ds[self.img_name])
-        black, white = (0, 0, 0), (255, 255, 255)
-        text_color = white if np.mean(color) < 128 else black
-
-        for bbox in self.bboxes:
-
-            labels = []
-            if show_label:
-                labels.append(bbox.label)
-            if show_conf:
-                labels.append(f"{bbox.conf:.2f}")
-            if show_text:
-                labels.append(bbox.text)
-
-            canvas = draw_bbox(
-                canvas,
-                bbox.values,
-                " ".join(labels),
-                color=color,
-                text_color=text_color,
-            )
+        canvas = self.draw_on(
+            np.array(parent_ds[self.img_name]),
+            color=color,
+            show_conf=show_conf,
+            show_label=show_label,
+            show_text=show_text,
+        )
 
         if display:
+            import matplotlib.pyplot as plt
+
             plt.figure(figsize=(10, 10))
             plt.axis("off")
             plt.imshow(canvas)
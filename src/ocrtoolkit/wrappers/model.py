@@ -1,10 +1,13 @@
+import itertools
 from abc import ABCMeta, abstractmethod
-from typing import Any, List
+from typing import Any, List, Optional, Tuple, Union
 
 import numpy as np
 from loguru import logger
 
+from ocrtoolkit.utilities.box_utils import get_tile_boxes, nms, on_tile_seams
 from ocrtoolkit.utilities.img_utils import cv2_tfm_to_3ch
+from ocrtoolkit.wrappers.bbox import BBox
 from ocrtoolkit.wrappers.detection_results import DetectionResults
 from ocrtoolkit.wrappers.recognition_results import RecognitionResults
 
@@ -13,6 +16,8 @@ class BaseModel(metaclass=ABCMeta):
     model: Any
     path: str
     device: str
+    arch: str = None  #: Name of the arch class the model was loaded from.
+    quantized: Optional[str] = None  #: Quantization mode, None for float weights.
     valid_kwargs = set()
 
     def __init__(self, model, path=None, device="cpu", **kwargs):
@@ -40,9 +45,152 @@ class BaseModel(metaclass=ABCMeta):
 
 
 class DetectionModel(BaseModel):
+    tiling: Optional[dict] = None  #: Tiled inference options, see set_tiling.
+
+    def set_tiling(
+        self,
+        tile_size: Optional[Union[int, Tuple[int, int]]] = 1024,
+        overlap: float = 0.2,
+        batch_size: int = 8,
+        iou_thresh: float = 0.5,
+        metric: str = "ios",
+    ):
+        """Enables tiled inference in predict, tile_size=None disables it
+        tile_size is (w, h) or an int for square tiles, in pixels
+        See predict_tiled for the other options
+        """
+        if tile_size is None:
+            self.tiling = None
+        else:
+            if isinstance(tile_size, int):
+                tile_size = (tile_size, tile_size)
+            self.tiling = {
+                "tile_size": tuple(tile_size),
+                "overlap": overlap,
+                "batch_size": batch_size,
+                "iou_thresh": iou_thresh,
+                "metric": metric,
+            }
+        return self
+
     def predict(self, images: List[np.ndarray], **kwargs) -> List[DetectionResults]:
+        if self.tiling is not None:
+            return self.predict_tiled(images, **self.tiling, **kwargs)
         return super().predict(images, **kwargs)
 
+    def predict_tiled(
+        self,
+        images: List[np.ndarray],
+        tile_size: Tuple[int, int] = (1024, 1024),
+        overlap: float = 0.2,
+        batch_size: int = 8,
+        iou_thresh: float = 0.5,
+        metric: str = "ios",
+        **kwargs,
+    ) -> List[DetectionResults]:
+        """Runs predict on overlapping tiles of the images
+        Each image is cut into tile_size tiles overlapping by overlap * tile_size
+        Tiles of all images are predicted in batches of batch_size, so memory
+        is bounded by the batch of tiles and not by the page size.
+        Boxes are shifted back to page coordinates and boxes on the tile seams
+        are merged: NMS with the given metric groups duplicates, and each
+        group is replaced by the union of its boxes with the max confidence.
+        Only boxes in regions covered by several tiles go through NMS.
+        """
+        l_tiles = [
+            get_tile_boxes(image.shape[1], image.shape[0], tile_size, overlap)
+            for image in images
+        ]
+        l_page_bboxes = [[] for _ in images]
+        l_page_coords = [[] for _ in images]
+        jobs = (
+            (img_idx, tile) for img_idx, tiles in enumerate(l_tiles) for tile in tiles
+        )
+        while True:
+            chunk = list(itertools.islice(jobs, batch_size))
+            if not chunk:
+                break
+            crops = [
+                np.ascontiguousarray(images[img_idx][y1:y2, x1:x2])
+                for img_idx, (x1, y1, x2, y2) in chunk
+            ]
+            l_results = super().predict(crops, **kwargs)
+            for (img_idx, tile), results in zip(chunk, l_results):
+                if len(results) == 0:
+                    continue
+                offset = np.array([tile[0], tile[1], tile[0], tile[1]])
+                coords = np.array([bbox.values for bbox in results.bboxes]) + offset
+                l_page_coords[img_idx].append(coords)
+                l_page_bboxes[img_idx].extend(results.bboxes)
+
+        return [
+            self._merge_tiles(bboxes, coords, tiles, image, iou_thresh, metric)
+            for bboxes, coords, tiles, image in zip(
+                l_page_bboxes, l_page_coords, l_tiles, images
+            )
+        ]
+
+    @staticmethod
+    def _merge_tiles(
+        bboxes: List[BBox],
+        l_coords: List[np.ndarray],
+        tiles: np.ndarray,
+        image: np.ndarray,
+        iou_thresh: float,
+        metric: str,
+    ) -> DetectionResults:
+        height, width = image.shape[:2]
+        if not bboxes:
+            return DetectionResults([], width=width, height=height)
+        coords = np.concatenate(l_coords).astype(np.float64)
+        confs = np.array([bbox.conf for bbox in bboxes], dtype=np.float64)
+        labels = np.array([bbox.label for bbox in bboxes])
+
+        on_seams = on_tile_seams(coords, tiles)
+        seam_idxs = np.flatnonzero(on_seams)
+        seam_coords = coords[seam_idxs]
+        # merging is repeated until stable, as a union box can overlap
+        # boxes that none of its parts overlapped (e.g. 3 tiles on a word)
+        while len(seam_idxs):
+            keep, groups = nms(
+                seam_coords,
+                confs[seam_idxs],
+                iou_thresh=iou_thresh,
+                labels=labels[seam_idxs],
+                metric=metric,
+                return_groups=True,
+            )
+            if len(keep) == len(seam_idxs):
+                break
+            seam_coords = np.stack(
+                [
+                    np.concatenate(
+                        [seam_coords[group, :2].min(0), seam_coords[group, 2:].max(0)]
+                    )
+                    for group in groups
+                ]
+            )
+            seam_idxs = seam_idxs[keep]
+
+        new_coords = np.concatenate([coords[~on_seams], seam_coords])
+        new_bboxes = [bbox for bbox, skip in zip(bboxes, on_seams) if not skip]
+        new_bboxes += [bboxes[idx] for idx in seam_idxs]
+        return DetectionResults(
+            [
+                BBox(
+                    *coord,
+                    normalized=False,
+                    conf=bbox.conf,
+                    label=bbox.label,
+                    text=bbox.text,
+                    text_conf=bbox.text_conf,
+                )
+                for coord, bbox in zip(new_coords, new_bboxes)
+            ],
+            width=width,
+            height=height,
+        )
+
 
 class RecognitionModel(BaseModel):
     def predict(self, images: List[np.ndarray], **kwargs) -> List[RecognitionResults]:
@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 import numpy as np
 
 from ocrtoolkit.datasets.base import BaseDS
@@ -49,6 +48,8 @@ class RecognitionResults:
         canvas = draw_ocr_text(canvas, str_label, color=color, text_color=text_color)
 
         if display:
+            import matplotlib.pyplot as plt
+
             plt.figure(figsize=(6, 2))
             plt.axis("off")
             plt.imshow(canvas)
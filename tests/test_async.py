@@ -0,0 +1,112 @@
+import asyncio
+import gc
+import time
+import unittest
+import weakref
+
+import numpy as np
+
+from ocrtoolkit.core import adetect, adetect_iter, apredict, close_batchers, get_batcher
+from ocrtoolkit.core.batcher import _BATCHERS
+from ocrtoolkit.datasets import ImageDS
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel
+
+
+class SlowDetModel(DetectionModel):
+    """Detector with a fixed per-call cost, to make batching visible"""
+
+    def __init__(self, delay=0.02):
+        super().__init__(model=None, path="slow")
+        self.delay = delay
+        self.batch_sizes = []
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(images))
+        return [
+            DetectionResults(
+                [BBox(0, 0, image.shape[1], image.shape[0])],
+                width=image.shape[1],
+                height=image.shape[0],
+            )
+            for image in images
+        ]
+
+
+def make_ds(num_images, size=32):
+    images = [
+        np.full((size, size + i, 3), i, dtype=np.uint8) for i in range(num_images)
+    ]
+    return ImageDS(images, size=None, apply_gs=False)
+
+
+class AsyncDetectTestCase(unittest.IsolatedAsyncioTestCase):
+    """adetect / adetect_iter tests"""
+
+    async def test_results_in_order(self):
+        """check results keep dataset order and names"""
+        ds = make_ds(10)
+        model = SlowDetModel(delay=0)
+        results = await adetect(model, ds, verbose=False)
+        self.assertEqual([r.img_name for r in results], ds.names)
+        self.assertEqual([r.width for r in results], [32 + i for i in range(10)])
+
+    async def test_concurrent_requests_are_batched(self):
+        """check requests from different coroutines share model calls"""
+        model = SlowDetModel()
+        images = [np.zeros((16, 16, 3), dtype=np.uint8)] * 16
+        results = await asyncio.gather(
+            *(apredict(model, [image], max_batch=8) for image in images)
+        )
+        self.assertEqual(len(results), 16)
+        self.assertLess(len(model.batch_sizes), 16)
+        self.assertEqual(sum(model.batch_sizes), 16)
+
+    async def test_timeout(self):
+        """check per-image timeout raises"""
+        model = SlowDetModel(delay=0.2)
+        with self.assertRaises(asyncio.TimeoutError):
+            await adetect(model, make_ds(2), timeout=0.01, verbose=False)
+
+    async def test_early_close_cancels_pending(self):
+        """check breaking out of the iterator does not leave work queued"""
+        model = SlowDetModel(delay=0.05)
+        gen = adetect_iter(model, make_ds(20), prefetch=4, max_batch=1)
+        first = await gen.__anext__()
+        await gen.aclose()
+        # give the queued images the time to run, if they were not cancelled
+        await asyncio.sleep(0.3)
+        self.assertEqual(first.img_name, "Image: 0")
+        # image 0 and at most the one running at close, of the 4 prefetched
+        self.assertLessEqual(sum(model.batch_sizes), 2)
+
+    async def test_released_model_closes_batcher(self):
+        """check cached batchers do not keep their model alive"""
+        model = SlowDetModel(delay=0)
+        await apredict(model, [np.zeros((16, 16, 3), dtype=np.uint8)])
+        batcher = get_batcher(model)
+        model_ref = weakref.ref(model)
+        del model
+        gc.collect()
+        await asyncio.sleep(0.01)
+        self.assertIsNone(model_ref())
+        self.assertNotIn(batcher, _BATCHERS[asyncio.get_running_loop()].values())
+        self.assertIsNone(batcher._worker)
+        self.assertTrue(batcher.executor._shutdown)
+
+    async def test_close_batchers(self):
+        """check closed batchers are not handed out again"""
+        model = SlowDetModel(delay=0)
+        batcher = get_batcher(model)
+        await close_batchers()
+        self.assertIsNot(get_batcher(model), batcher)
+        await close_batchers()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ocrtoolkit.cli import main
+from ocrtoolkit.core.benchmark import (
+    benchmark_archs,
+    limited_threads,
+    make_synthetic_images,
+)
+from ocrtoolkit.models.arch import STUB_DET, STUB_REC
+from ocrtoolkit.utilities.memory_utils import PeakRSSMonitor, get_rss
+
+
+class BrokenArch:
+    """Arch failing to load"""
+
+    def __init__(self, **kwargs):
+        raise RuntimeError("missing weights")
+
+
+def get_num_threads():
+    """Intra-op threads of OpenCV and torch (None if not installed)"""
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    return cv2.getNumThreads(), torch.get_num_threads() if torch else None
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    """benchmark_archs / bench CLI tests"""
+
+    def test_stub_models(self):
+        """check the stub archs run on synthetic pages and crops"""
+        page = make_synthetic_images("det", 1)[0]
+        results = STUB_DET().predict([page])[0]
+        self.assertGreater(len(results), 0)
+
+        crops = make_synthetic_images("rec", 3)
+        self.assertEqual(len(crops), 3)
+        results = STUB_REC().predict(crops)
+        self.assertEqual(results[0].text, "x".join(map(str, crops[0].shape[:2])))
+
+    def test_benchmark_archs(self):
+        """check one row per arch and batch size, failing archs included"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = str(Path(tmp_dir) / "bench.json")
+            df = benchmark_archs(
+                ["STUB_DET", STUB_REC, BrokenArch],
+                batch_sizes=(1, 4),
+                num_images=4,
+                load_kwargs={"model_kwargs": {"per_image": 0.001}},
+                json_path=json_path,
+                verbose=False,
+            )
+            with open(json_path) as f:
+                records = json.load(f)
+
+        self.assertEqual(len(records), len(df))
+        stub_rows = df[df["arch"].str.startswith("STUB_")]
+        self.assertEqual(stub_rows["bs"].tolist(), [1, 4, 1, 4])
+        self.assertEqual(stub_rows["task"].tolist(), ["det", "det", "rec", "rec"])
+        self.assertTrue((stub_rows["p50_ms"] >= 1).all())
+        self.assertTrue((stub_rows["p95_ms"] >= stub_rows["p50_ms"]).all())
+        self.assertTrue((stub_rows["peak_rss_mb"] > 0).all())
+        # failing archs are reported, not raised
+        broken_row = df[df["arch"] == "BrokenArch"].iloc[0]
+        self.assertIn("missing weights", broken_row["error"])
+
+    def test_threads_restored(self):
+        """check the thread counts of the caller are restored, even on errors"""
+        previous = get_num_threads()
+        num_threads = previous[0] + 2
+        benchmark_archs(
+            ["STUB_REC"], num_threads=(num_threads,), num_images=2, verbose=False
+        )
+        self.assertEqual(get_num_threads(), previous)
+        with self.assertRaises(RuntimeError):
+            with limited_threads(num_threads):
+                self.assertEqual(get_num_threads()[0], num_threads)
+                raise RuntimeError("boom")
+        self.assertEqual(get_num_threads(), previous)
+
+    def test_cli(self):
+        """check the bench command prints the table and writes JSON records"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = str(Path(tmp_dir) / "bench.json")
+            stdout = io.StringIO()
+            with redirect_stdout(stdout):
+                main(
+                    [
+                        "bench",
+                        "STUB_REC",
+                        "--bs",
+                        "2",
+                        "--threads",
+                        "1",
+                        "--num-images",
+                        "4",
+                        "--json",
+                        json_path,
+                    ]
+                )
+            with open(json_path) as f:
+                records = json.load(f)
+        self.assertEqual(len(records), 1)
+        self.assertIn("STUB_REC", stdout.getvalue())
+        self.assertEqual(records[0]["threads"], 1)
+
+    def test_peak_rss_monitor(self):
+        """check PeakRSSMonitor tracks a peak above its start"""
+        with PeakRSSMonitor() as monitor:
+            arr = np.ones(32 * 2**20, dtype=np.uint8)
+            arr.sum()
+        self.assertGreaterEqual(monitor.peak, monitor.start)
+        self.assertGreater(get_rss(), 0)
+        del arr
+
+
+if __name__ == "__main__":
+    unittest.main()
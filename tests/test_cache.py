@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from ocrtoolkit.core import detect
+from ocrtoolkit.datasets import ImageDS
+from ocrtoolkit.utilities.cache_utils import ResultCache
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel
+
+
+class CountingDetModel(DetectionModel):
+    valid_kwargs = set(["conf"])
+
+    def __init__(self):
+        super().__init__(model=None, path="counting")
+        self.num_predicted = 0
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        self.num_predicted += len(images)
+        return [
+            DetectionResults([BBox(1, 2, 3, 4)], image.shape[1], image.shape[0])
+            for image in images
+        ]
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    """ResultCache tests"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        images = [np.full((20, 20 + i, 3), i, dtype=np.uint8) for i in range(4)]
+        self.ds = ImageDS(images, size=None, apply_gs=False, batched=True)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hits_skip_predict(self):
+        """check second run is served from the cache"""
+        model = CountingDetModel()
+        cache = ResultCache(self.tmp_dir.name)
+        first = detect(model, self.ds, stream=False, cache=cache, verbose=False)
+        second = detect(model, self.ds, stream=False, cache=cache, verbose=False)
+        self.assertEqual(model.num_predicted, 4)
+        self.assertEqual(cache.hits, 4)
+        self.assertEqual(cache.hit_rate, 0.5)
+        self.assertEqual([r.width for r in first], [r.width for r in second])
+        self.assertEqual([r.img_name for r in second], self.ds.names)
+
+    def test_kwargs_are_part_of_key(self):
+        """check valid predict kwargs change the key, others do not"""
+        model = CountingDetModel()
+        cache = ResultCache(self.tmp_dir.name)
+        detect(model, self.ds, stream=False, cache=cache, conf=0.5, verbose=False)
+        detect(model, self.ds, stream=False, cache=cache, conf=0.5, verbose=True)
+        self.assertEqual(model.num_predicted, 4)
+        detect(model, self.ds, stream=False, cache=cache, conf=0.1, verbose=False)
+        self.assertEqual(model.num_predicted, 8)
+
+    def test_size_bounded_eviction(self):
+        """check the cache stays within its size budget"""
+        model = CountingDetModel()
+        cache = ResultCache(self.tmp_dir.name, max_size_mb=0.0008)
+        detect(model, self.ds, stream=False, cache=cache, verbose=False)
+        self.assertLessEqual(cache.size, cache.max_size)
+        self.assertGreater(cache.evictions, 0)
+        reopened = ResultCache(self.tmp_dir.name, max_size_mb=0.0008)
+        self.assertEqual(reopened.size, cache.size)
+
+
+if __name__ == "__main__":
+    unittest.main()
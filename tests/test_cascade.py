@@ -0,0 +1,159 @@
+import unittest
+
+import numpy as np
+
+from ocrtoolkit.models.cascade import DetectionCascade, RecognitionCascade
+from ocrtoolkit.utilities.cache_utils import get_model_identity
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel, RecognitionModel
+from ocrtoolkit.wrappers.recognition_results import RecognitionResults
+
+
+class ConstRecModel(RecognitionModel):
+    """Reads the pixel value of the crop as text, with a fixed confidence"""
+
+    def __init__(self, conf_fn):
+        super().__init__(model=None, path="const")
+        self.conf_fn = conf_fn
+        self.num_seen = 0
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        self.num_seen += len(images)
+        return [
+            RecognitionResults(str(image[0, 0, 0]), self.conf_fn(image[0, 0, 0]), 8, 8)
+            for image in images
+        ]
+
+
+class RecognitionCascadeTestCase(unittest.TestCase):
+    """RecognitionCascade tests"""
+
+    def test_only_unsure_crops_are_escalated(self):
+        """check escalation, merge order and stats"""
+        fast = ConstRecModel(lambda value: 0.5 if value % 2 else 0.9)
+        strong = ConstRecModel(lambda value: 0.99)
+        cascade = RecognitionCascade(
+            fast, strong, conf_thresh=0.8, reject_fn=lambda res: res.text == "4"
+        )
+        images = [np.full((8, 8, 3), value, dtype=np.uint8) for value in range(6)]
+        l_results = cascade.predict(cascade.preprocess(images))
+        self.assertEqual([res.text for res in l_results], list("012345"))
+        self.assertEqual(
+            [res.conf for res in l_results], [0.9, 0.99, 0.9, 0.99, 0.99, 0.99]
+        )
+        self.assertEqual(strong.num_seen, 4)
+        self.assertAlmostEqual(cascade.stats.escalation_rate, 4 / 6)
+
+    def test_identity(self):
+        """check cascades of other models or options get other cache identities"""
+        other = ConstRecModel(lambda value: 0.9)
+        other.path = "other"
+        fast, strong = ConstRecModel(lambda value: 0.9), ConstRecModel(
+            lambda value: 0.9
+        )
+        identities = {
+            get_model_identity(cascade)
+            for cascade in [
+                RecognitionCascade(fast, strong),
+                RecognitionCascade(fast, strong),
+                RecognitionCascade(fast, other),
+                RecognitionCascade(fast, strong, conf_thresh=0.5),
+            ]
+        }
+        self.assertEqual(len(identities), 3)
+
+    def test_preprocess_once(self):
+        """check crops are left to the models to preprocess"""
+        cascade = RecognitionCascade(
+            ConstRecModel(lambda value: 0.9), ConstRecModel(lambda value: 0.9)
+        )
+        crops = [np.zeros((8, 8), dtype=np.uint8)]
+        self.assertIs(cascade.preprocess(crops)[0], crops[0])
+
+
+class HalfDetModel(DetectionModel):
+    """Detects the top text line only, or both if full is True"""
+
+    def __init__(self, conf=0.9, full=False):
+        super().__init__(model=None, path="half")
+        self.conf = conf
+        self.full = full
+        self.batch_sizes = []
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        self.batch_sizes.append(len(images))
+        l_bboxes = [BBox(0, 8, 64, 24, conf=self.conf)]
+        if self.full:
+            l_bboxes.append(BBox(0, 40, 64, 56, conf=self.conf))
+        return [DetectionResults(list(l_bboxes), 64, 64) for _ in images]
+
+
+def make_page(num_lines):
+    page = np.full((64, 64, 3), 255, dtype=np.uint8)
+    for line in range(num_lines):
+        page[12 + 32 * line : 20 + 32 * line, 4:60] = 0
+    return page
+
+
+class DetectionCascadeTestCase(unittest.TestCase):
+    """DetectionCascade tests"""
+
+    def test_missed_ink_is_escalated(self):
+        """check pages with uncovered ink go to the strong model in one batch"""
+        fast = HalfDetModel()
+        strong = HalfDetModel(full=True)
+        cascade = DetectionCascade(fast, strong)
+        images = [make_page(1), make_page(2), make_page(1), make_page(2)]
+        l_results = cascade.predict(cascade.preprocess(images))
+        self.assertEqual([len(res) for res in l_results], [1, 2, 1, 2])
+        self.assertEqual(strong.batch_sizes, [2])
+        self.assertAlmostEqual(cascade.stats.escalation_rate, 0.5)
+
+    def test_low_conf_and_predicate(self):
+        """check mean confidence and custom predicate checks"""
+        cascade = DetectionCascade(HalfDetModel(conf=0.3), HalfDetModel(full=True))
+        l_results = cascade.predict([make_page(1)])
+        self.assertEqual(len(l_results[0]), 2)
+
+        cascade = DetectionCascade(
+            HalfDetModel(),
+            HalfDetModel(full=True),
+            escalate_fn=lambda image, results: image.shape[0] > 32,
+        )
+        l_results = cascade.predict([make_page(1)])
+        self.assertEqual(len(l_results[0]), 2)
+
+    def test_identity(self):
+        """check cascades of other models or options get other cache identities"""
+        fast, strong = HalfDetModel(), HalfDetModel(full=True)
+        other = HalfDetModel(full=True)
+        other.path = "other"
+        identities = {
+            get_model_identity(cascade)
+            for cascade in [
+                DetectionCascade(fast, strong),
+                DetectionCascade(fast, strong),
+                DetectionCascade(fast, other),
+                DetectionCascade(fast, strong, min_ink_coverage=0.5),
+                DetectionCascade(fast, strong, min_mean_conf=None),
+            ]
+        }
+        self.assertEqual(len(identities), 4)
+
+    def test_preprocess_once(self):
+        """check pages are left to the models to preprocess"""
+        cascade = DetectionCascade(HalfDetModel(), HalfDetModel(full=True))
+        pages = [make_page(1)[..., 0]]
+        self.assertIs(cascade.preprocess(pages)[0], pages[0])
+        self.assertEqual(len(cascade.predict(pages)[0]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
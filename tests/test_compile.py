@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+try:
+    import torch
+    from doctr.models.recognition.crnn.pytorch import CTCPostProcessor
+
+    from ocrtoolkit.integrations.doctr import compile_model
+except ImportError:
+    torch = None
+
+VOCAB = "abcdefgh"
+
+
+def make_tiny_rec_model(seed):
+    """Doctr-like recognition model, weights drawn from seed"""
+
+    class TinyRec(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            torch.manual_seed(seed)
+            self.conv = torch.nn.Conv2d(3, len(VOCAB) + 1, 3, padding=1)
+            self.pool = torch.nn.AvgPool2d((32, 4))
+            self.cfg = {"input_shape": (3, 32, 128)}
+            self.postprocessor = CTCPostProcessor(VOCAB)
+
+        def forward(self, x, return_model_output=False, return_preds=False):
+            logits = self.pool(self.conv(x)).flatten(2).transpose(1, 2)
+            out = {}
+            if return_model_output:
+                out["out_map"] = logits
+            if return_preds:
+                out["preds"] = self.postprocessor(logits)
+            return out
+
+    return TinyRec().eval()
+
+
+@unittest.skipIf(torch is None, "torch or doctr is not installed")
+class CompileModelTestCase(unittest.TestCase):
+    """compile_model tests"""
+
+    def test_same_class_separate_cache_entries(self):
+        """check modules of one class with other weights are not mixed up"""
+        x = torch.rand(2, 3, 32, 128)
+        models = [make_tiny_rec_model(seed) for seed in (0, 1)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for _ in range(2):  # the second round loads the cached artifacts
+                for model in models:
+                    compiled = compile_model(model, "rec", "trace", tmp_dir)
+                    with torch.no_grad():
+                        expected = model(x, return_model_output=True)["out_map"]
+                        out = compiled(x, return_model_output=True)["out_map"]
+                    torch.testing.assert_close(out, expected)
+            self.assertEqual(len(list(Path(tmp_dir).glob("*.pt"))), 2)
+
+    def test_compile_scopes_inductor_cache_dir(self):
+        """check each model fills its own inductor cache, the env is restored"""
+        previous = os.environ.get("TORCHINDUCTOR_CACHE_DIR")
+        x = torch.rand(3, 3, 32, 128)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for seed in (0, 1):
+                model = make_tiny_rec_model(seed)
+                compiled = compile_model(model, "rec", "compile", tmp_dir)
+                self.assertEqual(os.environ.get("TORCHINDUCTOR_CACHE_DIR"), previous)
+                with torch.no_grad():
+                    expected = model(x, return_model_output=True)["out_map"]
+                    out = compiled(x, return_model_output=True)["out_map"]
+                torch.testing.assert_close(out, expected)
+            l_dirs = [path for path in Path(tmp_dir).iterdir() if path.is_dir()]
+            self.assertEqual(len(l_dirs), 2)
+            for path in l_dirs:
+                self.assertTrue(any(path.rglob("*")))
+
+
+if __name__ == "__main__":
+    unittest.main()
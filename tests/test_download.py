@@ -0,0 +1,140 @@
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from ocrtoolkit.utilities.network_utils import download_file
+
+DATA = os.urandom(300_000)
+SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Serves DATA on /file.bin and /mirror/file.bin, with Range support
+    Sends only half of the body (then closes) while drops > 0
+    """
+
+    drops = 0
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            FileHandler.requests.append((self.path, self.headers.get("Range")))
+            drop = FileHandler.drops > 0
+            FileHandler.drops -= drop
+        if self.path not in ("/file.bin", "/mirror/file.bin"):
+            self.send_error(404)
+            return
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"].split("=")[1].split("-")[0])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(DATA) - 1}")
+        else:
+            self.send_response(200)
+        body = DATA[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[: len(body) // 2] if drop else body)
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadTestCase(unittest.TestCase):
+    """download_file tests, against a local HTTP server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FileHandler.requests = []
+        FileHandler.drops = 0
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = tmp_dir.name
+
+    def download(self, url=None, **kwargs):
+        kwargs = {"cache_dir": self.cache_dir, "progress": False, **kwargs}
+        return download_file(url or f"{self.base_url}/file.bin", **kwargs)
+
+    def test_download_and_cache(self):
+        """check files are downloaded once and cached by content"""
+        path = self.download(hash_prefix=SHA256[:10])
+        self.assertEqual(Path(path).read_bytes(), DATA)
+        blob = Path(self.cache_dir, "ocrtoolkit", "blobs", SHA256)
+        self.assertTrue(os.path.samefile(path, blob))
+        self.assertEqual(self.download(hash_prefix=SHA256[:10]), path)
+        # same content under another name: served from the blob
+        other = self.download(file_name="other.bin", hash_prefix=SHA256[:10])
+        self.assertEqual(Path(other).read_bytes(), DATA)
+        self.assertEqual(len(FileHandler.requests), 1)
+
+    def test_resume(self):
+        """check dropped downloads resume with a Range request"""
+        FileHandler.drops = 2
+        path = self.download(hash_prefix=SHA256[:10])
+        self.assertEqual(Path(path).read_bytes(), DATA)
+        ranges = [header for _, header in FileHandler.requests]
+        self.assertEqual(ranges[0], None)
+        self.assertEqual(ranges[1], f"bytes={len(DATA) // 2}-")
+        self.assertEqual(len(ranges), 3)
+
+    def test_corrupted(self):
+        """check a hash mismatch raises and leaves no file"""
+        with self.assertRaises(ValueError):
+            self.download(hash_prefix="0" * 10 if SHA256[0] != "0" else "1" * 10)
+        self.assertEqual(list(Path(self.cache_dir).glob("*.bin")), [])
+
+    def test_mirrors(self):
+        """check mirrors are tried in order"""
+        path = self.download(
+            mirrors=[f"{self.base_url}/missing", f"{self.base_url}/mirror"]
+        )
+        self.assertEqual(Path(path).read_bytes(), DATA)
+        self.assertEqual(
+            [p for p, _ in FileHandler.requests],
+            ["/missing/file.bin", "/mirror/file.bin"],
+        )
+
+    def test_offline(self):
+        """check offline mode only reads the offline dirs"""
+        with tempfile.TemporaryDirectory() as offline_dir:
+            Path(offline_dir, "file.bin").write_bytes(DATA)
+            path = self.download(
+                "http://127.0.0.1:9/file.bin", offline_dirs=[offline_dir], offline=True
+            )
+        self.assertEqual(Path(path).read_bytes(), DATA)
+        with self.assertRaises(FileNotFoundError):
+            self.download(
+                "http://127.0.0.1:9/new.bin",
+                offline_dirs=[self.cache_dir],
+                offline=True,
+            )
+        self.assertEqual(FileHandler.requests, [])
+
+    def test_concurrent(self):
+        """check concurrent downloads of one file share a request"""
+        with ThreadPoolExecutor(4) as executor:
+            paths = list(executor.map(lambda _: self.download(), range(4)))
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(Path(paths[0]).read_bytes(), DATA)
+        self.assertEqual(len(FileHandler.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
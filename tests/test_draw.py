@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+
+from ocrtoolkit.core.benchmark import make_synthetic_images
+from ocrtoolkit.utilities.draw_utils import (
+    draw_ocr_sheet,
+    draw_ocr_text,
+    fit_font_size,
+    get_font,
+)
+
+
+class DrawTestCase(unittest.TestCase):
+    """draw_ocr_text / draw_ocr_sheet / fit_font_size tests"""
+
+    def test_fit_font_size(self):
+        """check the largest fitting size, bounded by min_size and max_size"""
+        text = "a fairly long recognized text"
+        size = fit_font_size(text, 300)
+        self.assertLessEqual(get_font(size).getbbox(text)[2], 300)
+        self.assertGreater(get_font(size + 1).getbbox(text)[2], 300)
+        self.assertEqual(fit_font_size("", 10), 72)
+        self.assertEqual(fit_font_size(text, 1), 1)
+        self.assertEqual(fit_font_size("hello world", 5, max_size=1), 1)
+        self.assertEqual(fit_font_size(text, 5, max_size=3, min_size=3), 3)
+        self.assertIs(get_font(size), get_font(size))
+
+    def test_draw_ocr_text(self):
+        """check the crop is upscaled with a label band below"""
+        crop = np.full((32, 128, 3), 255, dtype=np.uint8)
+        canvas = draw_ocr_text(crop, "hello")
+        self.assertEqual(canvas.shape[1], 3 * 128)
+        self.assertGreater(canvas.shape[0], 3 * 32)
+
+    def test_draw_ocr_sheet(self):
+        """check the sheet layout, label bands and empty slots"""
+        crops = make_synthetic_images("rec", 7)
+        texts = [f"word{idx}" for idx in range(7)]
+        sheet = draw_ocr_sheet(crops, texts, cols=3, cell_size=(100, 40), padding=2)
+        # 3 rows of cells of 100 x (40 + 28), with padding
+        self.assertEqual(sheet.shape, (3 * 70 + 2, 3 * 102 + 2, 3))
+        # label bands are drawn, the slot of the 9th crop stays empty
+        self.assertTrue((sheet[2 + 40 + 1, 2 + 1] == (255, 0, 0)).all())
+        self.assertTrue((sheet[-10, -10] == 0).all())
+        # labels too short for any font still get the smallest one
+        sheet = draw_ocr_sheet(
+            crops[:1], [texts[0] * 5], cols=1, cell_size=(20, 20), label_height=6
+        )
+        self.assertEqual(sheet.shape, (20 + 6 + 8, 20 + 8, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+
+import numpy as np
+
+from ocrtoolkit.utilities.box_utils import box_iou
+from ocrtoolkit.utilities.eval_utils import evaluate_detections, match_detections
+from ocrtoolkit.utilities.synth_utils import make_detection_results
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+
+
+def greedy_reference(ious, scores, thr):
+    """COCO matching, one pred at a time"""
+    tp, used = np.zeros(len(scores), dtype=bool), set()
+    for p in np.argsort(-scores, kind="stable"):
+        best, best_iou = None, thr
+        for g in range(ious.shape[1]):
+            if g not in used and ious[p, g] >= best_iou:
+                best, best_iou = g, ious[p, g]
+        if best is not None:
+            used.add(best)
+            tp[p] = True
+    return tp
+
+
+def make_pair(idx, num_boxes=40, noise=3.0):
+    """Noisy predictions (some missed) and the ground truth of one page"""
+    rng = np.random.default_rng(idx)
+    gts = make_detection_results(num_boxes, 640, 480, seed=idx)
+    gts.img_name = f"img{idx}"
+    coords, _, labels = gts.to_arrays()
+    keep = rng.random(num_boxes) > 0.2
+    preds = DetectionResults.from_arrays(
+        coords[keep] + rng.normal(0, noise, (keep.sum(), 4)),
+        640,
+        480,
+        confs=rng.random(keep.sum()),
+        labels=labels[keep],
+        img_name=f"img{idx}",
+    )
+    return preds, gts
+
+
+class EvalTestCase(unittest.TestCase):
+    """match_detections / evaluate_detections tests"""
+
+    def test_match_detections(self):
+        """check greedy and hungarian matching against a reference loop"""
+        ious = np.array([[0.9, 0.6], [0.8, 0.0]])
+        scores = np.array([0.9, 0.8])
+        greedy = match_detections(ious, scores, (0.5,))
+        hungarian = match_detections(ious, scores, (0.5,), method="hungarian")
+        np.testing.assert_array_equal(greedy[:, 0], [True, False])
+        np.testing.assert_array_equal(hungarian[:, 0], [True, True])
+
+        # overlapping duplicates, compared to a one pred at a time loop
+        rng = np.random.default_rng(0)
+        boxes = rng.uniform(0, 100, (30, 2)).repeat(2, axis=1) + [0, 0, 20, 20]
+        gts = boxes[:20]
+        preds = boxes[rng.integers(0, 30, 25)] + rng.normal(0, 4, (25, 4))
+        ious, scores = box_iou(preds, gts), rng.random(25)
+        tp = match_detections(ious, scores, (0.3, 0.5, 0.7))
+        for t, thr in enumerate((0.3, 0.5, 0.7)):
+            np.testing.assert_array_equal(tp[:, t], greedy_reference(ious, scores, thr))
+
+    def test_average_precision(self):
+        """check AP, counts and f1 on a hand computed case"""
+        gts = DetectionResults.from_arrays(
+            [[0, 0, 10, 10], [20, 0, 30, 10]], 40, 10, img_name="a"
+        )
+        preds = DetectionResults.from_arrays(
+            [[0, 0, 10, 10], [0, 0, 3, 3], [20, 0, 30, 10]],
+            40,
+            10,
+            confs=[0.9, 0.8, 0.7],
+            img_name="a",
+        )
+        df = evaluate_detections([preds], [gts])
+        # precision 1 up to recall 0.5, then 2/3
+        self.assertAlmostEqual(df.loc["all", "ap50"], (51 + 50 * 2 / 3) / 101)
+        self.assertEqual(df.loc["all", "fp"], 1)
+        self.assertAlmostEqual(df.loc["all", "f1"], 0.8)
+        df = evaluate_detections([preds], [gts], conf_threshold=0.85)
+        self.assertEqual(df.loc["all", "tp"], 1)
+        self.assertEqual(df.loc["all", "fn"], 1)
+
+    def test_evaluate_detections(self):
+        """check per-label rows, missing predictions and parallel runs"""
+        pairs = [make_pair(idx) for idx in range(12)]
+        l_preds, l_gts = map(list, zip(*pairs))
+        perfect = evaluate_detections(l_gts, l_gts)
+        self.assertTrue((perfect[["precision", "recall", "ap"]] == 1).all().all())
+
+        # images without predictions only add false negatives
+        df = evaluate_detections(l_preds[1:], l_gts, chunksize=5)
+        self.assertEqual(df.loc["all", "num_gt"], sum(len(gts) for gts in l_gts))
+        self.assertEqual(df.loc["all", "num_pred"], sum(map(len, l_preds[1:])))
+        self.assertEqual(list(df.index), ["0", "1", "2", "all"])
+        self.assertLess(df.loc["all", "ap"], df.loc["all", "ap50"])
+        parallel = evaluate_detections(l_preds[1:], l_gts, chunksize=5, workers=2)
+        self.assertTrue(df.equals(parallel))
+
+    def test_label_named_all(self):
+        """check a label named like the summary row is not overwritten"""
+        gts = DetectionResults.from_arrays(
+            [[0, 0, 10, 10], [20, 0, 30, 10]], 40, 10, labels=["all", "b"], img_name="a"
+        )
+        with self.assertRaises(ValueError):
+            evaluate_detections([gts], [gts])
+        df = evaluate_detections([gts], [gts], summary_key="total")
+        self.assertEqual(list(df.index), ["all", "b", "total"])
+        self.assertEqual(df.loc["all", "num_gt"], 1)
+        self.assertEqual(df.loc["total", "num_gt"], 2)
+
+    def test_predictions_sharing_an_image(self):
+        """check predictions with the same img_name are merged, not dropped"""
+        gts = DetectionResults.from_arrays(
+            [[0, 0, 10, 10], [20, 0, 30, 10]], 40, 10, img_name="a"
+        )
+        l_preds = [
+            DetectionResults.from_arrays([box], 40, 10, img_name="a")
+            for box in [[0, 0, 10, 10], [20, 0, 30, 10]]
+        ]
+        df = evaluate_detections(l_preds, [gts])
+        self.assertEqual(df.loc["all", "num_pred"], 2)
+        self.assertEqual(df.loc["all", "recall"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
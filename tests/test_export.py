@@ -0,0 +1,94 @@
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ocrtoolkit.datasets.imageds import ImageDS
+from ocrtoolkit.utilities.det_utils import export_annotated
+from ocrtoolkit.utilities.draw_utils import draw_bbox, draw_bboxes
+from ocrtoolkit.utilities.synth_utils import make_detection_results
+
+
+def make_pages(num_pages=4, width=320, height=240):
+    """ImageDS of random pages and synthetic dets on each"""
+    rng = np.random.default_rng(0)
+    images = [
+        rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        for _ in range(num_pages)
+    ]
+    ds = ImageDS(images, size=None, apply_gs=False)
+    l_dets = []
+    for idx, name in enumerate(ds.names):
+        dets = make_detection_results(20, width, height, seed=idx)
+        dets.img_name = name
+        l_dets.append(dets)
+    return ds, l_dets
+
+
+class ExportTestCase(unittest.TestCase):
+    """export_annotated / draw_bboxes tests"""
+
+    def test_draw_bboxes_same_as_draw_bbox(self):
+        """check draw_bboxes draws like one draw_bbox per box"""
+        boxes = [[10, 10, 60, 40], [100, 50, 200, 120]]
+        expected = np.zeros((240, 320, 3), dtype=np.uint8)
+        for box in boxes:
+            draw_bbox(expected, box)
+        canvas = draw_bboxes(np.zeros_like(expected), boxes)
+        np.testing.assert_array_equal(canvas, expected)
+
+    def test_ds_pickles(self):
+        """check datasets can be sent to worker processes"""
+        ds, _ = make_pages(1)
+        np.testing.assert_array_equal(
+            np.array(pickle.loads(pickle.dumps(ds))[0]), np.array(ds[0])
+        )
+
+    def test_export_annotated(self):
+        """check serial and parallel exports match, pages are merged, quality applies"""
+        ds, l_dets = make_pages()
+        # a page with two dets is written once, with both drawn
+        l_dets.append(make_detection_results(5, 320, 240, seed=9))
+        l_dets[-1].img_name = ds.names[0]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            serial = export_annotated(
+                l_dets, ds, Path(tmp_dir, "serial"), ext=".png", workers=0
+            )
+            parallel = export_annotated(
+                l_dets, ds, Path(tmp_dir, "parallel"), ext=".png", workers=2
+            )
+            self.assertEqual(len(serial), 4)
+            for serial_path, parallel_path in zip(serial, parallel):
+                np.testing.assert_array_equal(
+                    cv2.imread(serial_path), cv2.imread(parallel_path)
+                )
+
+            expected = np.array(ds[0])
+            for dets in (l_dets[0], l_dets[-1]):
+                expected = dets.draw_on(expected)
+            np.testing.assert_array_equal(cv2.imread(serial[0])[..., ::-1], expected)
+
+            low = export_annotated(
+                l_dets, ds, Path(tmp_dir, "low"), quality=10, workers=0
+            )
+            high = export_annotated(
+                l_dets, ds, Path(tmp_dir, "high"), quality=95, workers=0
+            )
+            self.assertTrue(low[0].endswith(".jpg"))
+            self.assertLess(Path(low[0]).stat().st_size, Path(high[0]).stat().st_size)
+
+    def test_export_annotated_same_stem(self):
+        """check pages sharing a stem raise instead of overwriting each other"""
+        ds, l_dets = make_pages(2)
+        l_dets[0].img_name, l_dets[1].img_name = "page.png", "page.tif"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError):
+                export_annotated(l_dets, ds, tmp_dir, workers=0)
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
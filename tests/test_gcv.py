@@ -0,0 +1,115 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from ocrtoolkit.integrations.gcv import FakeVisionClient, UploadEncoder
+from ocrtoolkit.models import GCV_OCR
+from ocrtoolkit.utilities.network_utils import RateLimiter
+
+
+def make_page(num_words):
+    page = np.full((40, 200, 3), 255, dtype=np.uint8)
+    for idx in range(num_words):
+        page[10:30, 10 + 40 * idx : 40 + 40 * idx] = 0
+    return page
+
+
+class PartialFailureClient(FakeVisionClient):
+    """Fails pages by their number of words: 2 once as UNAVAILABLE,
+    3 always as INVALID_ARGUMENT
+    """
+
+    def __init__(self):
+        super().__init__(latency=0)
+        self.l_batch_sizes = []
+        self.failed_once = False
+
+    def batch_annotate_images(self, requests, **kwargs):
+        self.l_batch_sizes.append(len(requests))
+        batch = super().batch_annotate_images(requests, **kwargs)
+        for response in batch.responses:
+            num_words = len(response.text_annotations) - 1
+            if num_words == 2 and not self.failed_once:
+                self.failed_once = True
+                response.error = SimpleNamespace(code=14, message="unavailable")
+            elif num_words == 3:
+                response.error = SimpleNamespace(code=3, message="bad image")
+        return batch
+
+
+class GCVModelTestCase(unittest.TestCase):
+    """GCVModel tests against the fake Vision client"""
+
+    def test_concurrent_batches_with_retries(self):
+        """check order, batching, concurrency and retries"""
+        client = FakeVisionClient(latency=0.02, fail_rate=0.3, seed=0)
+        model = GCV_OCR(client=client, batch_size=4, max_in_flight=4, backoff=0.01)
+        images = [make_page(idx % 4 + 1) for idx in range(20)]
+        l_results = model.predict(images)
+        self.assertEqual(
+            [len(res) for res in l_results], [i % 4 + 1 for i in range(20)]
+        )
+        self.assertEqual(l_results[0].bboxes[0].values, [10, 10, 40, 30])
+        self.assertEqual(l_results[0].bboxes[0].text, "word0")
+        self.assertEqual(client.num_images, 20)
+        self.assertGreater(client.num_failures, 0)
+        self.assertGreater(client.max_concurrency, 1)
+
+    def test_failed_images(self):
+        """check only failed images are retried and errors are per image"""
+        client = PartialFailureClient()
+        model = GCV_OCR(client=client, batch_size=4, backoff=0.01)
+        l_results = model.predict([make_page(idx + 1) for idx in range(4)])
+        self.assertEqual(client.l_batch_sizes, [4, 1])
+        self.assertEqual([len(res) for res in l_results], [1, 2, 0, 4])
+        self.assertEqual(
+            [res.error for res in l_results],
+            [None, None, "GCV error 3: bad image", None],
+        )
+
+    def test_upload_encoder(self):
+        """check cropped and downscaled uploads map back to page coordinates"""
+        page = np.full((400, 1000, 3), 255, dtype=np.uint8)
+        page[200:240, 500:700] = 0
+        encoder = UploadEncoder(max_side=100, crop_content=True, margin=20)
+        client = FakeVisionClient(latency=0)
+        model = GCV_OCR(client=client, encoder=encoder)
+        (results,) = model.predict([page])
+        self.assertEqual((results.width, results.height), (1000, 400))
+        np.testing.assert_allclose(
+            results.bboxes[0].values, [500, 200, 700, 240], atol=3
+        )
+        stats = model.request_stats[-1]
+        self.assertLess(stats["encoded_bytes"], stats["raw_bytes"] / 100)
+
+    def test_rate_limiter(self):
+        """check the token bucket spaces out calls"""
+        limiter = RateLimiter(rate=100, burst=1)
+        start = time.perf_counter()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+
+    def test_rate_limiter_large_requests(self):
+        """check requests larger than burst are paid in full"""
+        limiter = RateLimiter(rate=100, burst=2)
+        start = time.perf_counter()
+        for _ in range(3):
+            limiter.acquire(10)
+        # 30 tokens, 2 of them available at once
+        self.assertGreaterEqual(time.perf_counter() - start, 0.27)
+
+    def test_max_qps_with_large_batches(self):
+        """check max_qps holds with batches larger than its burst"""
+        client = FakeVisionClient(latency=0)
+        model = GCV_OCR(client=client, batch_size=16, max_in_flight=2, max_qps=12)
+        start = time.perf_counter()
+        model.predict([make_page(1)] * 24)
+        # 24 images at 12/s, 12 of them available at once
+        self.assertGreaterEqual(time.perf_counter() - start, 0.95)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# modules that only specific features need, never at package import
+HEAVY_MODULES = ["sklearn", "matplotlib", "pandas", "h5py", "tqdm"]
+
+# cumulative import time (ms) allowed for the detection entry points
+IMPORT_BUDGET_MS = float(os.environ.get("OCRTOOLKIT_IMPORT_BUDGET_MS", 1500))
+
+
+def run_python(code: str, *args) -> subprocess.CompletedProcess:
+    """Runs code in a fresh interpreter"""
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class ImportsTestCase(unittest.TestCase):
+    """package import tests"""
+
+    def test_no_heavy_imports(self):
+        """check importing the package loads no heavy optional module"""
+        code = (
+            "import sys, ocrtoolkit\n"
+            "import ocrtoolkit.utilities, ocrtoolkit.datasets, ocrtoolkit.wrappers\n"
+            "import ocrtoolkit.models, ocrtoolkit.core, ocrtoolkit.cli\n"
+            "from ocrtoolkit.core.detector import detect\n"
+            "from ocrtoolkit.wrappers.detection_results import DetectionResults\n"
+            f"print([m for m in {HEAVY_MODULES} if m in sys.modules])"
+        )
+        self.assertEqual(run_python(code).stdout.strip(), "[]")
+
+    def test_import_time_budget(self):
+        """check the detector imports within IMPORT_BUDGET_MS"""
+        code = "import ocrtoolkit.core.detector"
+        l_times = []
+        for _ in range(3):
+            stderr = run_python(code, "-X", "importtime").stderr
+            last_line = stderr.strip().splitlines()[-1]
+            self.assertTrue(last_line.endswith("ocrtoolkit.core.detector"))
+            l_times.append(int(last_line.split("|")[1]) / 1000)
+        self.assertLess(min(l_times), IMPORT_BUDGET_MS)
+
+    def test_lazy_names(self):
+        """check lazy names resolve, list and fail like real ones"""
+        import ocrtoolkit
+        import ocrtoolkit.utilities as utilities
+        from ocrtoolkit.utilities.det_utils import load_dets
+
+        self.assertIs(utilities.load_dets, load_dets)
+        self.assertIn("load_dets", dir(utilities))
+        self.assertIs(ocrtoolkit.utilities, utilities)
+        with self.assertRaises(AttributeError):
+            utilities.not_a_name
+        with self.assertRaises(ImportError):
+            from ocrtoolkit.datasets import NotADataset  # noqa: F401
+
+        namespace = {}
+        exec("from ocrtoolkit.wrappers import *", namespace)
+        self.assertIn("DetectionResults", namespace)
+
+
+if __name__ == "__main__":
+    unittest.main()
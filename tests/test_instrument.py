@@ -0,0 +1,90 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import h5py
+
+from ocrtoolkit.core import detect, detect_and_save_h5, recognize
+from ocrtoolkit.core.benchmark import make_synthetic_images
+from ocrtoolkit.datasets import ImageDS
+from ocrtoolkit.integrations.stub import StubDetModel, StubRecModel
+from ocrtoolkit.utilities.instrument_utils import (
+    NULL_TRACE,
+    HistogramSink,
+    JsonlSink,
+    SummarySink,
+    instrument,
+    trace_batch,
+)
+
+STAGES = ["decode", "to_numpy", "preprocess", "predict", "results"]
+
+
+class InstrumentTestCase(unittest.TestCase):
+    """instrument / trace_batch tests"""
+
+    def setUp(self):
+        self.pages = make_synthetic_images("det", 3)
+
+    def test_disabled(self):
+        """check trace_batch is a no-op outside instrument"""
+        self.assertIs(trace_batch("det", 1), NULL_TRACE)
+        results = list(detect(StubDetModel(), ImageDS(self.pages, size=None)))
+        self.assertEqual(len(results), 3)
+
+    def test_detect_stages(self):
+        """check detect records every stage, batch and box"""
+        ds = ImageDS(self.pages, size=None, apply_gs=False)
+        with instrument(SummarySink(), HistogramSink()) as (summary, histogram):
+            l_results = list(detect(StubDetModel(per_image=0.002), ds))
+            ds.batched = True
+            detect(StubDetModel(), ds, stream=False)
+        self.assertIs(trace_batch("det", 1), NULL_TRACE)
+
+        self.assertEqual(histogram.num_batches["det"], 4)
+        self.assertEqual(histogram.num_images["det"], 6)
+        self.assertEqual(
+            histogram.num_boxes["det"], 2 * sum(len(res) for res in l_results)
+        )
+        self.assertEqual(len(histogram.get_durations("det", "predict")), 4)
+        self.assertGreaterEqual(histogram.percentile("det", "predict", 95), 0.002)
+        counts, _ = histogram.histogram("det", "decode", bins=4)
+        self.assertEqual(counts.sum(), 4)
+
+        rows = summary.summary()
+        self.assertEqual([row["stage"] for row in rows], STAGES)
+        self.assertAlmostEqual(sum(row["share"] for row in rows), 1.0)
+        self.assertIn("det: 6 images", str(summary))
+
+    def test_recognize_jsonl(self):
+        """check JsonlSink writes one record per rec batch"""
+        crops = make_synthetic_images("rec", 4)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "trace.jsonl"
+            sink = JsonlSink(str(path))
+            with instrument(sink):
+                list(recognize(StubRecModel(), ImageDS(crops, size=None, batched=True)))
+            sink.close()
+            records = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["task"], "rec")
+        self.assertEqual(records[0]["batch_size"], 4)
+        self.assertEqual(list(records[0]["stages"]), STAGES)
+
+    def test_detect_and_save_h5(self):
+        """check detect_and_save_h5 traces the save stage"""
+        ds = ImageDS(self.pages, size=None, apply_gs=False)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "dets.h5")
+            with instrument(HistogramSink()) as (histogram,):
+                detect_and_save_h5(StubDetModel(), ds, path, bs=2, verbose=False)
+            with h5py.File(path) as f:
+                self.assertEqual(len(f["dets"]), 3)
+        self.assertEqual(histogram.num_batches["det"], 2)
+        self.assertEqual(histogram.num_images["det_save"], 3)
+        self.assertEqual(len(histogram.get_durations("det_save", "save")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
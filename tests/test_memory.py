@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ocrtoolkit.core import detect, detect_and_save_h5
+from ocrtoolkit.core.benchmark import make_synthetic_images
+from ocrtoolkit.datasets import ImageDS
+from ocrtoolkit.integrations.stub import StubDetModel
+from ocrtoolkit.utilities.det_utils import load_dets
+from ocrtoolkit.utilities.instrument_utils import (
+    SummarySink,
+    instrument,
+    set_memory_tracking,
+)
+from ocrtoolkit.utilities.memory_utils import AdaptiveBatchSize, MemoryBudget, get_rss
+
+
+class MemoryTestCase(unittest.TestCase):
+    """MemoryBudget / AdaptiveBatchSize / memory tracking tests"""
+
+    def setUp(self):
+        self.ds = ImageDS(make_synthetic_images("det", 5), size=None, apply_gs=False)
+
+    def test_budget_warnings(self):
+        """check a warning once per crossing of the warn fraction"""
+        budget = MemoryBudget(budget_mb=100, warn_fraction=0.5)
+        self.assertAlmostEqual(budget.check(40 * 2**20), 0.4)
+        budget.check(60 * 2**20)
+        budget.check(70 * 2**20)
+        self.assertEqual(budget.num_warnings, 1)
+        budget.check(10 * 2**20)
+        budget.check(90 * 2**20)
+        self.assertEqual(budget.num_warnings, 2)
+
+    def test_adaptive_batch_size(self):
+        """check the batch size shrinks to what fits in the budget"""
+        rss = get_rss()
+        budget = MemoryBudget(budget_mb=(rss + 100 * 2**20) / 2**20, warn_fraction=1)
+        sizer = AdaptiveBatchSize(16, budget)
+        self.assertEqual(sizer.next(), 16)
+        # 20 MiB per image: only 4 images fit in the remaining ~100 MiB
+        sizer.update(rss, rss + 8 * 20 * 2**20, 8)
+        self.assertEqual(sizer.next(), 4)
+        sizer.per_image = 0
+        self.assertEqual(sizer.next(), 16)
+
+    def test_detect_and_save_h5_adaptive(self):
+        """check adaptive batches keep every det in order"""
+        l_expected = list(detect(StubDetModel(), self.ds, verbose=False))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "dets.h5")
+            # a budget below the current RSS forces the smallest batches
+            with instrument(SummarySink()) as (summary,):
+                detect_and_save_h5(
+                    StubDetModel(),
+                    self.ds,
+                    path,
+                    bs=4,
+                    memory_budget_mb=1,
+                    adaptive_bs=True,
+                    verbose=False,
+                )
+            l_dets = load_dets(path)
+        self.assertEqual(summary.num_batches["det"], 5)
+        self.assertEqual([det.img_name for det in l_dets], self.ds.names)
+        self.assertEqual([len(det) for det in l_dets], [len(det) for det in l_expected])
+
+    def test_memory_tracking(self):
+        """check stages report their peak RSS and traced memory"""
+        set_memory_tracking(True, use_tracemalloc=True)
+        self.addCleanup(set_memory_tracking, False)
+        self.ds.batched = True
+        with instrument(SummarySink()) as (summary,):
+            detect(StubDetModel(), self.ds, stream=False, verbose=False)
+        rows = {row["stage"]: row for row in summary.summary()}
+        self.assertGreater(rows["to_numpy"]["peak_rss_mb"], 0)
+        # 5 RGB pages of 1240x1754
+        self.assertGreater(rows["to_numpy"]["peak_traced_mb"], 30)
+        self.assertIn("rss_mb", str(summary))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+import urllib.request
+
+from ocrtoolkit.core import detect
+from ocrtoolkit.core.benchmark import make_synthetic_images
+from ocrtoolkit.datasets import ImageDS
+from ocrtoolkit.integrations.stub import StubDetModel
+from ocrtoolkit.utilities.cache_utils import ResultCache
+from ocrtoolkit.utilities.instrument_utils import instrument
+from ocrtoolkit.utilities.metrics_utils import Histogram, MetricsServer, MetricsSink
+
+
+class FailingDetModel(StubDetModel):
+    """StubDetModel failing on every batch"""
+
+    def _predict(self, images, **kwargs):
+        raise RuntimeError("boom")
+
+
+class MetricsTestCase(unittest.TestCase):
+    """MetricsSink / Histogram / MetricsServer tests"""
+
+    def setUp(self):
+        self.ds = ImageDS(make_synthetic_images("det", 2), size=None, apply_gs=False)
+
+    def test_sink(self):
+        """check images, batches, boxes, cache and errors are counted"""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        cache = ResultCache(tmp_dir.name)
+        with instrument(MetricsSink()) as (sink,):
+            l_results = list(detect(StubDetModel(), self.ds, cache=cache))
+            list(detect(StubDetModel(), self.ds, cache=cache))
+            with self.assertRaises(RuntimeError):
+                list(detect(FailingDetModel(), self.ds))
+
+        self.assertEqual(sink.images.get(task="det"), 4)
+        self.assertEqual(sink.batches.get(task="det"), 4)
+        self.assertEqual(
+            sink.boxes.get(task="det"), 2 * sum(len(res) for res in l_results)
+        )
+        self.assertEqual(sink.cache.get(result="hit"), 2)
+        self.assertEqual(sink.cache.get(result="miss"), 2)
+        self.assertEqual(sink.errors.get(task="det", error="RuntimeError"), 1)
+        self.assertEqual(sink.stage_seconds.get_count(task="det", stage="predict"), 5)
+
+    def test_histogram_format(self):
+        """check histograms follow the Prometheus text format"""
+        hist = Histogram("latency_seconds", "Latency", ["stage"], buckets=[0.1, 1])
+        for value in [0.05, 0.5, 5]:
+            hist.observe(value, stage='pre"process')
+        lines = hist.collect()
+        self.assertEqual(
+            lines[:3],
+            [
+                'latency_seconds_bucket{stage="pre\\"process",le="0.1"} 1',
+                'latency_seconds_bucket{stage="pre\\"process",le="1"} 2',
+                'latency_seconds_bucket{stage="pre\\"process",le="+Inf"} 3',
+            ],
+        )
+        self.assertEqual(lines[-1], 'latency_seconds_count{stage="pre\\"process"} 3')
+
+    def test_server(self):
+        """check /metrics serves the counters of detect"""
+        with MetricsServer(port=0) as server:
+            list(detect(StubDetModel(), self.ds))
+            url = f"http://127.0.0.1:{server.port}/metrics"
+            with urllib.request.urlopen(url) as response:
+                text = response.read().decode()
+                self.assertIn("text/plain", response.headers["Content-Type"])
+        self.assertIn("# TYPE ocrtoolkit_images_total counter", text)
+        self.assertIn('ocrtoolkit_images_total{task="det"} 2', text)
+        self.assertIn(
+            'ocrtoolkit_stage_seconds_count{task="det",stage="decode"} 2', text
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import onnx  # noqa: F401
+    import onnxruntime  # noqa: F401
+    import torch
+    from doctr.models.recognition.crnn.pytorch import CTCPostProcessor
+
+    from ocrtoolkit.integrations.doctr import DoctrRecModel
+    from ocrtoolkit.integrations.onnx import (
+        META_KEY,
+        OnnxRecModel,
+        check_parity,
+        create_session,
+        export_onnx,
+    )
+except ImportError:
+    onnxruntime = None
+
+VOCAB = "abcdefgh"
+
+
+def make_tiny_rec_model():
+    """Doctr-like recognition model: a conv over the crop, one step per column"""
+
+    class TinyRec(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            torch.manual_seed(0)
+            self.conv = torch.nn.Conv2d(3, len(VOCAB) + 1, 3, padding=1)
+            self.pool = torch.nn.AvgPool2d((32, 4))
+            self.cfg = {
+                "input_shape": (3, 32, 128),
+                "mean": (0.5, 0.5, 0.5),
+                "std": (0.5, 0.5, 0.5),
+            }
+            self.vocab = VOCAB
+            self.postprocessor = CTCPostProcessor(VOCAB)
+
+        def forward(self, x, return_model_output=False, return_preds=False):
+            logits = self.pool(self.conv(x)).flatten(2).transpose(1, 2)
+            out = {}
+            if return_model_output:
+                out["out_map"] = logits
+            if return_preds:
+                out["preds"] = self.postprocessor(logits)
+            return out
+
+    return TinyRec()
+
+
+@unittest.skipIf(onnxruntime is None, "onnxruntime, onnx or doctr is not installed")
+class OnnxTestCase(unittest.TestCase):
+    """export_onnx / OnnxRecModel / check_parity tests"""
+
+    def test_rec_parity(self):
+        """check the exported graph gives the torch texts, wide crops included"""
+        ref_model = DoctrRecModel(make_tiny_rec_model(), "tiny", "cpu")
+        ref_model.arch, ref_model.model_name = "TINY_REC", "tiny_rec"
+        rng = np.random.default_rng(0)
+        # the last crop is wide enough to be split by doctr's predictor
+        images = [
+            rng.integers(0, 255, (32, width, 3), dtype=np.uint8)
+            for width in (40, 128, 300, 1200)
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = export_onnx(ref_model, Path(tmp_dir, "tiny.onnx"))
+            session = create_session(path)
+            meta = json.loads(session.get_modelmeta().custom_metadata_map[META_KEY])
+            self.assertEqual(meta["vocab"], VOCAB)
+            onnx_model = OnnxRecModel(session, make_tiny_rec_model(), path, meta)
+            report = check_parity(ref_model, onnx_model, images)
+        self.assertTrue(report["passed"], report)
+
+
+if __name__ == "__main__":
+    unittest.main()
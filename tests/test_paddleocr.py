@@ -0,0 +1,80 @@
+import gc
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from ocrtoolkit.integrations.paddleocr import PaddleOCRDetModel
+from ocrtoolkit.models.registry import ModelRegistry
+
+
+class FakeTextDetector:
+    """Mimics paddle's TextDetector: one image per call, not thread safe"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.num_calls = 0
+
+    def __call__(self, image):
+        assert self.lock.acquire(blocking=False), "predictor used concurrently"
+        try:
+            time.sleep(0.01)
+            self.num_calls += 1
+            h, w = image.shape[:2]
+            box = [[1, 2], [w - 1, 2], [w - 1, h - 2], [1, h - 2]]
+            return np.array([box], dtype=np.float32), 0.01
+        finally:
+            self.lock.release()
+
+
+class PaddleOCRDetModelTestCase(unittest.TestCase):
+    """PaddleOCRDetModel predictor pool tests"""
+
+    def test_pool_keeps_order(self):
+        """check results keep input order and all predictors are used"""
+        predictors = [FakeTextDetector() for _ in range(3)]
+        model = PaddleOCRDetModel(
+            predictors[0], "fake", extra_predictors=predictors[1:]
+        )
+        images = [np.zeros((20, 30 + i, 3), dtype=np.uint8) for i in range(12)]
+        l_results = model.predict(images)
+        self.assertEqual([res.width for res in l_results], [30 + i for i in range(12)])
+        self.assertEqual(l_results[0].bboxes[0].values, [1, 2, 29, 18])
+        self.assertEqual(sum(p.num_calls for p in predictors), 12)
+        self.assertTrue(all(p.num_calls > 0 for p in predictors))
+
+    def make_model(self):
+        return PaddleOCRDetModel(
+            FakeTextDetector(), "fake", extra_predictors=[FakeTextDetector()]
+        )
+
+    def test_close(self):
+        """check close shuts the pool down and predictions still run"""
+        model = self.make_model()
+        executor = model._executor
+        model.close()
+        self.assertTrue(executor._shutdown)
+        model.close()
+        images = [np.zeros((20, 30, 3), dtype=np.uint8)] * 2
+        self.assertEqual(len(model.predict(images)), 2)
+
+    def test_pool_shut_down_on_release(self):
+        """check collected or unloaded models do not leave threads behind"""
+        model = self.make_model()
+        model.predict([np.zeros((20, 30, 3), dtype=np.uint8)] * 2)
+        executor = model._executor
+        del model
+        gc.collect()
+        self.assertTrue(executor._shutdown)
+
+        registry = ModelRegistry()
+        model = registry.acquire("fake", self.make_model)
+        executor = model._executor
+        registry.release(model)
+        registry.unload()
+        self.assertTrue(executor._shutdown)
+
+
+if __name__ == "__main__":
+    unittest.main()
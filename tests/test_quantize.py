@@ -0,0 +1,142 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from ocrtoolkit.datasets.imageds import ImageDS
+from ocrtoolkit.utilities.cache_utils import ResultCache
+
+try:
+    import torch
+
+    from ocrtoolkit.utilities.model_utils import quantize_int8
+except ImportError:
+    torch = None
+
+try:
+    from doctr.models.recognition.crnn.pytorch import CTCPostProcessor
+
+    from ocrtoolkit.integrations.doctr import DoctrRecModel, quantize_model
+    from ocrtoolkit.utilities.eval_utils import compare_rec_models
+except ImportError:
+    CTCPostProcessor = None
+
+VOCAB = "abcdefgh"
+
+
+def make_toy_model():
+    """Conv feature extractor and a linear head, like doctr's CRNNs"""
+
+    class Toy(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            torch.manual_seed(0)
+            self.feat_extractor = torch.nn.Sequential(
+                torch.nn.Conv2d(3, 8, 3, padding=1),
+                torch.nn.ReLU(),
+                torch.nn.AvgPool2d((32, 4)),
+            )
+            self.linear = torch.nn.Linear(8, len(VOCAB) + 1)
+            self.cfg = {
+                "input_shape": (3, 32, 128),
+                "mean": (0.5, 0.5, 0.5),
+                "std": (0.5, 0.5, 0.5),
+            }
+            self.vocab = VOCAB
+            if CTCPostProcessor is not None:
+                self.postprocessor = CTCPostProcessor(VOCAB)
+
+        def forward(self, x, return_model_output=False, return_preds=False):
+            logits = self.linear(self.feat_extractor(x).flatten(2).transpose(1, 2))
+            out = {}
+            if return_model_output:
+                out["out_map"] = logits
+            if return_preds:
+                out["preds"] = self.postprocessor(logits)
+            return out
+
+    return Toy().eval()
+
+
+class CountingDS(ImageDS):
+    """ImageDS counting the items read"""
+
+    num_reads = 0
+
+    def __getitem__(self, key):
+        self.num_reads += 1
+        return super().__getitem__(key)
+
+
+def make_crops(num_crops):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (32, 96, 3), dtype=np.uint8) for _ in range(num_crops)]
+
+
+@unittest.skipIf(torch is None, "torch is not installed")
+class QuantizeInt8TestCase(unittest.TestCase):
+    """quantize_int8 tests"""
+
+    def test_dynamic(self):
+        """check dynamic quantization keeps outputs and the global engine"""
+        model = make_toy_model()
+        x = torch.rand(2, 3, 32, 128)
+        with torch.no_grad():
+            expected = model(x, return_model_output=True)["out_map"]
+        engine = torch.backends.quantized.engine
+        qmodel = quantize_int8(make_toy_model(), "dynamic")
+        self.assertEqual(torch.backends.quantized.engine, engine)
+        self.assertIsInstance(qmodel.linear, torch.ao.nn.quantized.dynamic.Linear)
+        with torch.no_grad():
+            out = qmodel(x, return_model_output=True)["out_map"]
+        torch.testing.assert_close(out, expected, atol=0.05, rtol=0)
+
+    def test_static_keeps_a_parameter(self):
+        """check fully quantized models still expose a float parameter"""
+        calib_batches = [torch.rand(2, 3, 32, 128) for _ in range(2)]
+        qmodel = quantize_int8(make_toy_model(), "static", calib_batches)
+        param = next(qmodel.parameters())
+        self.assertEqual((param.device.type, param.dtype), ("cpu", torch.float32))
+
+
+@unittest.skipIf(CTCPostProcessor is None, "doctr is not installed")
+class QuantizeModelTestCase(unittest.TestCase):
+    """quantize_model / compare_rec_models tests"""
+
+    def test_static_calibration_is_bounded(self):
+        """check only num_calib_batches batches of calib_ds are read"""
+        model = DoctrRecModel(make_toy_model(), "toy", "cpu", batch_size=4)
+        calib_ds = CountingDS(make_crops(50), size=None, apply_gs=False)
+        quantize_model(model, "static", calib_ds, num_calib_batches=2)
+        self.assertEqual(calib_ds.num_reads, 8)
+        self.assertEqual(len(model.predict(make_crops(3))), 3)
+
+    def test_cache_separates_quantized(self):
+        """check a float model and its int8 copy do not share cache entries"""
+        ref_model = DoctrRecModel(make_toy_model(), "toy", "cpu")
+        model = quantize_model(DoctrRecModel(make_toy_model(), "toy", "cpu"))
+        self.assertEqual(model.quantized, "dynamic")
+        crops = make_crops(3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResultCache(tmp_dir)
+            cache.predict(ref_model, crops)
+            cache.predict(model, crops)
+            self.assertEqual((cache.hits, cache.misses), (0, 6))
+            cache.predict(model, crops)
+            self.assertEqual((cache.hits, cache.misses), (3, 6))
+
+    def test_compare_rec_models(self):
+        """check the report of a dynamic quantized model against its float one"""
+        ref_model = DoctrRecModel(make_toy_model(), "toy", "cpu")
+        model = quantize_model(DoctrRecModel(make_toy_model(), "toy", "cpu"))
+        ds = ImageDS(make_crops(6), size=None, apply_gs=False)
+        labels = [res.text for res in ref_model.predict(make_crops(6))]
+        df = compare_rec_models(ref_model, model, ds, labels=labels, bs=4)
+        self.assertEqual(list(df.index), ["reference", "model"])
+        self.assertEqual(df.loc["reference", "accuracy"], 1.0)
+        self.assertEqual(df.loc["reference", "agreement"], 1.0)
+        self.assertGreater(df.loc["model", "ms_per_image"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
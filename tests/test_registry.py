@@ -0,0 +1,52 @@
+import unittest
+
+from ocrtoolkit.models.registry import ModelRegistry
+
+
+class ModelRegistryTestCase(unittest.TestCase):
+    """ModelRegistry tests"""
+
+    def setUp(self):
+        self.num_loads = 0
+
+    def loader(self):
+        self.num_loads += 1
+        return object()
+
+    def test_same_key_is_loaded_once(self):
+        """check models are shared and refcounted"""
+        registry = ModelRegistry()
+        key = registry.make_key("ARCH", "w.pt", "cpu", {"a": 1}, batch_size=2)
+        first = registry.acquire(key, self.loader)
+        second = registry.acquire(key, self.loader)
+        self.assertIs(first, second)
+        self.assertEqual(self.num_loads, 1)
+        self.assertEqual(registry.refcount(first), 2)
+        other = registry.make_key("ARCH", "w.pt", "cuda", {"a": 1}, batch_size=2)
+        self.assertIsNot(registry.acquire(other, self.loader), first)
+
+    def test_lru_eviction_skips_models_in_use(self):
+        """check only released models are evicted, oldest first"""
+        registry = ModelRegistry(max_models=2)
+        models = [registry.acquire(key, self.loader) for key in "abc"]
+        self.assertEqual(len(registry), 3)
+        registry.release(models[1])
+        self.assertNotIn("b", registry)
+        registry.release("a")
+        registry.release("c")
+        self.assertEqual(len(registry), 2)
+        registry.unload()
+        self.assertEqual(len(registry), 0)
+
+    def test_unload_in_use_needs_force(self):
+        """check explicit unload"""
+        registry = ModelRegistry()
+        registry.acquire("a", self.loader)
+        registry.unload("a")
+        self.assertIn("a", registry)
+        registry.unload("a", force=True)
+        self.assertNotIn("a", registry)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from ocrtoolkit.integrations.paddleocr import PaddleOCRDetModel
+from ocrtoolkit.utilities.synth_utils import make_detection_results
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+
+
+class DetectionResultsFromArraysTestCase(unittest.TestCase):
+    """DetectionResults.from_arrays tests"""
+
+    def setUp(self):
+        self.coords = np.array(
+            [[0.1, 0.2, 0.5, 0.4], [0.55, 0.6, 0.9, 0.95]], dtype=np.float32
+        )
+        self.confs = np.array([0.9, 0.75], dtype=np.float32)
+        self.ref = DetectionResults(
+            [
+                BBox(*coords, conf=conf, normalized=True)
+                for coords, conf in zip(self.coords.tolist(), self.confs.tolist())
+            ],
+            width=640,
+            height=480,
+        )
+
+    def test_same_as_bbox_path(self):
+        """check bulk construction matches per-box construction"""
+        results = DetectionResults.from_arrays(
+            self.coords, 640, 480, confs=self.confs, normalized=True
+        )
+        self.assertEqual(len(results), 2)
+        for normalize in [False, True]:
+            np.testing.assert_array_equal(
+                results.to_numpy(normalize=normalize, encode=True),
+                self.ref.to_numpy(normalize=normalize, encode=True),
+            )
+        self.assertEqual(
+            [bbox.to_dict() for bbox in results.bboxes],
+            [bbox.to_dict() for bbox in self.ref.bboxes],
+        )
+
+    def test_empty(self):
+        """check empty arrays give empty results"""
+        results = DetectionResults.from_arrays(np.zeros((0, 4)), 10, 10)
+        self.assertEqual(len(results), 0)
+        self.assertEqual(results.bboxes, [])
+
+    def test_paddle_polygons(self):
+        """check polygons are reduced to their enclosing boxes"""
+        polys = np.array([[[10, 5], [50, 6], [49, 20], [11, 21]]], dtype=np.float32)
+        np.testing.assert_array_equal(
+            PaddleOCRDetModel.get_bounding_boxes(polys), [[10, 5, 50, 21]]
+        )
+
+
+class SyntheticResultsTestCase(unittest.TestCase):
+    """synth_utils tests"""
+
+    def test_make_detection_results(self):
+        """check synthetic pages are valid and group into lines"""
+        dets = make_detection_results(60)
+        self.assertEqual(len(dets), 60)
+        self.assertTrue(all(0 < bbox.w and 0 < bbox.h for bbox in dets.bboxes))
+        self.assertTrue(all(bbox.x2 <= dets.width for bbox in dets.bboxes))
+        lines = dets.group_bboxes(detect_lines=True, paragraph_break=0.035)
+        self.assertEqual(len(lines), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from ocrtoolkit.core.runner import run_ocr
+from ocrtoolkit.utilities.det_utils import load_dets
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel, RecognitionModel
+
+
+class FullPageDetModel(DetectionModel):
+    """Detects one box covering the page, can fail after max_calls"""
+
+    def __init__(self, max_calls=None):
+        super().__init__(model=None, path="full")
+        self.max_calls = max_calls
+        self.num_calls = 0
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        self.num_calls += 1
+        if self.max_calls is not None and self.num_calls > self.max_calls:
+            raise RuntimeError("interrupted")
+        return [
+            DetectionResults(
+                [BBox(0, 0, image.shape[1], image.shape[0], conf=0.5)],
+                image.shape[1],
+                image.shape[0],
+            )
+            for image in images
+        ]
+
+
+class NoopRecModel(RecognitionModel):
+    """Recognition model that must never be called"""
+
+    def __init__(self):
+        super().__init__(model=None, path="noop")
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        raise AssertionError("predict called")
+
+
+class RunOcrTestCase(unittest.TestCase):
+    """run_ocr tests"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.image_dir = self.root / "images"
+        self.image_dir.mkdir()
+        for idx in range(7):
+            image = np.zeros((10, 20 + idx, 3), dtype=np.uint8)
+            Image.fromarray(image).save(self.image_dir / f"{idx}.png")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_resume_after_interruption(self):
+        """check an interrupted run resumes without losing or repeating images"""
+        output = self.root / "out.jsonl"
+        with self.assertRaises(RuntimeError):
+            run_ocr(
+                FullPageDetModel(max_calls=2),
+                [self.image_dir],
+                output,
+                bs=2,
+                progress=False,
+            )
+        self.assertEqual(len(output.read_text().splitlines()), 4)
+
+        stats = run_ocr(FullPageDetModel(), [self.image_dir], output, bs=2)
+        self.assertEqual(stats.num_images, 3)
+        lines = [json.loads(line) for line in output.read_text().splitlines()]
+        self.assertEqual(len({line["name"] for line in lines}), 7)
+        self.assertEqual(lines[0]["bboxes"][0]["x2"], 20)
+        self.assertIn("predict_ms", stats.summary())
+
+    def test_h5_and_shards(self):
+        """check h5 output is readable with load_dets and shards split inputs"""
+        output = self.root / "out.h5"
+        run_ocr(
+            FullPageDetModel(),
+            [self.image_dir],
+            output,
+            fmt="h5",
+            shard=1,
+            num_shards=2,
+            progress=False,
+        )
+        l_dets = load_dets(output)
+        self.assertEqual(len(l_dets), 3)
+        self.assertEqual([det.width for det in l_dets], [21, 23, 25])
+
+    def test_h5_rejects_rec_models(self):
+        """check fmt='h5' with a recognition model fails before any work"""
+        output = self.root / "out.h5"
+        with self.assertRaises(ValueError):
+            run_ocr(
+                NoopRecModel(),
+                [self.image_dir],
+                output,
+                fmt="h5",
+            )
+        self.assertFalse(output.exists())
+
+    def test_resume_drops_rows_missing_from_manifest(self):
+        """check rows flushed without their manifest entry are not repeated"""
+        for fmt in ("jsonl", "csv", "h5"):
+            with self.subTest(fmt=fmt):
+                output = self.root / f"out.{fmt}"
+                run_ocr(FullPageDetModel(), [self.image_dir], output, fmt=fmt, bs=2)
+                # a crash between the flush and the manifest of the last batch
+                p_manifest = Path(f"{output}.done")
+                names = p_manifest.read_text().splitlines()
+                p_manifest.write_text("".join(f"{name}\n" for name in names[:-1]))
+
+                stats = run_ocr(FullPageDetModel(), [self.image_dir], output, fmt=fmt)
+                self.assertEqual(stats.num_images, 1)
+                if fmt == "h5":
+                    names = [det.img_name for det in load_dets(output)]
+                elif fmt == "csv":
+                    names = [
+                        line.split(",")[0]
+                        for line in output.read_text().splitlines()[1:]
+                    ]
+                else:
+                    names = [
+                        json.loads(line)["name"]
+                        for line in output.read_text().splitlines()
+                    ]
+                self.assertEqual(len(names), 7)
+                self.assertEqual(len(set(names)), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
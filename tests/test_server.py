@@ -0,0 +1,105 @@
+import asyncio
+import io
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from ocrtoolkit.models import get_arch
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel
+
+try:
+    from aiohttp import FormData
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from ocrtoolkit.core.server import create_app
+except ImportError:
+    TestClient = None
+
+
+class SlowDetModel(DetectionModel):
+    """Detector with a fixed per-call cost, to make batching visible"""
+
+    def __init__(self, delay=0.02):
+        super().__init__(model=None, path="slow")
+        self.delay = delay
+        self.batch_sizes = []
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(images))
+        return [
+            DetectionResults([BBox(0, 0, 5, 5)], image.shape[1], image.shape[0])
+            for image in images
+        ]
+
+
+def encode(image):
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+@unittest.skipIf(TestClient is None, "aiohttp is not installed")
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+    """HTTP server tests"""
+
+    async def asyncSetUp(self):
+        self.model = SlowDetModel(delay=0.02)
+        app = create_app(self.model, max_batch=8, max_latency=0.01)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_concurrent_requests_are_batched(self):
+        """check concurrent requests share model calls"""
+        images = [np.zeros((20, 30 + i, 3), dtype=np.uint8) for i in range(16)]
+        responses = await asyncio.gather(
+            *(self.client.post("/predict", data=encode(image)) for image in images)
+        )
+        l_data = [await response.json() for response in responses]
+        self.assertEqual(
+            [data["results"][0]["width"] for data in l_data],
+            [30 + i for i in range(16)],
+        )
+        self.assertLess(len(self.model.batch_sizes), 16)
+
+        stats = await (await self.client.get("/stats")).json()
+        self.assertEqual(stats["num_images"], 16)
+        health = await (await self.client.get("/health")).json()
+        self.assertEqual(health["task"], "det")
+
+    async def test_multipart_npz(self):
+        """check several images in one request with binary output"""
+        form = FormData()
+        for idx in range(3):
+            image = np.zeros((10, 10 + idx, 3), dtype=np.uint8)
+            form.add_field(f"image{idx}", encode(image), filename=f"{idx}.png")
+        response = await self.client.post("/predict?format=npz", data=form)
+        arrays = np.load(io.BytesIO(await response.read()))
+        self.assertEqual(arrays["sizes"][:, 0].tolist(), [10, 11, 12])
+        self.assertEqual(arrays["dets_2"].shape, (1, 9))
+
+    async def test_bad_image(self):
+        """check undecodable bodies are rejected"""
+        response = await self.client.post("/predict", data=b"not an image")
+        self.assertEqual(response.status, 400)
+
+
+class ArchLookupTestCase(unittest.TestCase):
+    """get_arch tests"""
+
+    def test_get_arch(self):
+        self.assertEqual(get_arch("gcv_ocr").__name__, "GCV_OCR")
+        with self.assertRaises(ValueError):
+            get_arch("NOT_AN_ARCH")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from ocrtoolkit.utilities.box_utils import get_tile_boxes, nms
+from ocrtoolkit.wrappers.bbox import BBox
+from ocrtoolkit.wrappers.detection_results import DetectionResults
+from ocrtoolkit.wrappers.model import DetectionModel
+
+
+class BlobDetModel(DetectionModel):
+    """Detects connected components of bright pixels"""
+
+    def __init__(self):
+        super().__init__(model=None, path="blobs")
+        self.max_tile_area = 0
+
+    def _map_location(self):
+        pass
+
+    def _predict(self, images, **kwargs):
+        l_results = []
+        for image in images:
+            self.max_tile_area = max(
+                self.max_tile_area, image.shape[0] * image.shape[1]
+            )
+            mask = (image[..., 0] > 127).astype(np.uint8)
+            num, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+            l_bboxes = [BBox.from_xywh(*stat[:4]) for stat in stats[1:num]]
+            l_results.append(DetectionResults(l_bboxes, image.shape[1], image.shape[0]))
+        return l_results
+
+
+def make_page(width=2000, height=1500, num_words=60, seed=0):
+    rng = np.random.default_rng(seed)
+    page = np.zeros((height, width, 3), dtype=np.uint8)
+    for _ in range(num_words):
+        x, y = rng.integers(0, width - 80), rng.integers(0, height - 20)
+        page[y : y + 12, x : x + 70] = 255
+    return page
+
+
+class TilingTestCase(unittest.TestCase):
+    """Tiled inference tests"""
+
+    def test_tile_grid_covers_image(self):
+        """check tiles cover the image and stay inside it"""
+        tiles = get_tile_boxes(1000, 600, (256, 256), overlap=0.25)
+        self.assertEqual(tiles[:, 0].min(), 0)
+        self.assertEqual(tiles[:, 2].max(), 1000)
+        self.assertEqual(tiles[:, 3].max(), 600)
+        self.assertTrue((tiles[:, 2] - tiles[:, 0] == 256).all())
+        self.assertEqual(len(get_tile_boxes(100, 100, (256, 256))), 1)
+
+    def test_nms(self):
+        """check overlapping boxes are suppressed per label"""
+        boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10]])
+        scores = np.array([0.9, 0.8, 0.7])
+        self.assertEqual(nms(boxes, scores).tolist(), [0])
+        keep = nms(boxes, scores, labels=np.array(["a", "a", "b"]))
+        self.assertEqual(keep.tolist(), [0, 2])
+
+    def test_tiled_matches_full_page(self):
+        """check tiled predictions match full page predictions"""
+        page = make_page()
+        model = BlobDetModel()
+        full = model.predict([page])[0]
+        model.max_tile_area = 0
+        model.set_tiling(tile_size=400, overlap=0.25, batch_size=4)
+        tiled = model.predict([page, page[:300, :300]])
+        self.assertLessEqual(model.max_tile_area, 400 * 400)
+        key = lambda bbox: tuple(bbox.values)  # noqa: E731
+        self.assertEqual(
+            sorted(map(key, full.bboxes)), sorted(map(key, tiled[0].bboxes))
+        )
+        self.assertEqual(tiled[1].width, 300)
+
+
+if __name__ == "__main__":
+    unittest.main()